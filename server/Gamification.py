@@ -4,6 +4,7 @@ Gamification System for Diabetes Management
 """
 
 from datetime import datetime, date, timedelta
+from catalogs import compile_views
 
 BADGES = {
     'first_reading': {
@@ -41,6 +42,10 @@ DAILY_CHALLENGES = {
     }
 }
 
+# Per-language views compiled once at import
+BADGE_VIEWS = compile_views(BADGES)
+CHALLENGE_VIEWS = compile_views(DAILY_CHALLENGES)
+
 def get_user_progress(readings, medications):
     """Calculate user progress"""
     today = date.today()
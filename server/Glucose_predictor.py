@@ -7,7 +7,13 @@ Analyzes user patterns to provide predictive alerts
 from datetime import datetime, timedelta
 from collections import defaultdict
 import statistics
-from kenyan_foods import KENYAN_FOODS
+from kenyan_foods import KENYAN_FOODS, FOOD_CATALOG, FOOD_VIEWS
+from catalogs import freeze, view_for
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; ranking falls back to pure Python
+    np = None
 
 def analyze_user_patterns(readings):
     """Analyze user's glucose patterns from reading history"""
@@ -45,6 +51,7 @@ def analyze_user_patterns(readings):
             patterns['low_readings_count'] += 1
     
 
+    patterns['pre_meal_count'] = len(patterns['avg_pre_meal'])
     if patterns['avg_pre_meal']:
         patterns['avg_pre_meal'] = statistics.mean(patterns['avg_pre_meal'])
     if patterns['avg_post_meal']:
@@ -60,6 +67,125 @@ def analyze_user_patterns(readings):
     
     return patterns
 
+# Alert templates, frozen at import. `message` strings are str.format templates
+ALERT_TEMPLATES = freeze({
+    'pattern_warning': {
+        'type': 'pattern_warning',
+        'severity': 'high',
+        'title': {
+            'en': 'Frequent High Glucose Detected',
+            'sw': 'Sukari ya Damu ya Juu Imeonekana Mara Nyingi'
+        },
+        'message': {
+            'en': 'You\'ve had {high_count} high readings recently. Consider reviewing your meal portions and timing.',
+            'sw': 'Umekuwa na vipimo {high_count} vya juu hivi karibuni. Fikiria kuangalia vipimo vya chakula na muda.'
+        },
+        'recommendations': {
+            'en': [
+                'Reduce portion sizes, especially ugali and chapati',
+                'Add more sukuma wiki and vegetables to meals',
+                'Take a 15-minute walk after eating',
+                'Check blood sugar 2 hours after meals'
+            ],
+            'sw': [
+                'Punguza vipimo vya chakula, hasa ugali na chapati',
+                'Ongeza sukuma wiki na mboga zaidi kwenye chakula',
+                'Tembea dakika 15 baada ya kula',
+                'Angalia sukari ya damu masaa 2 baada ya chakula'
+            ]
+        }
+    },
+    'trend_warning': {
+        'type': 'trend_warning',
+        'severity': 'medium',
+        'title': {
+            'en': 'Rising Glucose Trend',
+            'sw': 'Mwelekeo wa Sukari ya Damu Kuongezeka'
+        },
+        'message': {
+            'en': 'Your recent readings show an upward trend. Time to take action!',
+            'sw': 'Vipimo vyako vya hivi karibuni vinaonyesha mwelekeo wa kuongezeka. Ni wakati wa kuchukua hatua!'
+        },
+        'recommendations': {
+            'en': [
+                'Review what you\'ve eaten in the last few days',
+                'Increase physical activity',
+                'Consider smaller, more frequent meals',
+                'Stay hydrated with water'
+            ],
+            'sw': [
+                'Angalia ulichokula katika siku chache zilizopita',
+                'Ongeza mazoezi ya mwili',
+                'Fikiria chakula kidogo, mara nyingi',
+                'Kunywa maji mengi'
+            ]
+        }
+    },
+    'time_pattern': {
+        'type': 'time_pattern',
+        'severity': 'medium',
+        'title': {
+            'en': 'High Morning Glucose',
+            'sw': 'Sukari ya Damu ya Juu Asubuhi'
+        },
+        'message': {
+            'en': 'Your morning readings average {morning_avg:.1f} mg/dL, which is above target.',
+            'sw': 'Vipimo vyako vya asubuhi ni wastani wa {morning_avg:.1f} mg/dL, ambayo ni juu ya lengo.'
+        },
+        'recommendations': {
+            'en': [
+                'Avoid late-night snacking',
+                'Consider what you ate for dinner last night',
+                'Try light exercise before breakfast',
+                'Discuss with your doctor about dawn phenomenon'
+            ],
+            'sw': [
+                'Epuka kula chakula kidogo usiku wa manane',
+                'Fikiria ulichokula chakula cha jioni jana',
+                'Jaribu mazoezi mepesi kabla ya kifungua kinywa',
+                'Jadili na daktari wako kuhusu hali ya alfajiri'
+            ]
+        }
+    },
+    'low_glucose_warning': {
+        'type': 'low_glucose_warning',
+        'severity': 'high',
+        'title': {
+            'en': 'Frequent Low Glucose Episodes',
+            'sw': 'Sukari ya Damu ya Chini Mara Nyingi'
+        },
+        'message': {
+            'en': 'You\'ve had {low_count} low readings. This needs attention.',
+            'sw': 'Umekuwa na vipimo {low_count} vya chini. Hii inahitaji umakini.'
+        },
+        'recommendations': {
+            'en': [
+                'Always carry glucose tablets or sweets',
+                'Don\'t skip meals',
+                'Discuss medication timing with your doctor',
+                'Check glucose before driving or exercising'
+            ],
+            'sw': [
+                'Beba daima vidonge vya sukari au peremende',
+                'Usiruke chakula',
+                'Jadili muda wa dawa na daktari wako',
+                'Angalia sukari kabla ya kuendesha gari au kufanya mazoezi'
+            ]
+        }
+    }
+})
+
+def build_alert(alert_type, **params):
+    """Fill an alert template; title and recommendations are shared references"""
+    template = ALERT_TEMPLATES[alert_type]
+    return {
+        'type': template['type'],
+        'severity': template['severity'],
+        'title': template['title'],
+        'message': {lang: text.format(**params) for lang, text in template['message'].items()},
+        'recommendations': template['recommendations']
+    }
+
 def generate_predictive_alerts(user, patterns, language='en'):
     """Generate personalized alerts based on patterns"""
     if not patterns:
@@ -68,121 +194,21 @@ def generate_predictive_alerts(user, patterns, language='en'):
     alerts = []
     
     
-    if patterns['high_readings_count'] > len(patterns.get('avg_pre_meal', [])) * 0.4:
-        alerts.append({
-            'type': 'pattern_warning',
-            'severity': 'high',
-            'title': {
-                'en': 'Frequent High Glucose Detected',
-                'sw': 'Sukari ya Damu ya Juu Imeonekana Mara Nyingi'
-            },
-            'message': {
-                'en': f'You\'ve had {patterns["high_readings_count"]} high readings recently. Consider reviewing your meal portions and timing.',
-                'sw': f'Umekuwa na vipimo {patterns["high_readings_count"]} vya juu hivi karibuni. Fikiria kuangalia vipimo vya chakula na muda.'
-            },
-            'recommendations': {
-                'en': [
-                    'Reduce portion sizes, especially ugali and chapati',
-                    'Add more sukuma wiki and vegetables to meals',
-                    'Take a 15-minute walk after eating',
-                    'Check blood sugar 2 hours after meals'
-                ],
-                'sw': [
-                    'Punguza vipimo vya chakula, hasa ugali na chapati',
-                    'Ongeza sukuma wiki na mboga zaidi kwenye chakula',
-                    'Tembea dakika 15 baada ya kula',
-                    'Angalia sukari ya damu masaa 2 baada ya chakula'
-                ]
-            }
-        })
+    if patterns['high_readings_count'] > patterns['pre_meal_count'] * 0.4:
+        alerts.append(build_alert('pattern_warning', high_count=patterns['high_readings_count']))
     
     
     if patterns['recent_trend'] == 'rising':
-        alerts.append({
-            'type': 'trend_warning',
-            'severity': 'medium',
-            'title': {
-                'en': 'Rising Glucose Trend',
-                'sw': 'Mwelekeo wa Sukari ya Damu Kuongezeka'
-            },
-            'message': {
-                'en': 'Your recent readings show an upward trend. Time to take action!',
-                'sw': 'Vipimo vyako vya hivi karibuni vinaonyesha mwelekeo wa kuongezeka. Ni wakati wa kuchukua hatua!'
-            },
-            'recommendations': {
-                'en': [
-                    'Review what you\'ve eaten in the last few days',
-                    'Increase physical activity',
-                    'Consider smaller, more frequent meals',
-                    'Stay hydrated with water'
-                ],
-                'sw': [
-                    'Angalia ulichokula katika siku chache zilizopita',
-                    'Ongeza mazoezi ya mwili',
-                    'Fikiria chakula kidogo, mara nyingi',
-                    'Kunywa maji mengi'
-                ]
-            }
-        })
+        alerts.append(build_alert('trend_warning'))
     
     
     morning_avg = statistics.mean(patterns['time_patterns'].get(8, [100])) if patterns['time_patterns'].get(8) else None
     if morning_avg and morning_avg > 140:
-        alerts.append({
-            'type': 'time_pattern',
-            'severity': 'medium',
-            'title': {
-                'en': 'High Morning Glucose',
-                'sw': 'Sukari ya Damu ya Juu Asubuhi'
-            },
-            'message': {
-                'en': f'Your morning readings average {morning_avg:.1f} mg/dL, which is above target.',
-                'sw': f'Vipimo vyako vya asubuhi ni wastani wa {morning_avg:.1f} mg/dL, ambayo ni juu ya lengo.'
-            },
-            'recommendations': {
-                'en': [
-                    'Avoid late-night snacking',
-                    'Consider what you ate for dinner last night',
-                    'Try light exercise before breakfast',
-                    'Discuss with your doctor about dawn phenomenon'
-                ],
-                'sw': [
-                    'Epuka kula chakula kidogo usiku wa manane',
-                    'Fikiria ulichokula chakula cha jioni jana',
-                    'Jaribu mazoezi mepesi kabla ya kifungua kinywa',
-                    'Jadili na daktari wako kuhusu hali ya alfajiri'
-                ]
-            }
-        })
+        alerts.append(build_alert('time_pattern', morning_avg=morning_avg))
     
     
     if patterns['low_readings_count'] > 2:
-        alerts.append({
-            'type': 'low_glucose_warning',
-            'severity': 'high',
-            'title': {
-                'en': 'Frequent Low Glucose Episodes',
-                'sw': 'Sukari ya Damu ya Chini Mara Nyingi'
-            },
-            'message': {
-                'en': f'You\'ve had {patterns["low_readings_count"]} low readings. This needs attention.',
-                'sw': f'Umekuwa na vipimo {patterns["low_readings_count"]} vya chini. Hii inahitaji umakini.'
-            },
-            'recommendations': {
-                'en': [
-                    'Always carry glucose tablets or sweets',
-                    'Don\'t skip meals',
-                    'Discuss medication timing with your doctor',
-                    'Check glucose before driving or exercising'
-                ],
-                'sw': [
-                    'Beba daima vidonge vya sukari au peremende',
-                    'Usiruke chakula',
-                    'Jadili muda wa dawa na daktari wako',
-                    'Angalia sukari kabla ya kuendesha gari au kufanya mazoezi'
-                ]
-            }
-        })
+        alerts.append(build_alert('low_glucose_warning', low_count=patterns['low_readings_count']))
     
     return alerts
 
@@ -211,32 +237,79 @@ def get_meal_specific_predictions(recent_readings, meal_context, language='en'):
     
     return predictions
 
+# Spike model by glucose impact: base + slope * (user's post-meal average - 150).
+# The one source for both /food-impact and /food-impact/ranked
+IMPACT_SPIKE_MODEL = {
+    'very_high': (80, 0.3),
+    'high': (50, 0.2),
+    'medium': (30, 0.1),
+    'low': (15, 0),
+    'none': (0, 0),
+}
+BASELINE_POST_MEAL = 150
+
+def user_post_meal_average(user_patterns):
+    """Post-meal average from analyze_user_patterns, or the population baseline"""
+    avg = user_patterns.get('avg_post_meal') if user_patterns else None
+    # analyze_user_patterns leaves an empty list when there were no post-meal readings
+    return avg if isinstance(avg, (int, float)) else BASELINE_POST_MEAL
+
 def get_food_impact_prediction(food_name, user_patterns, language='en'):
     """Predict how a specific Kenyan food might affect the user"""
-    food_data = KENYAN_FOODS.get(food_name.lower().replace(' ', '_'))
-    if not food_data:
+    food_key = FOOD_CATALOG.resolve(food_name)
+    if not food_key:
         return None
+    food_data = KENYAN_FOODS[food_key]
     
     
     glucose_impact = food_data['glucose_impact']
-    user_avg = user_patterns.get('avg_post_meal', 150) if user_patterns else 150
+    user_avg = user_post_meal_average(user_patterns)
+    
+    base, slope = IMPACT_SPIKE_MODEL.get(glucose_impact, (0, 0))
     
-    prediction = {
-        'food': food_data[f'name_{language}'] if f'name_{language}' in food_data else food_data['name_en'],
+    food_view = view_for(FOOD_VIEWS, language)[food_key]
+    return {
+        'food': food_view['name'],
         'glucose_impact': glucose_impact,
-        'estimated_spike': 0,
-        'recommendations': food_data['diabetes_tips'][language]
+        # Flat tiers stay the exact base, as they always have
+        'estimated_spike': base + (user_avg - BASELINE_POST_MEAL) * slope if slope else base,
+        'recommendations': food_view['tips']
     }
 
-    if glucose_impact == 'very_high':
-        prediction['estimated_spike'] = 80 + (user_avg - 150) * 0.3
-    elif glucose_impact == 'high':
-        prediction['estimated_spike'] = 50 + (user_avg - 150) * 0.2
-    elif glucose_impact == 'medium':
-        prediction['estimated_spike'] = 30 + (user_avg - 150) * 0.1
-    elif glucose_impact == 'low':
-        prediction['estimated_spike'] = 15
-    else:  
-        prediction['estimated_spike'] = 0
-    
-    return prediction
+# Spike model coefficients laid out in catalog order for whole-catalog scoring
+_RANK_KEYS = tuple(KENYAN_FOODS)
+_RANK_BASE = tuple(IMPACT_SPIKE_MODEL.get(KENYAN_FOODS[k]['glucose_impact'], (0, 0))[0] for k in _RANK_KEYS)
+_RANK_SLOPE = tuple(IMPACT_SPIKE_MODEL.get(KENYAN_FOODS[k]['glucose_impact'], (0, 0))[1] for k in _RANK_KEYS)
+if np is not None:
+    _RANK_BASE_VEC = np.array(_RANK_BASE, dtype=float)
+    _RANK_SLOPE_VEC = np.array(_RANK_SLOPE, dtype=float)
+
+def rank_food_impacts(user_patterns, language='en', keys=None, descending=False):
+    """Estimated spike for every food in one pass, sorted lowest spike first
+
+    `keys` optionally restricts the ranking to a subset of food keys.
+    """
+    delta = user_post_meal_average(user_patterns) - BASELINE_POST_MEAL
+    if np is not None:
+        spikes = (_RANK_BASE_VEC + _RANK_SLOPE_VEC * delta).round(1).tolist()
+    else:
+        spikes = [round(b + m * delta, 1) for b, m in zip(_RANK_BASE, _RANK_SLOPE)]
+
+    food_views = view_for(FOOD_VIEWS, language)
+    selected = set(keys) if keys is not None else None
+    ranked = []
+    for key, spike in zip(_RANK_KEYS, spikes):
+        if selected is not None and key not in selected:
+            continue
+        food = KENYAN_FOODS[key]
+        ranked.append({
+            'key': key,
+            'food': food_views[key]['name'],
+            'category': food['category'],
+            'glycemic_index': food['glycemic_index'],
+            'glucose_impact': food['glucose_impact'],
+            'estimated_spike': spike,
+            'recommendations': food_views[key]['tips'],
+        })
+    ranked.sort(key=lambda item: item['estimated_spike'], reverse=descending)
+    return ranked
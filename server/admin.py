@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Access control for operational endpoints under /admin
+Admins are the accounts whose email is listed in ADMIN_EMAILS (comma-separated
+in the environment); with none configured every /admin endpoint answers 403
+"""
+
+from functools import wraps
+
+from flask import current_app
+from flask_jwt_extended import get_jwt_identity
+
+from lookups import get_user
+
+def is_admin(user):
+    return user is not None and bool(user.email) and user.email.lower() in current_app.config.get('ADMIN_EMAILS', ())
+
+def admin_required(fn):
+    """Place below @jwt_required()"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not is_admin(get_user(get_jwt_identity())):
+            return {'error': 'Admin access required'}, 403
+        return fn(*args, **kwargs)
+    return wrapper
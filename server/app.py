@@ -3,48 +3,55 @@
 # Standard library imports
 
 # Remote library imports
-from flask import request
-from flask_restful import Resource
+from flask import Blueprint, current_app, request, send_file
+from flask_restful import Api, Resource
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from datetime import datetime
 from sqlalchemy import func
 
 # Local imports
-from config import app, db, api
+from config import db, create_app
 from models import User, Reading, Medication, Meal, Doctor, reading_meals, Reminder, EducationalTip, DoctorMessage, BMISnapshot
-
-# Initialize database tables on startup
-with app.app_context():
-    try:
-        db.create_all()
-        print("✅ Database tables created/verified!")
-        
-        # Add basic doctors if none exist
-        if Doctor.query.count() == 0:
-            doctors = [
-                Doctor(name="Dr. Sarah Johnson", specialization="Endocrinology", phone="+254700123456"),
-                Doctor(name="Dr. Michael Chen", specialization="Internal Medicine", phone="+254700123457"),
-                Doctor(name="Dr. Amina Hassan", specialization="Family Medicine", phone="+254700123458"),
-            ]
-            for doctor in doctors:
-                db.session.add(doctor)
-            db.session.commit()
-            print("✅ Basic doctors seeded!")
-    except Exception as e:
-        print(f"⚠️ Database initialization error: {e}")
+from lookups import get_user, get_latest_reading
+from etags import conditional_get, today, tips_version, doctors_version
+from precompressed import VersionedBody
+from serialization import MSGPACK_MIMETYPE, msgpack, output_json, output_msgpack
+from singleflight import SINGLE_FLIGHT
+from deadlines import run_with_deadline
+from sections import run_sections, server_timing
+from routing import read_replica
+from admin import admin_required
+from budgets import query_budget
+from slowlog import top_offenders
+from profiling import PSTATS_SORTS, list_profiles, load_profile, pstats_path, pstats_text
+from search import SEARCH_TYPES, fts_query, search_available, search_readings, search_messages, search_tips, search_foods
+from catalogs import FrozenDict, freeze, normalize_language, view_for
 from schema import UserSchema, ReadingSchema, MedicationSchema, MealSchema, DoctorSchema
-from kenyan_foods import KENYAN_FOODS, get_food_recommendations, get_diabetes_friendly_foods, get_foods_to_limit
-from Glucose_predictor import analyze_user_patterns, generate_predictive_alerts, get_meal_specific_predictions, get_food_impact_prediction
-from Gamification import BADGES, DAILY_CHALLENGES, get_user_progress, check_badges, get_daily_challenges_status
-from educational_insights import get_personalized_insights, get_food_recommendations_by_status, get_glucose_trend
+from serializers import (
+    RowSerializer, Computed, READING_SERIALIZER, READING_DICT_SERIALIZER, MEDICATION_SERIALIZER, MEAL_SERIALIZER,
+    REMINDER_SERIALIZER, BMI_SNAPSHOT_SERIALIZER, DOCTOR_MESSAGE_SERIALIZER, USER_SERIALIZER, SERIES_FORMAT,
+    reading_series,
+)
+from kenyan_foods import KENYAN_FOODS, FOOD_CATALOG, FOOD_VIEWS, get_food_recommendations
+from educational_insights import get_personalized_insights, get_food_recommendations_by_status, get_glucose_trend, tip_catalog
+# Glucose_predictor, glycemic_load (numpy) and Gamification are imported by the
+# handlers that use them, so workers that never serve analytics never load them
+
+# Every resource lives on this blueprint; create_app() registers it
+api_bp = Blueprint('api', __name__)
+api = Api(api_bp)
+api.representations['application/json'] = output_json
+if msgpack is not None:
+    api.representations[MSGPACK_MIMETYPE] = output_msgpack
 
 # ---------------- Basic route ----------------
-@app.route('/')
+@api_bp.route('/')
 def index():
     return '<h1>Diabetes Management API</h1>'
 
 # ---------------- Authentication ----------------
 class Signup(Resource):
+    @query_budget(7)
     def post(self):
         data = request.get_json() or {}
         
@@ -124,6 +131,7 @@ class Signup(Resource):
             return {'error': str(e)}, 400
 
 class Login(Resource):
+    @query_budget(1)
     def post(self):
         data = request.get_json() or {}
         
@@ -145,20 +153,22 @@ class Login(Resource):
             return {'error': 'Invalid email or password'}, 401
 
 class CheckSession(Resource):
+    @query_budget(2)
     @jwt_required()
+    @conditional_get()
     def get(self):
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        
-        if user:
-            resp = user.to_dict()
-            resp['education'] = education_for(user.diabetes_type)
-            resp['advice'] = advice_for(user)
-            return resp, 200
-        else:
+        try:
+            serializer = SESSION_SERIALIZER.sparse(request.args.get('fields'))
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        rows = serializer.fetch(User.id == user_id, limit=1)
+        if not rows:
             return {'error': 'User not found'}, 404
+        return rows[0], 200
 
 class PasswordForgot(Resource):
+    @query_budget(1)
     def post(self):
         data = request.get_json() or {}
         email = (data.get('email') or '').strip().lower()
@@ -173,6 +183,7 @@ class PasswordForgot(Resource):
         return {'message': 'If the email exists, a reset link has been sent.'}, 200
 
 class PasswordUpdate(Resource):
+    @query_budget(3)
     @jwt_required()
     def post(self):
         user_id = get_jwt_identity()
@@ -233,8 +244,10 @@ EDU = {
     ]
 }
 
+EDUCATION = freeze(EDU)
+
 def education_for(diabetes_type):
-    return EDU.get((diabetes_type or '').lower(), [])
+    return EDUCATION.get((diabetes_type or '').lower(), ())
 
 # ---------------- Personalized advice (nutrition/exercise/medication) ----------------
 def bmi_category_for(height_cm, weight_kg):
@@ -254,60 +267,103 @@ def bmi_category_for(height_cm, weight_kg):
     except Exception:
         return None
 
-def advice_for(user):
-    """Return a dict with nutrition/exercise/medication tips customized by diabetes_type and BMI."""
-    dtype = (user.diabetes_type or '').lower()
-    bmi_cat = bmi_category_for(user.height_cm, user.weight_kg)
-    base_nutrition = [
+ADVICE_BASE = {
+    'nutrition': [
         'Prioritize whole foods: vegetables, lean proteins, healthy fats.',
         'Choose low-glycemic carbs and adequate fiber.',
         'Balance plates: half non-starchy veg, quarter protein, quarter carbs.'
-    ]
-    base_exercise = [
+    ],
+    'exercise': [
         'Aim for 150+ minutes/week of moderate activity (e.g., brisk walking).',
         'Add 2–3 days/week of resistance training if able.',
         'Light movement after meals (10–15 min) can help post-meal glucose.'
-    ]
-    base_med = [
+    ],
+    'medication': [
         'Take medications exactly as prescribed.',
         'Discuss changes or side effects with your clinician.',
         'Never adjust insulin/meds without medical guidance.'
     ]
+}
 
-    # Adjust by diabetes type
-    if dtype == 'type1':
-        base_nutrition += ['Count carbohydrates and match insulin appropriately.']
-        base_exercise += ['Monitor glucose before/after exercise; carry fast-acting carbs.']
-        base_med += ['Review basal/bolus strategy and correction factors with your care team.']
-    elif dtype == 'type2':
-        base_nutrition += ['Focus on weight management and portion control.']
-        base_exercise += ['Build consistency; short daily walks are very effective.']
-        base_med += ['Metformin adherence and timing can matter; ask about alternatives if GI side effects.']
-    elif dtype == 'gestational':
-        base_nutrition += ['Follow pregnancy meal plan and carb targets from your clinician.']
-        base_exercise += ['Prefer low-impact activity as approved by your provider.']
-        base_med += ['Frequent monitoring and close coordination with your obstetric team.']
-    elif dtype == 'prediabetes':
-        base_nutrition += ['Reduce sugary drinks and refined carbs; emphasize fiber.']
-        base_exercise += ['Accumulate movement throughout the day; aim for daily consistency.']
-        base_med += ['Lifestyle changes are first-line; discuss medication only if advised.']
-
-    # Adjust by BMI category if available
-    if bmi_cat == 'Underweight':
-        base_nutrition += ['Ensure adequate calories and protein; seek a dietitian if losing weight unintentionally.']
-    elif bmi_cat == 'Overweight':
-        base_nutrition += ['Create a modest calorie deficit; consider smaller plates and mindful eating.']
-        base_exercise += ['Start gently and build up duration; track steps to motivate progress.']
-    elif bmi_cat == 'Obese':
-        base_nutrition += ['Work with your clinician on a structured weight-loss plan; consider dietitian support.']
-        base_exercise += ['Low-impact options (walking, cycling, swimming) reduce joint stress; progress gradually.']
+# Adjustments by diabetes type
+ADVICE_BY_TYPE = {
+    'type1': {
+        'nutrition': ['Count carbohydrates and match insulin appropriately.'],
+        'exercise': ['Monitor glucose before/after exercise; carry fast-acting carbs.'],
+        'medication': ['Review basal/bolus strategy and correction factors with your care team.']
+    },
+    'type2': {
+        'nutrition': ['Focus on weight management and portion control.'],
+        'exercise': ['Build consistency; short daily walks are very effective.'],
+        'medication': ['Metformin adherence and timing can matter; ask about alternatives if GI side effects.']
+    },
+    'gestational': {
+        'nutrition': ['Follow pregnancy meal plan and carb targets from your clinician.'],
+        'exercise': ['Prefer low-impact activity as approved by your provider.'],
+        'medication': ['Frequent monitoring and close coordination with your obstetric team.']
+    },
+    'prediabetes': {
+        'nutrition': ['Reduce sugary drinks and refined carbs; emphasize fiber.'],
+        'exercise': ['Accumulate movement throughout the day; aim for daily consistency.'],
+        'medication': ['Lifestyle changes are first-line; discuss medication only if advised.']
+    }
+}
 
-    return {
-        'nutrition': base_nutrition,
-        'exercise': base_exercise,
-        'medication': base_med,
-        'bmi_category': bmi_cat,
+# Adjustments by BMI category
+ADVICE_BY_BMI = {
+    'Underweight': {
+        'nutrition': ['Ensure adequate calories and protein; seek a dietitian if losing weight unintentionally.']
+    },
+    'Overweight': {
+        'nutrition': ['Create a modest calorie deficit; consider smaller plates and mindful eating.'],
+        'exercise': ['Start gently and build up duration; track steps to motivate progress.']
+    },
+    'Obese': {
+        'nutrition': ['Work with your clinician on a structured weight-loss plan; consider dietitian support.'],
+        'exercise': ['Low-impact options (walking, cycling, swimming) reduce joint stress; progress gradually.']
     }
+}
+
+BMI_CATEGORIES = (None, 'Underweight', 'Normal', 'Overweight', 'Obese')
+
+def compile_advice():
+    """Precompute advice for every diabetes type × BMI category pair"""
+    compiled = {}
+    for dtype in ('',) + tuple(ADVICE_BY_TYPE):
+        by_type = ADVICE_BY_TYPE.get(dtype, {})
+        for bmi_cat in BMI_CATEGORIES:
+            by_bmi = ADVICE_BY_BMI.get(bmi_cat, {})
+            advice = {
+                section: tips + by_type.get(section, []) + by_bmi.get(section, [])
+                for section, tips in ADVICE_BASE.items()
+            }
+            advice['bmi_category'] = bmi_cat
+            compiled[(dtype, bmi_cat)] = freeze(advice)
+    return FrozenDict(compiled)
+
+ADVICE = compile_advice()
+
+def advice_for(user):
+    """Return a dict with nutrition/exercise/medication tips customized by diabetes_type and BMI."""
+    return advice_for_profile(user.diabetes_type, user.height_cm, user.weight_kg)
+
+def advice_for_profile(diabetes_type, height_cm, weight_kg):
+    dtype = (diabetes_type or '').lower()
+    bmi_cat = bmi_category_for(height_cm, weight_kg)
+    return ADVICE.get((dtype, bmi_cat)) or ADVICE[('', bmi_cat)]
+
+def session_payload(user):
+    """User profile plus education and advice, as returned by /check_session"""
+    resp = user.to_dict()
+    resp['education'] = education_for(user.diabetes_type)
+    resp['advice'] = advice_for(user)
+    return resp
+
+# Same output as session_payload, for ?fields= on /check_session
+SESSION_SERIALIZER = RowSerializer('session', USER_SERIALIZER.fields + (
+    ('education', Computed(education_for, User.diabetes_type)),
+    ('advice', Computed(advice_for_profile, User.diabetes_type, User.height_cm, User.weight_kg)),
+))
 
 # ---------------- Glucose evaluation ----------------
 TIPS_NORMAL = [
@@ -344,22 +400,39 @@ def evaluate_glucose(value, context):
 # ---------------- Schemas ----------------
 user_schema = UserSchema()
 reading_schema = ReadingSchema()
-readings_schema = ReadingSchema(many=True)
 medication_schema = MedicationSchema()
-medications_schema = MedicationSchema(many=True)
 meal_schema = MealSchema()
-meals_schema = MealSchema(many=True)
 doctor_schema = DoctorSchema()
 doctors_schema = DoctorSchema(many=True)
 
+def reading_evaluation(value, context):
+    return evaluate_glucose(value, context) if context else None
+
+# Same output as ReadingSchema plus the evaluation of contextual readings
+READING_DETAIL_SERIALIZER = RowSerializer('reading_detail', READING_SERIALIZER.fields + (
+    ('evaluation', Computed(reading_evaluation, Reading.value, Reading.context)),
+))
+
 # ---------------- Readings CRUD ----------------
 class Readings(Resource):
+    @query_budget(2)
     @jwt_required()
+    @conditional_get()
     def get(self):
         user_id = int(get_jwt_identity())
-        items = Reading.query.filter_by(user_id=user_id).order_by(Reading.date, Reading.time).all()
-        return readings_schema.dump(items), 200
+        response_format = request.args.get('format')
+        if response_format == SERIES_FORMAT:
+            return reading_series(Reading.user_id == user_id, order_by=(Reading.date, Reading.time)), 200
+        if response_format:
+            return {'error': f"format must be '{SERIES_FORMAT}'"}, 400
+        try:
+            serializer = READING_SERIALIZER.sparse(request.args.get('fields'))
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        items = serializer.fetch(Reading.user_id == user_id, order_by=(Reading.date, Reading.time))
+        return items, 200
 
+    @query_budget(3)
     @jwt_required()
     def post(self):
         user_id = int(get_jwt_identity())
@@ -392,17 +465,25 @@ class Readings(Resource):
             return {'error': str(e)}, 400
 
 class ReadingById(Resource):
+    @query_budget(2)
     @jwt_required()
+    @conditional_get()
     def get(self, id):
         user_id = int(get_jwt_identity())
-        reading = Reading.query.filter_by(id=id, user_id=user_id).first()
-        if not reading:
+        try:
+            serializer = READING_DETAIL_SERIALIZER.sparse(request.args.get('fields'))
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        rows = serializer.fetch(Reading.id == id, Reading.user_id == user_id, limit=1)
+        if not rows:
             return {'error': 'Reading not found'}, 404
-        payload = reading_schema.dump(reading)
-        if reading.context:
-            payload['evaluation'] = evaluate_glucose(reading.value, reading.context)
+        payload = rows[0]
+        # Readings without a context carry no evaluation key at all
+        if 'evaluation' in payload and payload['evaluation'] is None:
+            del payload['evaluation']
         return payload, 200
 
+    @query_budget(4)
     @jwt_required()
     def patch(self, id):
         user_id = int(get_jwt_identity())
@@ -434,6 +515,7 @@ class ReadingById(Resource):
             db.session.rollback()
             return {'error': str(e)}, 400
 
+    @query_budget(5)
     @jwt_required()
     def delete(self, id):
         user_id = int(get_jwt_identity())
@@ -450,6 +532,7 @@ class ReadingById(Resource):
 
 # ---------------- Profile + BMI ----------------
 class UserProfile(Resource):
+    @query_budget(4)
     @jwt_required()
     def patch(self):
         user_id = int(get_jwt_identity())
@@ -484,26 +567,30 @@ class UserProfile(Resource):
             db.session.rollback()
             return {'error': str(e)}, 400
 
+def bmi_payload(user):
+    if not user:
+        return {'error': 'User not found'}, 404
+    if not user.height_cm or not user.weight_kg:
+        return {'error': 'height_cm and weight_kg must be set on profile'}, 400
+    height_m = user.height_cm / 100.0
+    bmi = user.weight_kg / (height_m ** 2)
+    if bmi < 18.5:
+        category = 'Underweight'
+    elif bmi < 25:
+        category = 'Normal'
+    elif bmi < 30:
+        category = 'Overweight'
+    else:
+        category = 'Obese'
+    return {'bmi': round(bmi, 1), 'category': category}, 200
+
 class UserBMI(Resource):
+    @query_budget(2)
     @jwt_required()
+    @conditional_get()
     def get(self):
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if not user:
-            return {'error': 'User not found'}, 404
-        if not user.height_cm or not user.weight_kg:
-            return {'error': 'height_cm and weight_kg must be set on profile'}, 400
-        height_m = user.height_cm / 100.0
-        bmi = user.weight_kg / (height_m ** 2)
-        if bmi < 18.5:
-            category = 'Underweight'
-        elif bmi < 25:
-            category = 'Normal'
-        elif bmi < 30:
-            category = 'Overweight'
-        else:
-            category = 'Obese'
-        return {'bmi': round(bmi, 1), 'category': category}, 200
+        return bmi_payload(get_user(user_id))
 
 # Add resources to API
 api.add_resource(Signup, '/signup')
@@ -518,12 +605,19 @@ api.add_resource(UserBMI, '/me/bmi')
 
 # ---------------- Medications (create/read + update status) ----------------
 class Medications(Resource):
+    @query_budget(2)
     @jwt_required()
+    @conditional_get()
     def get(self):
         user_id = int(get_jwt_identity())
-        meds = Medication.query.filter_by(user_id=user_id).order_by(Medication.time).all()
-        return medications_schema.dump(meds), 200
+        try:
+            serializer = MEDICATION_SERIALIZER.sparse(request.args.get('fields'))
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        meds = serializer.fetch(Medication.user_id == user_id, order_by=(Medication.time,))
+        return meds, 200
 
+    @query_budget(3)
     @jwt_required()
     def post(self):
         user_id = int(get_jwt_identity())
@@ -547,6 +641,7 @@ class Medications(Resource):
             return {'error': str(e)}, 400
 
 class MedicationById(Resource):
+    @query_budget(4)
     @jwt_required()
     def patch(self, id):
         user_id = int(get_jwt_identity())
@@ -577,15 +672,21 @@ api.add_resource(MedicationById, '/medications/<int:id>')
 
 # ---------------- Meals (create/read) ----------------
 class Meals(Resource):
+    @query_budget(1)
     @jwt_required()
     def get(self):
         user_id = int(get_jwt_identity())
         # Return only meals that are linked to this user's readings OR simple listing of all meals
         # For simplicity, we'll return all meals the user created in this app context.
         # If meals are global, you could return all.
-        meals = Meal.query.order_by(Meal.created_at.desc()).all()
-        return meals_schema.dump(meals), 200
+        try:
+            serializer = MEAL_SERIALIZER.sparse(request.args.get('fields'))
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        meals = serializer.fetch(order_by=(Meal.created_at.desc(),))
+        return meals, 200
 
+    @query_budget(2)
     @jwt_required()
     def post(self):
         data = request.get_json()
@@ -608,6 +709,7 @@ api.add_resource(Meals, '/meals')
 
 # ---------------- Link/Unlink Meals to Readings with carbs_amount ----------------
 class ReadingMeals(Resource):
+    @query_budget(5)
     @jwt_required()
     def post(self, reading_id):
         """Attach a meal to a reading with optional carbs_amount."""
@@ -635,6 +737,7 @@ class ReadingMeals(Resource):
             db.session.rollback()
             return {'error': str(e)}, 400
 
+    @query_budget(2)
     @jwt_required()
     def delete(self, reading_id):
         """Detach a meal from a reading."""
@@ -659,11 +762,19 @@ class ReadingMeals(Resource):
 api.add_resource(ReadingMeals, '/readings/<int:reading_id>/meals')
 
 # ---------------- Doctors (create/list and list patients) ----------------
+def doctors_payload():
+    items = Doctor.query.order_by(Doctor.id.desc()).all()
+    return doctors_schema.dump(items)
+
+# Doctor list is served pre-serialized and rebuilt only when a Doctor row changes
+DOCTORS_BODY = VersionedBody(doctors_payload, doctors_version, 'public, max-age=60')
+
 class Doctors(Resource):
+    @query_budget(2)
     def get(self):
-        items = Doctor.query.order_by(Doctor.id.desc()).all()
-        return doctors_schema.dump(items), 200
+        return DOCTORS_BODY.current().response()
 
+    @query_budget(4)
     def post(self):
         data = request.get_json()
         if not data or not data.get('name') or not data.get('email'):
@@ -684,6 +795,7 @@ class Doctors(Resource):
             return {'error': str(e)}, 400
 
 class DoctorsSeed(Resource):
+    @query_budget(1)
     def post(self):
         """Seed the database with a few sample doctors if table is empty."""
         try:
@@ -706,11 +818,16 @@ class DoctorsSeed(Resource):
             return {'error': str(e)}, 400
 
 class DoctorPatients(Resource):
+    @query_budget(2)
     def get(self, doctor_id):
+        try:
+            serializer = USER_SERIALIZER.sparse(request.args.get('fields'))
+        except ValueError as e:
+            return {'error': str(e)}, 400
         doc = Doctor.query.get(doctor_id)
         if not doc:
             return {'error': 'Doctor not found'}, 404
-        patients = [u.to_dict() for u in doc.patients]
+        patients = serializer.fetch(User.doctor_id == doctor_id, order_by=(User.id,))
         return {'doctor': doctor_schema.dump(doc), 'patients': patients}, 200
 
 api.add_resource(Doctors, '/doctors')
@@ -718,13 +835,19 @@ api.add_resource(DoctorsSeed, '/doctors/seed')
 api.add_resource(DoctorPatients, '/doctors/<int:doctor_id>/patients')
 
 # ---------------- Kenyan Food Database ----------------
+# The food table only changes with a deploy: encode and compress it once, on first request
+KENYAN_FOODS_BODY = VersionedBody(lambda: {'foods': KENYAN_FOODS}, lambda: None, 'public, max-age=3600')
+
 class KenyanFoods(Resource):
+    @query_budget(0)
     def get(self):
         """Get all Kenyan foods with nutritional data"""
-        return {'foods': KENYAN_FOODS}, 200
+        return KENYAN_FOODS_BODY.current().response()
 
 class FoodRecommendations(Resource):
+    @query_budget(2)
     @jwt_required()
+    @conditional_get()
     def get(self):
         """Get personalized food recommendations for the user"""
         user_id = int(get_jwt_identity())
@@ -736,65 +859,102 @@ class FoodRecommendations(Resource):
         diabetes_type = user.diabetes_type or 'type2'  # Default to type2
         
         recommendations = get_food_recommendations(diabetes_type, language)
-        friendly_foods = get_diabetes_friendly_foods()
-        foods_to_limit = get_foods_to_limit()
         
         return {
             'recommendations': recommendations,
-            'diabetes_friendly': list(friendly_foods.keys()),
-            'foods_to_limit': list(foods_to_limit.keys()),
+            'diabetes_friendly': FOOD_CATALOG.diabetes_friendly,
+            'foods_to_limit': FOOD_CATALOG.to_limit,
             'diabetes_type': diabetes_type
         }, 200
 
+class FoodSearch(Resource):
+    @query_budget(0)
+    def get(self):
+        """Typo-tolerant food search over English and Swahili names"""
+        query = (request.args.get('q') or '').strip()
+        if not query:
+            return {'error': 'q query param is required'}, 400
+        language = normalize_language(request.args.get('lang', 'en'))
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+        
+        # Optional facet filters served from the catalog's secondary indexes
+        facets = {f: request.args.get(f) for f in ('impact', 'category', 'gi_band')}
+        keys = set(FOOD_CATALOG.filter(**facets)) if any(facets.values()) else None
+        
+        food_views = view_for(FOOD_VIEWS, language)
+        results = []
+        for key, score, match in FOOD_CATALOG.search(query, limit=limit, keys=keys):
+            food = KENYAN_FOODS[key]
+            results.append({
+                'key': key,
+                'name': food_views[key]['name'],
+                'score': score,
+                'match': match,
+                'category': food['category'],
+                'glycemic_index': food['glycemic_index'],
+                'glucose_impact': food['glucose_impact'],
+            })
+        return {'query': query, 'results': results}, 200
+
 api.add_resource(KenyanFoods, '/kenyan-foods')
 api.add_resource(FoodRecommendations, '/food-recommendations')
+api.add_resource(FoodSearch, '/foods/search')
 
 # ---------------- Predictive Glucose Alerts ----------------
+def glucose_alerts_payload(user_id, language='en'):
+    """Predictive alerts based on the user's glucose patterns"""
+    from Glucose_predictor import analyze_user_patterns, generate_predictive_alerts
+    user = get_user(user_id)
+    if not user:
+        return {'error': 'User not found'}, 404
+    
+    # Get recent readings (last 30 days)
+    from datetime import date, timedelta
+    cutoff_date = date.today() - timedelta(days=30)
+    recent_readings = Reading.query.filter(
+        Reading.user_id == user_id,
+        Reading.date >= cutoff_date
+    ).order_by(Reading.date.desc(), Reading.time.desc()).all()
+    
+    if len(recent_readings) < 3:
+        return {
+            'alerts': [],
+            'message': 'Need more readings to generate predictions' if language == 'en' else 'Inahitaji vipimo zaidi ili kutoa utabiri'
+        }, 200
+    
+    # Analyze patterns and generate alerts
+    patterns = analyze_user_patterns(recent_readings)
+    alerts = generate_predictive_alerts(user, patterns, language)
+    
+    return {
+        'alerts': alerts,
+        'patterns_summary': {
+            'total_readings': len(recent_readings),
+            'high_readings': patterns.get('high_readings_count', 0),
+            'low_readings': patterns.get('low_readings_count', 0),
+            'recent_trend': patterns.get('recent_trend', 'stable'),
+            'avg_pre_meal': patterns.get('avg_pre_meal'),
+            'avg_post_meal': patterns.get('avg_post_meal')
+        }
+    }, 200
+
 class GlucoseAlerts(Resource):
+    @query_budget(3)
     @jwt_required()
+    @read_replica
+    @conditional_get(today)
     def get(self):
         """Get predictive alerts based on user's glucose patterns"""
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if not user:
-            return {'error': 'User not found'}, 404
-        
         language = request.args.get('lang', 'en')
-        
-        # Get recent readings (last 30 days)
-        from datetime import date, timedelta
-        cutoff_date = date.today() - timedelta(days=30)
-        recent_readings = Reading.query.filter(
-            Reading.user_id == user_id,
-            Reading.date >= cutoff_date
-        ).order_by(Reading.date.desc(), Reading.time.desc()).all()
-        
-        if len(recent_readings) < 3:
-            return {
-                'alerts': [],
-                'message': 'Need more readings to generate predictions' if language == 'en' else 'Inahitaji vipimo zaidi ili kutoa utabiri'
-            }, 200
-        
-        # Analyze patterns and generate alerts
-        patterns = analyze_user_patterns(recent_readings)
-        alerts = generate_predictive_alerts(user, patterns, language)
-        
-        return {
-            'alerts': alerts,
-            'patterns_summary': {
-                'total_readings': len(recent_readings),
-                'high_readings': patterns.get('high_readings_count', 0),
-                'low_readings': patterns.get('low_readings_count', 0),
-                'recent_trend': patterns.get('recent_trend', 'stable'),
-                'avg_pre_meal': patterns.get('avg_pre_meal'),
-                'avg_post_meal': patterns.get('avg_post_meal')
-            }
-        }, 200
+        return run_with_deadline('glucose_alerts', (user_id, language), glucose_alerts_payload, user_id, language)
 
 class MealPrediction(Resource):
+    @query_budget(1)
     @jwt_required()
     def post(self):
         """Get meal-specific predictions"""
+        from Glucose_predictor import get_meal_specific_predictions
         user_id = int(get_jwt_identity())
         data = request.get_json()
         
@@ -817,9 +977,11 @@ class MealPrediction(Resource):
         return {'predictions': predictions}, 200
 
 class FoodImpactPredictor(Resource):
+    @query_budget(1)
     @jwt_required()
     def post(self):
         """Predict how a specific food will impact user's glucose"""
+        from Glucose_predictor import analyze_user_patterns, get_food_impact_prediction
         user_id = int(get_jwt_identity())
         data = request.get_json()
         
@@ -845,17 +1007,87 @@ class FoodImpactPredictor(Resource):
         
         return {'prediction': prediction}, 200
 
+class RankedFoodImpact(Resource):
+    @query_budget(1)
+    @jwt_required()
+    def get(self):
+        """Estimated spike for every food, personalized once and ranked lowest first"""
+        from Glucose_predictor import analyze_user_patterns, rank_food_impacts
+        user_id = int(get_jwt_identity())
+        language = normalize_language(request.args.get('lang', 'en'))
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = max(1, min(request.args.get('per_page', 20, type=int), 100))
+        descending = request.args.get('order') == 'desc'
+        
+        facets = {f: request.args.get(f) for f in ('impact', 'category', 'gi_band')}
+        keys = FOOD_CATALOG.filter(**facets) if any(facets.values()) else None
+        
+        # One readings query and one pattern analysis for the whole catalog
+        from datetime import date, timedelta
+        cutoff_date = date.today() - timedelta(days=30)
+        recent_readings = Reading.query.filter(
+            Reading.user_id == user_id,
+            Reading.date >= cutoff_date
+        ).order_by(Reading.date.desc()).all()
+        
+        patterns = analyze_user_patterns(recent_readings) if recent_readings else None
+        ranked = rank_food_impacts(patterns, language, keys=keys, descending=descending)
+        
+        start = (page - 1) * per_page
+        return {
+            'foods': ranked[start:start + per_page],
+            'page': page,
+            'per_page': per_page,
+            'total': len(ranked),
+            'pages': (len(ranked) + per_page - 1) // per_page,
+            'personalized': patterns is not None
+        }, 200
+
+class MealGlycemicLoad(Resource):
+    @query_budget(0)
+    @jwt_required()
+    def post(self):
+        """Glycemic load for one plate ({items}) or many ({plates: [{id, items}]})"""
+        from glycemic_load import MAX_PLATES, parse_plate, score_plates
+        data = request.get_json() or {}
+        
+        if 'plates' in data:
+            plates = data['plates']
+            if not isinstance(plates, list) or not plates:
+                return {'error': 'plates must be a non-empty list'}, 400
+            if len(plates) > MAX_PLATES:
+                return {'error': f'at most {MAX_PLATES} plates per request'}, 400
+        elif 'items' in data:
+            plates = None
+        else:
+            return {'error': 'items or plates is required'}, 400
+        
+        try:
+            if plates is None:
+                return {'plate': score_plates([parse_plate(data['items'])])[0]}, 200
+            parsed = [parse_plate(p.get('items') if isinstance(p, dict) else None) for p in plates]
+            plate_ids = [p.get('id', n) for n, p in enumerate(plates)]
+            return {'plates': score_plates(parsed, plate_ids)}, 200
+        except ValueError as e:
+            return {'error': str(e)}, 400
+
 api.add_resource(GlucoseAlerts, '/glucose-alerts')
 api.add_resource(MealPrediction, '/meal-prediction')
 api.add_resource(FoodImpactPredictor, '/food-impact')
+api.add_resource(RankedFoodImpact, '/food-impact/ranked')
+api.add_resource(MealGlycemicLoad, '/meals/glycemic-load')
 
 # ---------------- Gamification System ----------------
 class UserProgress(Resource):
+    @query_budget(3)
     @jwt_required()
+    @read_replica
+    @conditional_get(today)
     def get(self):
         """Get user's gamification progress"""
+        from Gamification import BADGE_VIEWS, CHALLENGE_VIEWS, get_user_progress, check_badges, get_daily_challenges_status
         user_id = int(get_jwt_identity())
-        language = request.args.get('lang', 'en')
+        language = normalize_language(request.args.get('lang', 'en'))
         
         # Get user data
         readings = Reading.query.filter_by(user_id=user_id).all()
@@ -866,25 +1098,15 @@ class UserProgress(Resource):
         earned_badges = check_badges(readings)
         daily_status = get_daily_challenges_status(readings)
         
-        # Format badges with localized text
-        user_badges = []
-        for badge_id in earned_badges:
-            if badge_id in BADGES:
-                badge = BADGES[badge_id].copy()
-                badge['id'] = badge_id
-                badge['name'] = badge['name'][language]
-                badge['description'] = badge['description'][language]
-                user_badges.append(badge)
+        # Localized badges/challenges are precompiled; only per-user fields are added here
+        badge_views = view_for(BADGE_VIEWS, language)
+        challenge_views = view_for(CHALLENGE_VIEWS, language)
+        user_badges = [badge_views[badge_id] for badge_id in earned_badges if badge_id in badge_views]
         
-        # Format daily challenges
-        daily_challenges = []
-        for challenge_id, challenge_data in DAILY_CHALLENGES.items():
-            challenge = challenge_data.copy()
-            challenge['id'] = challenge_id
-            challenge['name'] = challenge['name'][language]
-            challenge['description'] = challenge['description'][language]
-            challenge['status'] = daily_status.get(challenge_id, {'completed': False, 'progress': 0})
-            daily_challenges.append(challenge)
+        daily_challenges = [
+            {**challenge, 'status': daily_status.get(challenge_id, {'completed': False, 'progress': 0})}
+            for challenge_id, challenge in challenge_views.items()
+        ]
         
         # Format level info
         level_info = progress['level']
@@ -901,15 +1123,8 @@ class UserProgress(Resource):
             'badges': user_badges,
             'daily_challenges': daily_challenges,
             'available_badges': [
-                {
-                    'id': badge_id,
-                    'name': badge_data['name'][language],
-                    'description': badge_data['description'][language],
-                    'icon': badge_data['icon'],
-                    'points': badge_data['points'],
-                    'earned': badge_id in earned_badges
-                }
-                for badge_id, badge_data in BADGES.items()
+                {**badge, 'earned': badge_id in earned_badges}
+                for badge_id, badge in badge_views.items()
             ]
         }, 200
 
@@ -918,172 +1133,220 @@ api.add_resource(UserProgress, '/user-progress')
 # ---------------- Enhanced Features ----------------
 
 # Dashboard endpoint
+def latest_reading_dict(user_id):
+    rows = READING_DICT_SERIALIZER.fetch(Reading.user_id == user_id, order_by=(Reading.date.desc(), Reading.time.desc()), limit=1)
+    return rows[0] if rows else None
+
+def recent_readings_section(user_id, series=False):
+    """Last 30 readings for the chart (series: oldest first, as parallel arrays)"""
+    recent_order = (Reading.date.desc(), Reading.time.desc())
+    if series:
+        return reading_series(Reading.user_id == user_id, order_by=recent_order, limit=30, reverse=True)
+    return READING_DICT_SERIALIZER.fetch(Reading.user_id == user_id, order_by=recent_order, limit=30)
+
+def flagged_readings_count(user_id):
+    return Reading.query.filter_by(user_id=user_id, is_flagged=True).count()
+
+def dashboard_payload(user, series=False, timings=None):
+    """Independent sections run concurrently; per-section ms go into timings if given"""
+    user_id = user.id
+    sections, section_timings = run_sections({
+        'glucose_trend': (get_glucose_trend, user_id, 30),
+        'latest_reading': (latest_reading_dict, user_id),
+        'recent_readings': (recent_readings_section, user_id, series),
+        'insights': (get_personalized_insights, user_id),
+        'flagged_count': (flagged_readings_count, user_id),
+    })
+    if timings is not None:
+        timings.update(section_timings)
+    
+    glucose_trend = sections['glucose_trend']
+    recent_readings = sections['recent_readings']
+    recent_count = len(recent_readings['t']) if series else len(recent_readings)
+    
+    return {
+        'user_profile': user.to_dict(),
+        'glucose_trend': glucose_trend,
+        'latest_reading': sections['latest_reading'],
+        'recent_readings': recent_readings,
+        'insights': sections['insights'],
+        'flagged_readings_count': sections['flagged_count'],
+        'summary_cards': {
+            'total_readings': recent_count,
+            'average_glucose': glucose_trend['average'],
+            'bmi': user.bmi,
+            'bmi_category': user.bmi_category
+        }
+    }
+
+def dashboard_job(user_id, series=False):
+    """dashboard_payload by id, for the deadline worker pool"""
+    user = get_user(user_id)
+    if not user:
+        return {'error': 'User not found'}, 404
+    timings = {}
+    payload = dashboard_payload(user, series, timings)
+    return payload, 200, {'Server-Timing': server_timing(timings)}
+
 class Dashboard(Resource):
+    @query_budget(20)
     @jwt_required()
+    @read_replica
+    @conditional_get(today, tips_version)
     def get(self):
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = get_user(user_id)
         
         if not user:
             return {'error': 'User not found'}, 404
         
-        # Get glucose trend
-        glucose_trend = get_glucose_trend(user_id, days=30)
-        
-        # Get latest reading
-        latest_reading = Reading.query.filter_by(user_id=user_id).order_by(
-            Reading.date.desc(), Reading.time.desc()
-        ).first()
-        
-        # Get recent readings for chart
-        recent_readings = Reading.query.filter_by(user_id=user_id).order_by(
-            Reading.date.desc(), Reading.time.desc()
-        ).limit(30).all()
-        
-        # Get personalized insights
-        insights = get_personalized_insights(user_id)
-        
-        # Get flagged readings count
-        flagged_count = Reading.query.filter_by(user_id=user_id, is_flagged=True).count()
-        
-        return {
-            'user_profile': user.to_dict(),
-            'glucose_trend': glucose_trend,
-            'latest_reading': latest_reading.to_dict() if latest_reading else None,
-            'recent_readings': [r.to_dict() for r in recent_readings],
-            'insights': insights,
-            'flagged_readings_count': flagged_count,
-            'summary_cards': {
-                'total_readings': len(recent_readings),
-                'average_glucose': glucose_trend['average'],
-                'bmi': user.bmi,
-                'bmi_category': user.bmi_category
-            }
-        }, 200
+        response_format = request.args.get('format')
+        if response_format and response_format != SERIES_FORMAT:
+            return {'error': f"format must be '{SERIES_FORMAT}'"}, 400
+        series = response_format == SERIES_FORMAT
+        return run_with_deadline('dashboard', (user_id, series), dashboard_job, user_id, series)
 
 # Educational Insights endpoint
+def educational_insights_payload(user_id, language='en'):
+    user = get_user(user_id)
+    try:
+        insights = get_personalized_insights(user_id)
+    except Exception as e:
+        return {'error': f'Failed to compute insights: {str(e)}'}, 400
+
+    # Latest reading and BMI category
+    latest_reading = get_latest_reading(user_id)
+    latest_status = latest_reading.glucose_status if latest_reading else None
+    bmi_cat = user.bmi_category if user else None
+
+    # Base recommendations by glucose status
+    status_recs = get_food_recommendations_by_status(latest_status) if latest_status else None
+
+    # Kenyan-local general recommendations by diabetes type
+    dtype = (user.diabetes_type or 'type2') if user else 'type2'
+    base_local = get_food_recommendations(dtype, language)
+
+    # Merge logic: start from status-based recs, then enrich with BMI-aware tips and local lists
+    recommended = []
+    avoid = []
+    tips = []
+
+    # From status recommendations (already Kenya-focused in our helper)
+    if status_recs:
+        recommended += status_recs.get('recommended', [])
+        avoid += status_recs.get('avoid', [])
+        if status_recs.get('tips'):
+            tips.append(status_recs['tips'])
+
+    # From base_local (a list of tip sentences for the diabetes type)
+    tips.extend(base_local)
+
+    # BMI-aware guidance
+    if bmi_cat == 'Overweight' or bmi_cat == 'Obese':
+        tips.append('Prefer high-fiber, low-GI staples (e.g., sukuma wiki, ndengu, terere, beans). Keep chapati/mandazi minimal; choose ugali wa mtama/brown rice in small portions.')
+        avoid += ['Fried snacks (samosa, bhajia) often', 'Sugary drinks', 'Large portions of white ugali/rice']
+    elif bmi_cat == 'Underweight':
+        tips.append('Include nutrient-dense foods to reach a healthy weight: add avocado, eggs, beans, groundnuts, and whole grains. Keep sugars controlled.')
+        recommended += ['Avocado', 'Eggs', 'Beans/ndengu', 'Groundnuts', 'Millet ugali']
+    elif bmi_cat == 'Normal weight':
+        tips.append('Maintain balance: non-starchy vegetables, lean proteins (fish, chicken), healthy fats, and whole grains.')
+
+    # De-duplicate while preserving order
+    def uniq(seq):
+        seen = set()
+        out = []
+        for x in seq:
+            if x not in seen:
+                seen.add(x)
+                out.append(x)
+        return out
+
+    food_recommendations = {
+        'recommended': uniq(recommended),
+        'avoid': uniq(avoid),
+        'tips': ' '.join(uniq(tips)) if tips else None,
+        'latest_status': latest_status,
+        'bmi_category': bmi_cat,
+    }
+
+    # Build detailed reasons/tags for UI "why" toggle
+    def reason_for(item: str, list_type: str):
+        lower = (item or '').lower()
+        # Heuristic keyword-based reasons
+        if any(k in lower for k in ['sukuma', 'kale', 'spinach', 'terere', 'managu', 'mboga']):
+            return {'reason_en': 'High fiber, low GI veggie; supports glucose control', 'reason_sw': 'Nyuzinyuzi nyingi, GI ya chini; husaidia kudhibiti sukari', 'tags': ['high-fiber','low-GI','veggies']}
+        if any(k in lower for k in ['bean', 'ndengu', 'lentil', 'pojo']):
+            return {'reason_en': 'Protein and fiber; slower glucose rise', 'reason_sw': 'Protini na nyuzinyuzi; hupunguza kasi ya kupanda kwa sukari', 'tags': ['protein','fiber','low-GI']}
+        if 'avocado' in lower:
+            return {'reason_en': 'Healthy fats; increases satiety', 'reason_sw': 'Mafuta mazuri; hukutosheleza', 'tags': ['healthy-fats']}
+        if any(k in lower for k in ['egg','mayai']):
+            return {'reason_en': 'Lean protein; minimal impact on glucose', 'reason_sw': 'Protini konda; athari ndogo kwa sukari', 'tags': ['protein']}
+        if any(k in lower for k in ['millet', 'mtama']):
+            return {'reason_en': 'Whole grain option; lower GI than refined ugali', 'reason_sw': 'Nafaka kamili; GI ya chini kuliko ugali mweupe', 'tags': ['whole-grain','lower-GI']}
+        if 'brown rice' in lower or 'brown' in lower:
+            return {'reason_en': 'Higher fiber than white rice; steadier glucose', 'reason_sw': 'Nyuzinyuzi zaidi kuliko wali mweupe; sukari tulivu', 'tags': ['higher-fiber','lower-GI']}
+        if any(k in lower for k in ['sugary', 'soda', 'juice', 'sweet']):
+            return {'reason_en': 'Rapid glucose spike; avoid especially with high readings', 'reason_sw': 'Huinua sukari haraka; epuka hasa ikiwa juu', 'tags': ['high-sugar']}
+        if any(k in lower for k in ['white ugali', 'white rice', 'chapati', 'mandazi']):
+            return {'reason_en': 'Refined carb; higher GI and portion-sensitive', 'reason_sw': 'Wanga uliosafishwa; GI ya juu na nyeti kwa kiasi', 'tags': ['refined-carb','high-GI']}
+        if any(k in lower for k in ['fried', 'bhajia', 'samosa', 'chips']):
+            return {'reason_en': 'Fried/refined; may worsen insulin resistance', 'reason_sw': 'Vyakula vya kukaanga/ulosafishwa; vinaweza kuongeza usugu wa insulini', 'tags': ['fried','refined']}
+        # Fallback generic reasons
+        return {'reason_en': 'Generally aligned with your current plan', 'reason_sw': 'Kwa ujumla inaendana na mpango wako wa sasa', 'tags': []}
+
+    food_recommendations['recommended_detailed'] = [
+        {'item': it, **reason_for(it, 'recommended')} for it in food_recommendations['recommended']
+    ]
+    food_recommendations['avoid_detailed'] = [
+        {'item': it, **reason_for(it, 'avoid')} for it in food_recommendations['avoid']
+    ]
+
+    return {
+        'insights': insights,
+        'food_recommendations': food_recommendations
+    }, 200
+
 class EducationalInsights(Resource):
+    @query_budget(7)
     @jwt_required()
+    @read_replica
+    @conditional_get(today, tips_version)
     def get(self):
         try:
             user_id = int(get_jwt_identity())
         except Exception:
             return {'error': 'Invalid token identity'}, 401
-        user = User.query.get(user_id)
-        try:
-            insights = get_personalized_insights(user_id)
-        except Exception as e:
-            return {'error': f'Failed to compute insights: {str(e)}'}, 400
-
         # Determine language if provided (default en)
         language = request.args.get('lang', 'en')
+        return run_with_deadline('educational_insights', (user_id, language), educational_insights_payload, user_id, language)
 
-        # Latest reading and BMI category
-        latest_reading = Reading.query.filter_by(user_id=user_id).order_by(
-            Reading.date.desc(), Reading.time.desc()
-        ).first()
-        latest_status = latest_reading.glucose_status if latest_reading else None
-        bmi_cat = user.bmi_category if user else None
-
-        # Base recommendations by glucose status
-        status_recs = get_food_recommendations_by_status(latest_status) if latest_status else None
-
-        # Kenyan-local general recommendations by diabetes type
-        dtype = (user.diabetes_type or 'type2') if user else 'type2'
-        base_local = get_food_recommendations(dtype, language)
-
-        # Merge logic: start from status-based recs, then enrich with BMI-aware tips and local lists
-        recommended = []
-        avoid = []
-        tips = []
-
-        # From status recommendations (already Kenya-focused in our helper)
-        if status_recs:
-            recommended += status_recs.get('recommended', [])
-            avoid += status_recs.get('avoid', [])
-            if status_recs.get('tips'):
-                tips.append(status_recs['tips'])
-
-        # From base_local
-        if base_local:
-            recommended += base_local.get('recommended', [])
-            avoid += base_local.get('avoid', [])
-            if base_local.get('tips'):
-                tips.append(base_local['tips'])
-
-        # BMI-aware guidance
-        if bmi_cat == 'Overweight' or bmi_cat == 'Obese':
-            tips.append('Prefer high-fiber, low-GI staples (e.g., sukuma wiki, ndengu, terere, beans). Keep chapati/mandazi minimal; choose ugali wa mtama/brown rice in small portions.')
-            avoid += ['Fried snacks (samosa, bhajia) often', 'Sugary drinks', 'Large portions of white ugali/rice']
-        elif bmi_cat == 'Underweight':
-            tips.append('Include nutrient-dense foods to reach a healthy weight: add avocado, eggs, beans, groundnuts, and whole grains. Keep sugars controlled.')
-            recommended += ['Avocado', 'Eggs', 'Beans/ndengu', 'Groundnuts', 'Millet ugali']
-        elif bmi_cat == 'Normal weight':
-            tips.append('Maintain balance: non-starchy vegetables, lean proteins (fish, chicken), healthy fats, and whole grains.')
-
-        # De-duplicate while preserving order
-        def uniq(seq):
-            seen = set()
-            out = []
-            for x in seq:
-                if x not in seen:
-                    seen.add(x)
-                    out.append(x)
-            return out
-
-        food_recommendations = {
-            'recommended': uniq(recommended),
-            'avoid': uniq(avoid),
-            'tips': ' '.join(uniq(tips)) if tips else None,
-            'latest_status': latest_status,
-            'bmi_category': bmi_cat,
-        }
-
-        # Build detailed reasons/tags for UI "why" toggle
-        def reason_for(item: str, list_type: str):
-            lower = (item or '').lower()
-            # Heuristic keyword-based reasons
-            if any(k in lower for k in ['sukuma', 'kale', 'spinach', 'terere', 'managu', 'mboga']):
-                return {'reason_en': 'High fiber, low GI veggie; supports glucose control', 'reason_sw': 'Nyuzinyuzi nyingi, GI ya chini; husaidia kudhibiti sukari', 'tags': ['high-fiber','low-GI','veggies']}
-            if any(k in lower for k in ['bean', 'ndengu', 'lentil', 'pojo']):
-                return {'reason_en': 'Protein and fiber; slower glucose rise', 'reason_sw': 'Protini na nyuzinyuzi; hupunguza kasi ya kupanda kwa sukari', 'tags': ['protein','fiber','low-GI']}
-            if 'avocado' in lower:
-                return {'reason_en': 'Healthy fats; increases satiety', 'reason_sw': 'Mafuta mazuri; hukutosheleza', 'tags': ['healthy-fats']}
-            if any(k in lower for k in ['egg','mayai']):
-                return {'reason_en': 'Lean protein; minimal impact on glucose', 'reason_sw': 'Protini konda; athari ndogo kwa sukari', 'tags': ['protein']}
-            if any(k in lower for k in ['millet', 'mtama']):
-                return {'reason_en': 'Whole grain option; lower GI than refined ugali', 'reason_sw': 'Nafaka kamili; GI ya chini kuliko ugali mweupe', 'tags': ['whole-grain','lower-GI']}
-            if 'brown rice' in lower or 'brown' in lower:
-                return {'reason_en': 'Higher fiber than white rice; steadier glucose', 'reason_sw': 'Nyuzinyuzi zaidi kuliko wali mweupe; sukari tulivu', 'tags': ['higher-fiber','lower-GI']}
-            if any(k in lower for k in ['sugary', 'soda', 'juice', 'sweet']):
-                return {'reason_en': 'Rapid glucose spike; avoid especially with high readings', 'reason_sw': 'Huinua sukari haraka; epuka hasa ikiwa juu', 'tags': ['high-sugar']}
-            if any(k in lower for k in ['white ugali', 'white rice', 'chapati', 'mandazi']):
-                return {'reason_en': 'Refined carb; higher GI and portion-sensitive', 'reason_sw': 'Wanga uliosafishwa; GI ya juu na nyeti kwa kiasi', 'tags': ['refined-carb','high-GI']}
-            if any(k in lower for k in ['fried', 'bhajia', 'samosa', 'chips']):
-                return {'reason_en': 'Fried/refined; may worsen insulin resistance', 'reason_sw': 'Vyakula vya kukaanga/ulosafishwa; vinaweza kuongeza usugu wa insulini', 'tags': ['fried','refined']}
-            # Fallback generic reasons
-            return {'reason_en': 'Generally aligned with your current plan', 'reason_sw': 'Kwa ujumla inaendana na mpango wako wa sasa', 'tags': []}
-
-        food_recommendations['recommended_detailed'] = [
-            {'item': it, **reason_for(it, 'recommended')} for it in food_recommendations['recommended']
-        ]
-        food_recommendations['avoid_detailed'] = [
-            {'item': it, **reason_for(it, 'avoid')} for it in food_recommendations['avoid']
-        ]
-
-        return {
-            'insights': insights,
-            'food_recommendations': food_recommendations
-        }, 200
+# Educational tips catalog, served from the in-memory snapshot
+class EducationalTips(Resource):
+    @query_budget(0)
+    def get(self):
+        catalog = tip_catalog()
+        tips = catalog.select(
+            condition=request.args.get('condition'),
+            category=request.args.get('category'),
+            priority=request.args.get('priority'),
+        )
+        return {'tips': tips, 'version': catalog.version, 'source': catalog.source}, 200
 
 # Reminders endpoint
 class Reminders(Resource):
+    @query_budget(2)
     @jwt_required()
+    @conditional_get()
     def get(self):
-        user_id = get_jwt_identity()
-        reminders = Reminder.query.filter_by(user_id=user_id, is_active=True).all()
-        return {'reminders': [r.to_dict() for r in reminders]}, 200
+        user_id = int(get_jwt_identity())
+        try:
+            serializer = REMINDER_SERIALIZER.sparse(request.args.get('fields'))
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        reminders = serializer.fetch(Reminder.user_id == user_id, Reminder.is_active == True)
+        return {'reminders': reminders}, 200
     
+    @query_budget(3)
     @jwt_required()
     def post(self):
         user_id = get_jwt_identity()
@@ -1108,6 +1371,7 @@ class Reminders(Resource):
             return {'error': str(e)}, 400
 
 class ReminderById(Resource):
+    @query_budget(4)
     @jwt_required()
     def put(self, id):
         user_id = get_jwt_identity()
@@ -1132,6 +1396,7 @@ class ReminderById(Resource):
             db.session.rollback()
             return {'error': str(e)}, 400
     
+    @query_budget(4)
     @jwt_required()
     def patch(self, id):
         """Partial update of a reminder. Non-breaking addition for rubric PATCH requirement."""
@@ -1162,6 +1427,7 @@ class ReminderById(Resource):
             db.session.rollback()
             return {'error': str(e)}, 400
     
+    @query_budget(3)
     @jwt_required()
     def delete(self, id):
         user_id = get_jwt_identity()
@@ -1180,6 +1446,7 @@ class ReminderById(Resource):
 
 # Doctor Messages endpoint
 class DoctorMessages(Resource):
+    @query_budget(2)
     @jwt_required()
     def get(self):
         user_id = get_jwt_identity()
@@ -1188,13 +1455,19 @@ class DoctorMessages(Resource):
         if not user or not user.doctor_id:
             return {'error': 'No assigned doctor found'}, 404
         
-        messages = DoctorMessage.query.filter_by(
-            user_id=user_id, 
-            doctor_id=user.doctor_id
-        ).order_by(DoctorMessage.created_at.desc()).limit(50).all()
+        try:
+            serializer = DOCTOR_MESSAGE_SERIALIZER.sparse(request.args.get('fields'))
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        messages = serializer.fetch(
+            DoctorMessage.user_id == user.id,
+            DoctorMessage.doctor_id == user.doctor_id,
+            order_by=(DoctorMessage.created_at.desc(),), limit=50
+        )
         
-        return {'messages': [m.to_dict() for m in messages]}, 200
+        return {'messages': messages}, 200
     
+    @query_budget(3)
     @jwt_required()
     def post(self):
         user_id = get_jwt_identity()
@@ -1223,6 +1496,7 @@ class DoctorMessages(Resource):
 
 # Enhanced User Profile endpoint
 class EnhancedUserProfile(Resource):
+    @query_budget(7)
     @jwt_required()
     def put(self):
         user_id = get_jwt_identity()
@@ -1270,6 +1544,7 @@ class EnhancedUserProfile(Resource):
 
 # Enhanced Readings with validation
 class EnhancedReadings(Resource):
+    @query_budget(6)
     @jwt_required()
     def post(self):
         user_id = get_jwt_identity()
@@ -1305,26 +1580,157 @@ class EnhancedReadings(Resource):
             return {'error': str(e)}, 400
 
 # BMI History endpoint
+def bmi_history_payload(user_id, limit=20, serializer=BMI_SNAPSHOT_SERIALIZER):
+    snapshots = serializer.fetch(BMISnapshot.user_id == user_id, order_by=(BMISnapshot.created_at.desc(),), limit=limit)
+    return {'history': snapshots}
+
 class BMIHistory(Resource):
+    @query_budget(2)
     @jwt_required()
+    @conditional_get()
     def get(self):
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         limit = int(request.args.get('limit', 20))
-        snapshots = BMISnapshot.query.filter_by(user_id=user_id).order_by(BMISnapshot.created_at.desc()).limit(limit).all()
-        return {'history': [s.to_dict() for s in snapshots]}, 200
+        try:
+            serializer = BMI_SNAPSHOT_SERIALIZER.sparse(request.args.get('fields'))
+        except ValueError as e:
+            return {'error': str(e)}, 400
+        return bmi_history_payload(user_id, limit, serializer), 200
+
+# Full-text search across the caller's notes/messages plus shared tips and foods
+class Search(Resource):
+    @query_budget(4)
+    @jwt_required()
+    def get(self):
+        user_id = int(get_jwt_identity())
+        if not search_available():
+            return {'error': 'Full-text search is not available on this database'}, 501
+        q = fts_query(request.args.get('q'))
+        if not q:
+            return {'error': 'q query param is required'}, 400
+        requested = request.args.get('types')
+        types = [t for t in requested.split(',') if t in SEARCH_TYPES] if requested else list(SEARCH_TYPES)
+        limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+        language = normalize_language(request.args.get('lang', 'en'))
+        
+        results = {}
+        if 'readings' in types:
+            results['readings'] = search_readings(q, user_id, limit)
+        if 'messages' in types:
+            results['messages'] = search_messages(q, user_id, limit)
+        if 'tips' in types:
+            results['tips'] = search_tips(q, limit)
+        if 'foods' in types:
+            results['foods'] = search_foods(q, limit, view_for(FOOD_VIEWS, language))
+        return {'query': request.args.get('q'), 'results': results}, 200
+
+# Coalescing counters for the single-flight layer (calls, executions, coalesced, errors)
+class SingleFlightStats(Resource):
+    @query_budget(1)
+    @jwt_required()
+    @admin_required
+    def get(self):
+        return SINGLE_FLIGHT.stats(), 200
+
+# Slowest statements from the slow-query log, grouped by normalized SQL
+class SlowQueries(Resource):
+    SORTS = ('total_ms', 'count', 'max_ms', 'avg_ms')
+
+    @query_budget(1)
+    @jwt_required()
+    @admin_required
+    def get(self):
+        sort = request.args.get('sort', 'total_ms')
+        if sort not in self.SORTS:
+            return {'error': f"sort must be one of: {', '.join(self.SORTS)}"}, 400
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        return {
+            'threshold_ms': (current_app.config.get('SLOW_QUERY_SECONDS') or 0) * 1000 or None,
+            'queries': top_offenders(current_app, limit, sort),
+        }, 200
+
+# Results of requests profiled with the X-Profile header
+class Profiles(Resource):
+    @query_budget(1)
+    @jwt_required()
+    @admin_required
+    def get(self):
+        return {'profiles': list_profiles(current_app)}, 200
+
+class ProfileById(Resource):
+    @query_budget(1)
+    @jwt_required()
+    @admin_required
+    def get(self, profile_id):
+        meta = load_profile(current_app, profile_id)
+        if not meta:
+            return {'error': 'Profile not found'}, 404
+        if meta['kind'] != 'cpu':
+            return meta, 200
+        # ?format=pstats downloads the raw file for snakeviz / pstats.Stats
+        if request.args.get('format') == 'pstats':
+            return send_file(pstats_path(current_app, profile_id), mimetype='application/octet-stream',
+                             as_attachment=True, download_name=f'{profile_id}.prof')
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in PSTATS_SORTS:
+            return {'error': f"sort must be one of: {', '.join(PSTATS_SORTS)}"}, 400
+        limit = max(1, min(request.args.get('limit', 40, type=int), 500))
+        return {**meta, 'stats': pstats_text(current_app, profile_id, sort, limit)}, 200
+
+# Composite first-screen payload: one round trip instead of six
+BOOTSTRAP_SECTIONS = {
+    'session': lambda user, language: (session_payload(user), 200),
+    'bmi': lambda user, language: bmi_payload(user),
+    'bmi_history': lambda user, language: (bmi_history_payload(user.id), 200),
+    'doctors': lambda user, language: (doctors_payload(), 200),
+    'dashboard': lambda user, language: (dashboard_payload(user), 200),
+    'educational_insights': lambda user, language: educational_insights_payload(user.id, language),
+}
+
+class Bootstrap(Resource):
+    @query_budget(22)
+    @jwt_required()
+    @conditional_get(today, tips_version, doctors_version)
+    def get(self):
+        user = get_user(get_jwt_identity())
+        if not user:
+            return {'error': 'User not found'}, 404
+        requested = request.args.get('sections')
+        sections = [s.strip() for s in requested.split(',') if s.strip()] if requested else list(BOOTSTRAP_SECTIONS)
+        unknown = [s for s in sections if s not in BOOTSTRAP_SECTIONS]
+        if unknown:
+            return {'error': f"Unknown sections: {', '.join(unknown)}", 'allowed': list(BOOTSTRAP_SECTIONS)}, 400
+        language = request.args.get('lang', 'en')
+        
+        result = {}
+        errors = {}
+        for name in sections:
+            payload, status = BOOTSTRAP_SECTIONS[name](user, language)
+            if status == 200:
+                result[name] = payload
+            else:
+                errors[name] = payload
+        if errors:
+            result['errors'] = errors
+        return result, 200
 
 # Register new endpoints
 api.add_resource(Dashboard, '/dashboard')
 api.add_resource(EducationalInsights, '/educational-insights')
+api.add_resource(EducationalTips, '/educational-tips')
 api.add_resource(Reminders, '/reminders')
 api.add_resource(ReminderById, '/reminders/<int:id>')
 api.add_resource(DoctorMessages, '/doctor-messages')
 api.add_resource(EnhancedUserProfile, '/profile/enhanced')
 api.add_resource(EnhancedReadings, '/readings/enhanced')
 api.add_resource(BMIHistory, '/bmi-history')
+api.add_resource(Search, '/search')
+api.add_resource(Bootstrap, '/bootstrap')
+api.add_resource(SingleFlightStats, '/stats/single-flight')
+api.add_resource(SlowQueries, '/admin/slow-queries')
+api.add_resource(Profiles, '/admin/profiles')
+api.add_resource(ProfileById, '/admin/profiles/<string:profile_id>')
 
 if __name__ == '__main__':
-    with app.app_context():
-        db.create_all()  # Create database tables
-        print("Database tables created!")
-    app.run(host='0.0.0.0', port=5555, debug=True)
+    # Tables come from `flask init-db`; see wsgi.py for the production entrypoint
+    create_app().run(host='0.0.0.0', port=5555, debug=True)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Worker cold start: fresh interpreters timing app construction and first requests
+Each sample is a new process, so imports, app setup and first-request work
+(lazy imports, precompressed bodies) are all paid again
+
+Run from server/: python benchmarks/bench_cold_start.py --samples 10
+Compare another checkout: --root ../other/server --build "from app import app"
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SERVER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child process; prints one JSON sample
+CHILD = '''
+import json, sys, time
+sys.path.insert(0, '.')
+start = time.perf_counter()
+{build}
+ready = time.perf_counter()
+client = app.test_client()
+first = {{}}
+for path in {paths!r}:
+    t = time.perf_counter()
+    client.get(path)
+    first[path] = (time.perf_counter() - t) * 1000
+print(json.dumps({{
+    'create_app_ms': (ready - start) * 1000,
+    'first_request_ms': first,
+    'modules': len(sys.modules),
+    'numpy_loaded': 'numpy' in sys.modules,
+}}))
+'''
+
+def sample(root, build, paths):
+    code = CHILD.format(build=build, paths=paths)
+    out = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True, text=True, check=True).stdout
+    # Startup prints (if any) come before the sample
+    return json.loads(out[out.rindex('\n{') + 1:] if '\n{' in out else out)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--samples', type=int, default=10)
+    parser.add_argument('--root', default=SERVER, help='server directory to run from')
+    parser.add_argument('--build', default='from wsgi import app', help='statement that leaves a Flask app in `app`')
+    parser.add_argument('--paths', default='/,/kenyan-foods', help='comma-separated first requests')
+    args = parser.parse_args()
+
+    paths = [p for p in args.paths.split(',') if p]
+    samples = [sample(args.root, args.build, paths) for _ in range(args.samples)]
+    create = [s['create_app_ms'] for s in samples]
+    print(json.dumps({
+        'build': args.build,
+        'samples': args.samples,
+        'create_app_ms': {'median': round(statistics.median(create), 1), 'min': round(min(create), 1)},
+        'first_request_ms': {p: round(statistics.median(s['first_request_ms'][p] for s in samples), 1) for p in paths},
+        'modules': samples[-1]['modules'],
+        'numpy_loaded': samples[-1]['numpy_loaded'],
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Dashboard wall-clock time with sections run sequentially vs on the thread pool
+--latency-ms adds a sleep before every SQL statement to model a networked
+database; with local SQLite the sections are mostly CPU and GIL bound
+
+Run from server/: python benchmarks/bench_dashboard.py --readings 5000 --latency-ms 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from bench_serialization import create_user, drop_user
+
+from wsgi import app
+from app import dashboard_payload
+from lookups import get_user
+
+def run(user_id, workers, repeat):
+    app.config['SECTION_WORKERS'] = workers
+    samples, timings = [], {}
+    for _ in range(repeat):
+        with app.test_request_context():
+            start = time.perf_counter()
+            dashboard_payload(get_user(user_id), timings=timings)
+            samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'median_ms': round(statistics.median(samples), 1),
+        'min_ms': round(min(samples), 1),
+        'last_sections_ms': {name: round(ms, 1) for name, ms in timings.items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readings', type=int, default=5000)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--repeat', type=int, default=15)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    def add_latency(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(args.latency_ms / 1000)
+
+    with app.app_context():
+        user_id = create_user(args.readings)
+    try:
+        if args.latency_ms:
+            event.listen(Engine, 'before_cursor_execute', add_latency)
+        results = {
+            'sequential': run(user_id, 1, args.repeat),
+            'parallel': run(user_id, args.workers, args.repeat),
+        }
+    finally:
+        if args.latency_ms:
+            event.remove(Engine, 'before_cursor_execute', add_latency)
+        with app.app_context():
+            drop_user(user_id)
+    results['speedup'] = round(results['sequential']['median_ms'] / results['parallel']['median_ms'], 2)
+    print(json.dumps({'readings': args.readings, 'latency_ms': args.latency_ms, 'workers': args.workers, **results}, indent=2))
+
+if __name__ == '__main__':
+    main()
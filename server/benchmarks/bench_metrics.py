@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Per-request cost of the /metrics instrumentation (metrics.py)
+Times the same requests through the test client with METRICS_ENABLED off and
+on, alternating rounds so drift hits both equally. The SQL hooks are global
+to SQLAlchemy once metrics.py is imported, so the "off" app still pays for
+those; the difference shown is the request hooks and histogram updates
+
+Run from server/: python benchmarks/bench_metrics.py --requests 2000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+
+from config import create_app, db
+from init_db import init_database
+from models import User
+
+PATHS = ('/kenyan-foods', '/readings?fields=id,value', '/me/bmi')
+
+def build(enabled, path):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{path}', 'METRICS_ENABLED': enabled})
+    with app.app_context():
+        init_database()
+        user = User(name='Bench', email=f'bench-{uuid.uuid4().hex}@example.com', diabetes_type='type2', height_cm=170, weight_kg=80)
+        user.password_hash = 'bench'
+        db.session.add(user)
+        db.session.commit()
+        headers = {'Authorization': 'Bearer ' + create_access_token(identity=str(user.id))}
+    return app, headers
+
+def run(app, headers, count):
+    client = app.test_client()
+    start = time.perf_counter()
+    for i in range(count):
+        response = client.get(PATHS[i % len(PATHS)], headers=headers)
+        assert response.status_code == 200, response.status_code
+    return (time.perf_counter() - start) / count * 1e6
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        apps = {
+            'off': build(False, os.path.join(tmp, 'off.db')),
+            'on': build(True, os.path.join(tmp, 'on.db')),
+        }
+        timings = {name: [] for name in apps}
+        for name, (app, headers) in apps.items():
+            run(app, headers, 200)  # warm up
+        for _ in range(args.rounds):
+            for name, (app, headers) in apps.items():
+                timings[name].append(run(app, headers, args.requests))
+
+    off, on = statistics.median(timings['off']), statistics.median(timings['on'])
+    print(json.dumps({
+        'requests_per_round': args.requests,
+        'rounds': args.rounds,
+        'us_per_request': {'metrics_off': round(off, 1), 'metrics_on': round(on, 1)},
+        'overhead_us': round(on - off, 1),
+        'overhead_pct': round((on - off) / off * 100, 1),
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for /readings and /dashboard
+Compares the previous encoders (flask-restful's json.dumps, app.json indented)
+with the fast encoder, and bytes sent identity / gzip / brotli / msgpack,
+for the default list format and ?format=series
+
+Run from server/: python benchmarks/bench_serialization.py --readings 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import uuid
+from datetime import date, timedelta, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+
+from wsgi import app
+from config import db
+from models import User, Reading, UserDataVersion
+from serialization import ENCODINGS, compress, dumps, msgpack, orjson
+
+def create_user(n_readings):
+    # Nothing creates tables on import any more; a fresh checkout has none
+    db.create_all()
+    user = User(name='Benchmark', email=f'bench-{uuid.uuid4().hex}@example.com', diabetes_type='type2', height_cm=170, weight_kg=80)
+    user.password_hash = 'benchmark'
+    db.session.add(user)
+    db.session.flush()
+    start = date.today() - timedelta(days=n_readings // 4)
+    db.session.add_all([
+        Reading(
+            user_id=user.id, value=80 + (i * 37) % 180, date=start + timedelta(days=i // 4),
+            time=time(7 + (i % 4) * 4, 15), context=('pre_meal', 'post_meal')[i % 2],
+            notes='after chapati' if i % 5 == 0 else None,
+        )
+        for i in range(n_readings)
+    ])
+    db.session.commit()
+    return user.id
+
+def drop_user(user_id):
+    Reading.query.filter_by(user_id=user_id).delete()
+    db.session.query(UserDataVersion).filter_by(user_id=user_id).delete()
+    db.session.delete(db.session.get(User, user_id))
+    db.session.commit()
+
+def measure(name, payload, number):
+    encoders = {
+        'json.dumps (flask-restful default)': lambda: json.dumps(payload).encode(),
+        'json.dumps indent=2 (app.json, compact=False)': lambda: json.dumps(payload, indent=2).encode(),
+        f"fast dumps ({'orjson' if orjson else 'stdlib json'})": lambda: dumps(payload),
+    }
+    times = {label: min(timeit.repeat(fn, number=number, repeat=5)) / number * 1000 for label, fn in encoders.items()}
+    compact = dumps(payload)
+    sizes = {
+        'indented': len(json.dumps(payload, indent=2).encode()),
+        'json.dumps': len(json.dumps(payload).encode()),
+        'compact': len(compact),
+    }
+    for encoding in ENCODINGS:
+        sizes[f'compact+{encoding}'] = len(compress(compact, encoding))
+    if msgpack is not None:
+        packed = msgpack.packb(payload)
+        sizes['msgpack'] = len(packed)
+        for encoding in ENCODINGS:
+            sizes[f'msgpack+{encoding}'] = len(compress(packed, encoding))
+    return {'endpoint': name, 'encode_ms': {k: round(v, 3) for k, v in times.items()}, 'bytes': sizes}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readings', type=int, default=1000)
+    parser.add_argument('--number', type=int, default=20, help='encodes per timing run')
+    args = parser.parse_args()
+
+    with app.app_context():
+        user_id = create_user(args.readings)
+        try:
+            client = app.test_client()
+            headers = {'Authorization': 'Bearer ' + create_access_token(identity=str(user_id))}
+            results = [
+                measure(path, client.get(path, headers=headers).get_json(), args.number)
+                for path in ('/readings', '/readings?format=series', '/dashboard', '/dashboard?format=series')
+            ]
+        finally:
+            drop_user(user_id)
+    print(json.dumps({'readings': args.readings, 'results': results}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Compiled row serializers vs ORM + marshmallow / to_dict on a large reading list
+Checks the outputs are identical, then times fetch+dump and dump alone
+
+Run from server/: python benchmarks/bench_serializers.py --readings 10000
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_serialization import create_user, drop_user
+
+from wsgi import app
+from config import db
+from models import Reading
+from schema import ReadingSchema
+from serializers import READING_SERIALIZER, READING_DICT_SERIALIZER
+
+def best_ms(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readings', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    readings_schema = ReadingSchema(many=True)
+    with app.app_context():
+        user_id = create_user(args.readings)
+        try:
+            order = (Reading.date, Reading.time)
+
+            def orm_rows():
+                db.session.expunge_all()
+                return Reading.query.filter_by(user_id=user_id).order_by(*order).all()
+
+            def core_rows():
+                return db.session.execute(READING_SERIALIZER.select().where(Reading.user_id == user_id).order_by(*order)).all()
+
+            def dict_rows():
+                return db.session.execute(READING_DICT_SERIALIZER.select().where(Reading.user_id == user_id).order_by(*order)).all()
+
+            objects, rows, d_rows = orm_rows(), core_rows(), dict_rows()
+            assert readings_schema.dump(objects) == READING_SERIALIZER.dump(rows)
+            assert [r.to_dict() for r in objects] == READING_DICT_SERIALIZER.dump(d_rows)
+
+            cases = {
+                'marshmallow dump (ORM objects)': lambda: readings_schema.dump(objects),
+                'compiled dump (Core rows)': lambda: READING_SERIALIZER.dump(rows),
+                'to_dict (ORM objects)': lambda: [r.to_dict() for r in objects],
+                'compiled to_dict equivalent (Core rows)': lambda: READING_DICT_SERIALIZER.dump(d_rows),
+                'ORM query + marshmallow': lambda: readings_schema.dump(orm_rows()),
+                'Core query + compiled': lambda: READING_SERIALIZER.fetch(Reading.user_id == user_id, order_by=order),
+                'ORM query + to_dict': lambda: [r.to_dict() for r in orm_rows()],
+                'Core query + compiled to_dict': lambda: READING_DICT_SERIALIZER.fetch(Reading.user_id == user_id, order_by=order),
+            }
+            timings = {label: round(best_ms(fn, args.repeat), 2) for label, fn in cases.items()}
+        finally:
+            db.session.rollback()
+            drop_user(user_id)
+
+    def speedup(old, new):
+        return round(timings[old] / timings[new], 1)
+
+    print(json.dumps({
+        'readings': args.readings,
+        'ms': timings,
+        'speedup': {
+            'dump vs marshmallow': speedup('marshmallow dump (ORM objects)', 'compiled dump (Core rows)'),
+            'dump vs to_dict': speedup('to_dict (ORM objects)', 'compiled to_dict equivalent (Core rows)'),
+            'query+dump vs ORM+marshmallow': speedup('ORM query + marshmallow', 'Core query + compiled'),
+            'query+dump vs ORM+to_dict': speedup('ORM query + to_dict', 'Core query + compiled to_dict'),
+        },
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
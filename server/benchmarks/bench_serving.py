@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Throughput of the Flask dev server vs gunicorn with gunicorn.conf.py
+Each mode is started on the same port and hit by --clients keep-alive
+connections for --seconds with a mix of authenticated API requests
+
+Run from server/: python benchmarks/bench_serving.py --clients 16 --seconds 15
+"""
+
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+SERVER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER)
+
+from flask_jwt_extended import create_access_token
+
+from bench_serialization import create_user, drop_user
+
+from wsgi import app
+
+MODES = {
+    # What render.yaml used to run: app.run(debug=True), reloader and debugger on
+    'dev': [sys.executable, 'wsgi.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'],
+}
+PATHS = ('/readings?limit=50', '/dashboard', '/kenyan-foods', '/user-progress', '/medications', '/check_session')
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on :{port} did not come up')
+
+def client(port, headers, stop, latencies, statuses, offset):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    i = offset
+    while not stop.is_set():
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as exc:
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            status = f"error {type(exc).__name__}"
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses[status] = statuses.get(status, 0) + 1
+    conn.close()
+
+def run(mode, port, token, clients, seconds):
+    env = dict(os.environ, PORT=str(port), GUNICORN_ACCESS_LOG='')
+    process = subprocess.Popen(MODES[mode], cwd=SERVER, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(port)
+        headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'}
+        stop = threading.Event()
+        latencies, statuses = [], {}
+        threads = [
+            threading.Thread(target=client, args=(port, headers, stop, latencies, statuses, n))
+            for n in range(clients)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+    finally:
+        process.terminate()
+        process.wait(timeout=40)
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / seconds, 1),
+        'p50_ms': round(statistics.median(latencies), 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)], 1),
+        'p99_ms': round(latencies[int(len(latencies) * 0.99)], 1),
+        'statuses': {str(k): v for k, v in statuses.items()},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--readings', type=int, default=500)
+    parser.add_argument('--port', type=int, default=5599)
+    parser.add_argument('--modes', default='dev,gunicorn')
+    args = parser.parse_args()
+
+    with app.app_context():
+        user_id = create_user(args.readings)
+        token = create_access_token(identity=str(user_id))
+    try:
+        results = {mode: run(mode, args.port, token, args.clients, args.seconds) for mode in args.modes.split(',')}
+    finally:
+        with app.app_context():
+            drop_user(user_id)
+    if 'dev' in results and 'gunicorn' in results:
+        results['speedup'] = round(results['gunicorn']['rps'] / results['dev']['rps'], 2)
+    print(json.dumps({'cpus': os.cpu_count(), 'clients': args.clients, 'seconds': args.seconds, **results}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Concurrent mixed read/write stress test for the SQLite engine profile
+Runs the same workload against a fresh database file twice: with SQLite's
+defaults (rollback journal, default pool) and with the production profile
+(Config.SQLITE_PRAGMAS and SQLALCHEMY_ENGINE_OPTIONS); reports throughput
+and "database is locked" failures for each
+
+Run from server/: python benchmarks/bench_sqlite_concurrency.py --threads 16 --seconds 10
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+
+from config import create_app, db
+from init_db import init_database
+from models import User
+from sqlite_profile import read_pragmas
+
+PROFILES = {
+    'defaults': {'SQLITE_PRAGMAS': None, 'SQLALCHEMY_ENGINE_OPTIONS': {}},
+    'production': {},
+}
+READS = ('/readings?fields=id,value', '/medications', '/check_session', '/me/bmi')
+
+def setup(app, users):
+    with app.app_context():
+        init_database()
+        ids = []
+        for _ in range(users):
+            user = User(name='Stress', email=f'stress-{uuid.uuid4().hex}@example.com', diabetes_type='type2', height_cm=170, weight_kg=80)
+            user.password_hash = 'stress'
+            db.session.add(user)
+            db.session.flush()
+            ids.append(user.id)
+        db.session.commit()
+        pragmas = {}
+        with db.engine.connect() as connection:
+            pragmas = read_pragmas(connection, ('journal_mode', 'synchronous', 'busy_timeout'))
+        return [{'Authorization': 'Bearer ' + create_access_token(identity=str(i))} for i in ids], pragmas
+
+def worker(app, headers, write_ratio, stop, stats, seed):
+    rng = random.Random(seed)
+    client = app.test_client()
+    while not stop.is_set():
+        h = rng.choice(headers)
+        write = rng.random() < write_ratio
+        start = time.perf_counter()
+        if write:
+            r = client.post('/readings', json={
+                'value': rng.randint(60, 300), 'date': '2024-05-01', 'time': f'{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}',
+                'context': rng.choice(['pre_meal', 'post_meal']), 'notes': rng.choice([None, 'after ugali', 'felt tired']),
+            }, headers=h)
+        else:
+            r = client.get(rng.choice(READS), headers=h)
+        elapsed = (time.perf_counter() - start) * 1000
+        kind = 'write' if write else 'read'
+        ok = r.status_code < 400
+        body = r.get_data(as_text=True)
+        stats.append((kind, ok, 'locked' in body, elapsed))
+
+def run(profile, threads, seconds, users, write_ratio):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'stress.db')}", **PROFILES[profile]})
+        headers, pragmas = setup(app, users)
+        stop = threading.Event()
+        stats = []
+        pool = [threading.Thread(target=worker, args=(app, headers, write_ratio, stop, stats, n)) for n in range(threads)]
+        for t in pool:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in pool:
+            t.join()
+        with app.app_context():
+            db.engine.dispose()
+
+    result = {'pragmas': pragmas}
+    for kind in ('read', 'write'):
+        rows = [s for s in stats if s[0] == kind]
+        latencies = sorted(s[3] for s in rows)
+        result[kind] = {
+            'ok_per_s': round(sum(1 for s in rows if s[1]) / seconds, 1),
+            'failed': sum(1 for s in rows if not s[1]),
+            'locked': sum(1 for s in rows if s[2]),
+            'p50_ms': round(statistics.median(latencies), 1) if latencies else None,
+            'p99_ms': round(latencies[int(len(latencies) * 0.99)], 1) if latencies else None,
+        }
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=8)
+    parser.add_argument('--write-ratio', type=float, default=0.3)
+    args = parser.parse_args()
+
+    results = {profile: run(profile, args.threads, args.seconds, args.users, args.write_ratio) for profile in PROFILES}
+    print(json.dumps({'threads': args.threads, 'seconds': args.seconds, 'write_ratio': args.write_ratio, **results}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Load test with realistic user journeys; writes a JSON capacity report
+Virtual users (--concurrency threads, keep-alive connections) loop over
+weighted journeys for --seconds:
+    new_user       signup, login, a batch of readings, dashboard, insights, progress
+    returning_user session, dashboard, a reading, history, alerts, insights, progress, food
+    doctor_contact doctors, assign one, read and send doctor messages
+Returning users reuse a saved token and log in again on --login-ratio of
+their journeys; a failed step is counted and the journey carries on, except
+for signup/login which end it.
+Returning users are created (with a reading history) before the clock starts.
+The report has throughput, p50/p95/p99 and error rate per route and per
+journey. --start runs gunicorn on a fresh seeded SQLite database; otherwise
+--url must point at a running instance that has had `flask init-db` and
+`flask seed-tips`
+
+Run from server/: python benchmarks/loadtest.py --start --concurrency 16 --seconds 60 --out load.json
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+SERVER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'load-test-password'
+JOURNEY_WEIGHTS = {'new_user': 1, 'returning_user': 6, 'doctor_contact': 2}
+# What POST /readings accepts
+CONTEXTS = ('pre_meal', 'post_meal')
+FOODS = ('ugali', 'sukuma_wiki', 'githeri', 'chapati')
+
+class StepFailed(Exception):
+    """A step the rest of the journey depends on (signup, login) failed"""
+
+class Recorder:
+    """Latencies and outcomes per route and per journey, shared by all virtual users"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.journeys = {}
+        self.recording = False
+
+    def request(self, route, ms, status, ok):
+        if not self.recording:
+            return
+        with self.lock:
+            entry = self.routes.setdefault(route, {'latencies': [], 'errors': 0, 'statuses': {}})
+            entry['latencies'].append(ms)
+            entry['statuses'][status] = entry['statuses'].get(status, 0) + 1
+            if not ok:
+                entry['errors'] += 1
+
+    def journey(self, name, ms, ok):
+        if not self.recording:
+            return
+        with self.lock:
+            entry = self.journeys.setdefault(name, {'latencies': [], 'errors': 0})
+            entry['latencies'].append(ms)
+            if not ok:
+                entry['errors'] += 1
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))], 1)
+
+def summarize(entry, seconds):
+    ordered = sorted(entry['latencies'])
+    count = len(ordered)
+    summary = {
+        'count': count,
+        'per_second': round(count / seconds, 2),
+        'errors': entry['errors'],
+        'error_rate': round(entry['errors'] / count, 4) if count else 0.0,
+        'p50_ms': percentile(ordered, 50),
+        'p95_ms': percentile(ordered, 95),
+        'p99_ms': percentile(ordered, 99),
+        'max_ms': round(ordered[-1], 1) if ordered else None,
+    }
+    if 'statuses' in entry:
+        summary['statuses'] = dict(sorted(entry['statuses'].items()))
+    return summary
+
+class Client:
+    """One keep-alive connection speaking JSON, timing each call under its route name"""
+
+    def __init__(self, host, port, recorder):
+        self.host, self.port, self.recorder = host, port, recorder
+        self.token = None
+        self.conn = None
+        self.failed = False
+
+    def call(self, method, path, route=None, body=None, expect=(200,), required=False):
+        """The decoded JSON body, or None after an error; required steps raise StepFailed instead
+        so the journey stops, others are recorded and the journey carries on like a page
+        rendering its other widgets"""
+        route = f"{method} {route or path.split('?')[0]}"
+        headers = {'Accept': 'application/json', 'Accept-Encoding': 'gzip'}
+        if self.token:
+            headers['Authorization'] = f'Bearer {self.token}'
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=payload, headers=headers)
+            response = self.conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as exc:
+            self.conn.close()
+            self.conn = None
+            self.recorder.request(route, (time.perf_counter() - start) * 1000, f'error {type(exc).__name__}', False)
+            return self._fail(f'{route}: {exc}', required)
+        ok = status in expect
+        self.recorder.request(route, (time.perf_counter() - start) * 1000, str(status), ok)
+        if not ok:
+            return self._fail(f'{route}: HTTP {status}', required)
+        if response.getheader('Content-Encoding') == 'gzip':
+            data = gzip.decompress(data)
+        return json.loads(data) if data else None
+
+    def _fail(self, reason, required):
+        self.failed = True
+        if required:
+            raise StepFailed(reason)
+        return None
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+def reading(rng, day=None):
+    context = rng.choice(CONTEXTS)
+    base = {'pre_meal': 115, 'post_meal': 160}[context]
+    when = datetime.now() - timedelta(days=day if day is not None else 0, minutes=rng.randint(0, 600))
+    return {
+        'value': max(55, min(380, round(rng.gauss(base, 30)))),
+        'date': when.date().isoformat(),
+        'time': when.strftime('%H:%M'),
+        'context': context,
+        'notes': rng.choice((None, 'after ugali', 'felt dizzy', 'walked 30 min', None)),
+    }
+
+def signup(client, rng, email=None):
+    email = email or f'load-{uuid.uuid4().hex[:12]}@example.com'
+    result = client.call('POST', '/signup', body={
+        'name': 'Load Tester', 'email': email, 'password': PASSWORD,
+        'diabetes_type': rng.choice(('type1', 'type2')),
+        'height_cm': rng.randint(150, 190), 'weight_kg': rng.randint(55, 110),
+    }, expect=(201,), required=True)
+    client.token = result['access_token']
+    return email
+
+def login(client, email):
+    client.token = None
+    client.token = client.call('POST', '/login', body={'email': email, 'password': PASSWORD}, required=True)['access_token']
+
+def resume_session(client, rng, ctx):
+    """Act as a returning user: reuse their saved token, logging in again now and then"""
+    email = rng.choice(ctx['users'])
+    token = ctx['tokens'].get(email)
+    if token is None or rng.random() < ctx['login_ratio']:
+        login(client, email)
+        ctx['tokens'][email] = client.token
+    else:
+        client.token = token
+
+def new_user(client, rng, ctx):
+    email = signup(client, rng)
+    login(client, email)
+    for _ in range(ctx['batch']):
+        client.call('POST', '/readings', body=reading(rng, day=rng.randint(0, 6)), expect=(201,))
+    client.call('GET', '/dashboard')
+    client.call('GET', '/educational-insights')
+    client.call('GET', '/user-progress')
+
+def returning_user(client, rng, ctx):
+    resume_session(client, rng, ctx)
+    client.call('GET', '/check_session')
+    client.call('GET', '/dashboard')
+    client.call('POST', '/readings', body=reading(rng), expect=(201,))
+    client.call('GET', '/readings?limit=50')
+    client.call('GET', '/glucose-alerts')
+    client.call('GET', '/educational-insights')
+    client.call('GET', '/user-progress')
+    client.call('GET', '/food-recommendations')
+    client.call('POST', '/food-impact', body={'food_name': rng.choice(FOODS)})
+
+def doctor_contact(client, rng, ctx):
+    resume_session(client, rng, ctx)
+    doctors = client.call('GET', '/doctors')
+    if doctors:
+        client.call('PATCH', '/me', body={'doctor_id': rng.choice(doctors)['id']})
+    client.call('GET', '/doctor-messages')
+    client.call('POST', '/doctor-messages', body={'message': 'Is this reading normal?', 'is_emergency': False}, expect=(201,))
+    client.call('GET', '/doctor-messages')
+
+JOURNEYS = {'new_user': new_user, 'returning_user': returning_user, 'doctor_contact': doctor_contact}
+
+def virtual_user(host, port, recorder, ctx, stop, seed):
+    rng = random.Random(seed)
+    names = list(JOURNEY_WEIGHTS)
+    weights = [JOURNEY_WEIGHTS[n] for n in names]
+    client = Client(host, port, recorder)
+    while not stop.is_set():
+        name = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        client.failed = False
+        try:
+            JOURNEYS[name](client, rng, ctx)
+        except StepFailed:
+            pass
+        recorder.journey(name, (time.perf_counter() - start) * 1000, not client.failed)
+        if ctx['think'] and not stop.is_set():
+            time.sleep(rng.uniform(0, 2 * ctx['think']))
+    client.close()
+
+def seed_users(host, port, count, history, seed):
+    """Returning users with `history` readings each over the last 30 days (untimed)"""
+    rng = random.Random(seed)
+    client = Client(host, port, Recorder())
+    client.call('POST', '/doctors/seed', expect=(200, 201), required=True)
+    emails = []
+    for _ in range(count):
+        emails.append(signup(client, rng))
+        for _ in range(history):
+            client.call('POST', '/readings', body=reading(rng, day=rng.randint(0, 29)), expect=(201,), required=True)
+    client.close()
+    return emails
+
+def wait_for(host, port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request('GET', '/')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on {host}:{port} did not come up')
+
+def start_server(port, workdir):
+    """gunicorn (gunicorn.conf.py) on a fresh SQLite database with tables, doctors and tips"""
+    env = dict(
+        os.environ, PORT=str(port), GUNICORN_ACCESS_LOG='',
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'load.db')}",
+        METRICS_DIR=os.path.join(workdir, 'metrics'),
+        SLOW_QUERY_LOG=os.path.join(workdir, 'slow_queries.log'),
+        PROFILE_DIR=os.path.join(workdir, 'profiles'),
+    )
+    for command in ('init-db', 'seed-tips'):
+        subprocess.run([sys.executable, '-m', 'flask', '--app', 'wsgi', command], cwd=SERVER, env=env,
+                       check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], cwd=SERVER, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def run(host, port, args):
+    wait_for(host, port)
+    users = seed_users(host, port, args.users, args.history, args.seed)
+    recorder = Recorder()
+    ctx = {'users': users, 'tokens': {}, 'login_ratio': args.login_ratio, 'batch': args.batch, 'think': args.think_ms / 1000}
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=virtual_user, args=(host, port, recorder, ctx, stop, args.seed + n), daemon=True)
+        for n in range(args.concurrency)
+    ]
+    # Let connections and caches warm up before the measured window
+    for t in threads:
+        t.start()
+    time.sleep(args.warmup)
+    recorder.recording = True
+    started = time.perf_counter()
+    time.sleep(args.seconds)
+    recorder.recording = False
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for t in threads:
+        t.join(timeout=60)
+
+    total = {'latencies': [], 'errors': 0}
+    for entry in recorder.routes.values():
+        total['latencies'] += entry['latencies']
+        total['errors'] += entry['errors']
+    return {
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'target': f'http://{host}:{port}',
+        'config': {
+            'concurrency': args.concurrency, 'seconds': args.seconds, 'warmup_seconds': args.warmup,
+            'think_ms': args.think_ms, 'returning_users': args.users, 'history_readings': args.history,
+            'batch_readings': args.batch, 'login_ratio': args.login_ratio, 'seed': args.seed, 'journey_weights': JOURNEY_WEIGHTS,
+            'cpus': os.cpu_count(),
+        },
+        'totals': summarize(total, elapsed),
+        'journeys': {name: summarize(entry, elapsed) for name, entry in sorted(recorder.journeys.items())},
+        'routes': {route: summarize(entry, elapsed) for route, entry in sorted(recorder.routes.items())},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5555', help='running instance (ignored with --start)')
+    parser.add_argument('--start', action='store_true', help='start gunicorn on a fresh seeded database')
+    parser.add_argument('--port', type=int, default=5598, help='port for --start')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--think-ms', type=float, default=0, help='mean pause between journeys per user')
+    parser.add_argument('--users', type=int, default=20, help='returning users created before the run')
+    parser.add_argument('--history', type=int, default=30, help='readings per returning user')
+    parser.add_argument('--batch', type=int, default=5, help='readings posted by each new user')
+    parser.add_argument('--login-ratio', type=float, default=0.1,
+                        help='share of returning-user journeys that log in again (bcrypt) instead of reusing a token')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help='write the JSON report here instead of stdout')
+    parser.add_argument('--max-error-rate', type=float, help='exit 1 when the overall error rate is higher')
+    args = parser.parse_args()
+
+    if args.start:
+        with tempfile.TemporaryDirectory() as workdir:
+            process = start_server(args.port, workdir)
+            try:
+                report = run('127.0.0.1', args.port, args)
+            finally:
+                process.terminate()
+                process.wait(timeout=40)
+    else:
+        target = urlsplit(args.url)
+        report = run(target.hostname, target.port or 80, args)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.max_error_rate is not None and report['totals']['error_rate'] > args.max_error_rate:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Query-budget check for every endpoint: flask --app wsgi check-query-budgets
+Builds a throwaway SQLite database per fixture size (one user with `size`
+readings, meals, medications, reminders, messages and BMI snapshots, and a
+doctor with `size` patients), sends each request in SCENARIO and counts the
+SQL statements it runs. A request fails when it goes over the @query_budget
+of its Resource method, when that method has no budget, or when its count
+rises with the fixture size (statements that scale with the data are the
+N+1 pattern, even while under budget). A request that does not succeed
+(anything but 2xx) fails too: its count is of the error path. Each size
+runs in a fresh process, so no module-level cache warmed by one size serves
+the next
+"""
+
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, time, timedelta
+
+from budgets import budget_of, track_statements
+
+ADMIN_EMAIL = 'budget-check@example.com'
+PASSWORD = 'budget-check'
+
+# (method, path, json body[, caller]); {name} is filled from the fixture ids. The
+# caller is the fixture user unless given: 'newcomer' is a patient who has never
+# written anything, so their first write also creates the data-version row
+SCENARIO = (
+    ('POST', '/readings', {'value': 130, 'date': '{today}', 'time': '07:00', 'context': 'pre_meal'}, 'newcomer'),
+    ('GET', '/check_session', None),
+    ('GET', '/readings', None),
+    ('GET', '/readings/{reading_id}', None),
+    ('GET', '/me/bmi', None),
+    ('GET', '/medications', None),
+    ('GET', '/meals', None),
+    ('GET', '/doctors', None),
+    ('GET', '/doctors/{doctor_id}/patients', None),
+    ('GET', '/kenyan-foods', None),
+    ('GET', '/food-recommendations', None),
+    ('GET', '/foods/search?q=ugali', None),
+    ('GET', '/food-impact/ranked', None),
+    ('GET', '/glucose-alerts', None),
+    ('GET', '/user-progress', None),
+    ('GET', '/dashboard', None),
+    ('GET', '/educational-insights', None),
+    ('GET', '/educational-tips', None),
+    ('GET', '/reminders', None),
+    ('GET', '/doctor-messages', None),
+    ('GET', '/bmi-history', None),
+    ('GET', '/search?q=fixture', None),
+    ('GET', '/bootstrap', None),
+    ('GET', '/stats/single-flight', None),
+    ('GET', '/admin/slow-queries', None),
+    ('GET', '/admin/profiles', None),
+    ('GET', '/admin/profiles/{profile_id}', None),
+    ('POST', '/signup', {'name': 'Budget New', 'email': 'budget-new-{size}@example.com', 'password': PASSWORD, 'diabetes_type': 'type2', 'height_cm': 170, 'weight_kg': 80, 'initial_reading_value': 120}),
+    ('POST', '/login', {'email': ADMIN_EMAIL, 'password': PASSWORD}),
+    ('POST', '/password/forgot', {'email': ADMIN_EMAIL}),
+    ('POST', '/password/update', {'current_password': PASSWORD, 'new_password': PASSWORD}),
+    ('POST', '/readings', {'value': 150, 'date': '{today}', 'time': '08:00', 'context': 'pre_meal', 'notes': 'fixture'}),
+    ('PATCH', '/readings/{reading_id}', {'value': 140, 'notes': 'fixture edit'}),
+    ('POST', '/readings/enhanced', {'value': 190, 'date': '{today}', 'time': '13:00', 'context': 'post_meal'}),
+    ('PATCH', '/me', {'name': 'Budget Check'}),
+    ('PUT', '/profile/enhanced', {'age': 40, 'gender': 'female', 'emergency_contact_name': 'Kin'}),
+    ('POST', '/medications', {'name': 'Metformin', 'dose': '500mg', 'time': '08:00'}),
+    ('PATCH', '/medications/{medication_id}', {'status': 'taken'}),
+    ('POST', '/meals', {'name': 'Ugali', 'meal_type': 'lunch'}),
+    ('POST', '/readings/{reading_id}/meals', {'meal_id': '{unlinked_meal_id}', 'carbs_amount': 40}),
+    ('DELETE', '/readings/{reading_id}/meals?meal_id={unlinked_meal_id}', None),
+    ('POST', '/meal-prediction', {'context': 'pre_meal'}),
+    ('POST', '/food-impact', {'food_name': 'ugali'}),
+    ('POST', '/meals/glycemic-load', {'items': [{'food': 'ugali', 'grams': 200}, {'food': 'sukuma_wiki'}]}),
+    ('POST', '/doctors', {'name': 'Dr. Budget', 'email': 'dr-budget-{size}@example.com'}),
+    ('POST', '/doctors/seed', None),
+    ('POST', '/reminders', {'reminder_type': 'glucose', 'title': 'Check', 'scheduled_time': '07:30'}),
+    ('PUT', '/reminders/{reminder_id}', {'is_active': True, 'frequency': 'weekly'}),
+    ('PATCH', '/reminders/{reminder_id}', {'title': 'Check again'}),
+    ('DELETE', '/reminders/{reminder_id}', None),
+    ('POST', '/doctor-messages', {'message': 'fixture question'}),
+    ('DELETE', '/readings/{last_reading_id}', None),
+)
+
+def _fill(value, ids):
+    if isinstance(value, str):
+        filled = value.format(**ids)
+        return int(filled) if filled.isdigit() and value.startswith('{') else filled
+    if isinstance(value, dict):
+        return {k: _fill(v, ids) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, ids) for v in value]
+    return value
+
+def build_fixture(size):
+    """Seed the current app's database; returns the ids the scenario refers to"""
+    from config import db
+    from educational_insights import seed_educational_tips
+    from init_db import init_database
+    from models import BMISnapshot, Doctor, DoctorMessage, Meal, Medication, Reading, Reminder, User, reading_meals
+
+    init_database()
+    seed_educational_tips()
+    doctor = Doctor(name='Dr. Fixture', email=f'dr-fixture-{size}@example.com', phone='+254700000000')
+    db.session.add(doctor)
+    db.session.flush()
+    user = User(name='Budget', email=ADMIN_EMAIL, diabetes_type='type2', height_cm=170, weight_kg=82, doctor_id=doctor.id)
+    user.password_hash = PASSWORD
+    db.session.add(user)
+    # Other patients skip bcrypt: they never log in
+    patients = [User(name=f'Patient {n}', email=f'patient-{n}@example.com', diabetes_type='type2', doctor_id=doctor.id) for n in range(size)]
+    db.session.add_all(patients)
+    db.session.flush()
+
+    today = date.today()
+    readings = [
+        Reading(value=90 + (n * 37) % 160, date=today - timedelta(days=n % 14), time=time(7 + n % 14, 0),
+                context=('fasting', 'pre_meal', 'post_meal', 'bedtime')[n % 4], notes=f'fixture reading {n}', user_id=user.id)
+        for n in range(size)
+    ]
+    meals = [Meal(name=f'Meal {n}', meal_type=('breakfast', 'lunch', 'dinner', 'snack')[n % 4]) for n in range(size + 1)]
+    db.session.add_all(readings + meals)
+    db.session.flush()
+    db.session.execute(reading_meals.insert(), [{'reading_id': r.id, 'meal_id': m.id, 'carbs_amount': 30} for r, m in zip(readings, meals)])
+    medications = [Medication(name=f'Med {n}', dose='500mg', time=time(8 + n % 12, 0), user_id=user.id) for n in range(size)]
+    db.session.add_all(medications)
+    reminders = [Reminder(user_id=user.id, reminder_type='glucose', title=f'Reminder {n}', scheduled_time=time(6 + n % 12, 0)) for n in range(size)]
+    db.session.add_all(reminders)
+    db.session.add_all(DoctorMessage(user_id=user.id, doctor_id=doctor.id, sender_type=('user', 'doctor')[n % 2], message=f'fixture message {n}') for n in range(size))
+    db.session.add_all(BMISnapshot(user_id=user.id, bmi=28.4, weight_kg=82, height_cm=170, created_at=datetime.utcnow() - timedelta(days=n)) for n in range(size))
+    db.session.commit()
+    return user.id, patients[0].id, {
+        'size': size,
+        'today': today.isoformat(),
+        'doctor_id': doctor.id,
+        'reading_id': readings[0].id,
+        'last_reading_id': readings[-1].id,
+        'unlinked_meal_id': meals[-1].id,
+        'medication_id': medications[0].id,
+        'reminder_id': reminders[0].id,
+    }
+
+def resource_methods(app):
+    """{(rule, method): Resource class} for every API route"""
+    methods = {}
+    for rule in app.url_map.iter_rules():
+        view_class = getattr(app.view_functions[rule.endpoint], 'view_class', None)
+        if view_class is not None:
+            for method in rule.methods - {'HEAD', 'OPTIONS'}:
+                methods[(rule.rule, method)] = view_class
+    return methods
+
+def run_scenario(size):
+    """({(rule, method): 'Resource.method'}, {(rule, method): (statements, budget, status)}) for one fixture size"""
+    from flask_jwt_extended import create_access_token
+    from config import create_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'budget.db')}",
+            'DATABASE_REPLICA_URL': None,
+            'ADMIN_EMAILS': [ADMIN_EMAIL],
+            'PROFILE_DIR': os.path.join(tmp, 'profiles'),
+            'SLOW_QUERY_SECONDS': None,
+            'METRICS_ENABLED': False,
+            'QUERY_BUDGETS': 'off',
+            # As on PostgreSQL: sections on their own sessions cost a few more statements
+            'SECTION_WORKERS': 4,
+        })
+        with app.app_context():
+            user_id, newcomer_id, ids = build_fixture(size)
+            headers = {'Authorization': 'Bearer ' + create_access_token(identity=str(user_id))}
+            callers = {'newcomer': {'Authorization': 'Bearer ' + create_access_token(identity=str(newcomer_id))}}
+        client = app.test_client()
+        ids['profile_id'] = client.get('/me/bmi', headers={**headers, 'X-Profile': 'cpu'}).headers.get('X-Profile-Id', 'missing')
+
+        methods = resource_methods(app)
+        adapter = app.url_map.bind('localhost')
+        results = {}
+        for method, template, body, *caller in SCENARIO:
+            path = _fill(template, ids)
+            rule, _ = adapter.match(path.split('?')[0], method=method, return_rule=True)
+            with track_statements() as statements:
+                response = client.open(path, method=method, json=_fill(body, ids), headers=callers[caller[0]] if caller else headers)
+            result = (list(statements), budget_of(methods[(rule.rule, method)], method), response.status_code)
+            # A method run more than once is judged by its worst run
+            previous = results.get((rule.rule, method))
+            if previous is None or _severity(result) > _severity(previous):
+                results[(rule.rule, method)] = result
+        with app.app_context():
+            from config import db
+            db.engine.dispose()
+        return {key: f'{view_class.__name__}.{key[1].lower()}' for key, view_class in methods.items()}, results
+
+def _severity(result):
+    statements, _, status = result
+    return (not 200 <= status < 300, len(statements))
+
+def run_isolated(size):
+    """run_scenario(size) in a new interpreter: caches such as DOCTORS_BODY, the tip
+    snapshot and the stale analytics results start cold"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_scenario, size).result()
+
+def check(sizes, echo=print):
+    """Run the scenario at each size and report; returns True when every request passes"""
+    sizes = sorted(set(sizes))
+    runs = {size: run_isolated(size) for size in sizes}
+    methods = next(iter(runs.values()))[0]
+    ok = True
+    for key in sorted(methods, key=lambda k: (k[0], k[1])):
+        rule, method = key
+        name = methods[key]
+        if key not in runs[sizes[0]][1]:
+            ok = False
+            echo(f'NOT RUN    {method:6} {rule}  ({name}: add it to SCENARIO)')
+            continue
+        counts = [len(runs[size][1][key][0]) for size in sizes]
+        budget = runs[sizes[0]][1][key][1]
+        statuses = sorted({runs[size][1][key][2] for size in sizes})
+        problems = []
+        if any(not 200 <= status < 300 for status in statuses):
+            problems.append('FAILED')
+        if budget is None:
+            problems.append('NO BUDGET')
+        elif max(counts) > budget:
+            problems.append('OVER')
+        if any(later > earlier for earlier, later in zip(counts, counts[1:])):
+            problems.append('GROWS')
+        counted = '/'.join(map(str, counts))
+        echo(f"{' '.join(problems) or 'ok':10} {method:6} {rule}  {counted} of {budget if budget is not None else '-'}  ({name}, HTTP {'/'.join(map(str, statuses))})")
+        if problems:
+            ok = False
+            worst = max(sizes, key=lambda size: len(runs[size][1][key][0]))
+            for n, statement in enumerate(runs[worst][1][key][0], 1):
+                echo(f"             {n}. {' '.join(statement.split())[:160]}")
+    return ok
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+SQL statement budgets per endpoint, to catch N+1 query patterns
+@query_budget(n) on a Resource method declares the most statements one call
+may run, whatever the size of the user's data. QUERY_BUDGETS decides what an
+overrun does: 'off', 'warn' (log the statements) or 'raise'
+(QueryBudgetExceeded, for development). The count is only known once the
+handler returns, so 'raise' fires after its side effects: a write has already
+been committed and the client sees a 500 for it. `flask check-query-budgets`
+(budget_check.py) drives every endpoint against fixtures of two sizes and
+fails on an overrun, a missing budget or a count that grows with the data
+"""
+
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MODES = ('off', 'warn', 'raise')
+
+# The statements list of the innermost budgeted call, or None
+_tracker = contextvars.ContextVar('query_budget_statements', default=None)
+
+class QueryBudgetExceeded(Exception):
+    def __init__(self, name, budget, statements):
+        self.name = name
+        self.budget = budget
+        self.statements = statements
+        listing = '\n'.join(f'  {n}. {" ".join(s.split())}' for n, s in enumerate(statements, 1))
+        super().__init__(f'{name} ran {len(statements)} SQL statements (budget {budget}):\n{listing}')
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _track(conn, cursor, statement, parameters, context, executemany):
+    statements = _tracker.get()
+    if statements is not None:
+        statements.append(statement)
+
+@contextmanager
+def track_statements():
+    """Collect every statement run in this context (and propagated threads) into a list"""
+    statements = []
+    token = _tracker.set(statements)
+    try:
+        yield statements
+    finally:
+        _tracker.reset(token)
+
+def propagate(fn):
+    """fn, counting into the caller's budget when it runs on a pool thread"""
+    statements = _tracker.get()
+    if statements is None:
+        return fn
+
+    @wraps(fn)
+    def run(*args, **kwargs):
+        token = _tracker.set(statements)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _tracker.reset(token)
+    return run
+
+def query_budget(max_statements):
+    """Place above @jwt_required() so statements made by the other decorators count too"""
+    def decorator(fn):
+        name = fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            mode = current_app.config.get('QUERY_BUDGETS', 'warn')
+            # Nested under another tracker (e.g. the budget check), that one counts
+            if mode == 'off' or _tracker.get() is not None:
+                return fn(*args, **kwargs)
+            with track_statements() as statements:
+                result = fn(*args, **kwargs)
+            if len(statements) > max_statements:
+                exceeded = QueryBudgetExceeded(name, max_statements, statements)
+                if mode == 'raise':
+                    raise exceeded
+                current_app.logger.warning('%s', exceeded)
+            return result
+        wrapper.query_budget = max_statements
+        return wrapper
+    return decorator
+
+def budget_of(view_class, method):
+    """The declared budget of view_class.<method>, or None"""
+    return getattr(getattr(view_class, method.lower(), None), 'query_budget', None)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Compiled per-language catalogs for static bilingual content
+Content modules freeze their tables once at import so handlers can serve
+references instead of rebuilding dicts on every request
+"""
+
+LANGUAGES = ('en', 'sw')
+DEFAULT_LANGUAGE = 'en'
+
+
+class FrozenDict(dict):
+    """Read-only dict. Still a dict, so the JSON encoders serialize it natively"""
+    __slots__ = ()
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError('catalog entries are read-only')
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def copy(self):
+        return dict(self)
+
+
+def freeze(value):
+    """Recursively convert dicts to FrozenDict and lists to tuples"""
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def normalize_language(language):
+    """Map a requested language onto one we have content for"""
+    return language if language in LANGUAGES else DEFAULT_LANGUAGE
+
+
+def is_bilingual(value):
+    return isinstance(value, dict) and set(value) == set(LANGUAGES)
+
+
+def localize(entry, language):
+    """Replace every {'en': ..., 'sw': ...} field of entry with its `language` text"""
+    return {k: (v[language] if is_bilingual(v) else v) for k, v in entry.items()}
+
+
+def compile_views(table):
+    """Build {language: {id: localized entry}} for a table of bilingual entries"""
+    return FrozenDict({
+        language: FrozenDict({
+            key: freeze({**localize(entry, language), 'id': key})
+            for key, entry in table.items()
+        })
+        for language in LANGUAGES
+    })
+
+
+def view_for(views, language):
+    """Per-language view with English fallback"""
+    return views[normalize_language(language)]
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Database setup commands, run explicitly rather than on import
+    flask --app wsgi init-db       tables, full-text search index and basic doctors
+    flask --app wsgi seed-tips     educational tips catalog
+    flask --app wsgi seed          demo users, readings, meals and medications (resets data)
+    flask --app wsgi sync-replica  copy a SQLite primary into the DATABASE_REPLICA_URL file
+    flask --app wsgi check-query-budgets  every endpoint's SQL count against its @query_budget
+"""
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create tables and the search index, and seed basic doctors"""
+    from init_db import init_database
+    init_database()
+
+
+@click.command('seed-tips')
+@with_appcontext
+def seed_tips_command():
+    """Replace the educational tips with the built-in catalog"""
+    from educational_insights import seed_educational_tips
+    seed_educational_tips()
+
+
+@click.command('seed')
+@with_appcontext
+def seed_command():
+    """Reset the database and fill it with Faker demo data"""
+    from seed import seed_database
+    seed_database()
+
+
+@click.command('sync-replica')
+@with_appcontext
+def sync_replica_command():
+    """Copy the primary SQLite database into the replica file"""
+    from routing import sync_sqlite_replica
+    try:
+        sync_sqlite_replica()
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    click.echo('Replica synced')
+
+
+@click.command('check-query-budgets')
+@click.option('--size', 'sizes', type=int, multiple=True, default=(5, 50), show_default=True,
+              help='Fixture size (rows per table); repeat to compare sizes')
+def check_query_budgets_command(sizes):
+    """Run every endpoint on throwaway fixtures; fail on N+1 growth or a blown budget"""
+    from budget_check import check
+    if not check(list(sizes), echo=click.echo):
+        raise click.ClickException('query budgets failed')
+
+
+def register_commands(app):
+    for command in (init_db_command, seed_tips_command, seed_command, sync_replica_command, check_query_budgets_command):
+        app.cli.add_command(command)
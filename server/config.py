@@ -1,41 +1,187 @@
+import os
 
+import click
 from flask import Flask
 from flask_cors import CORS
-from flask_migrate import Migrate
-from flask_restful import Api
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from sqlalchemy import MetaData
+from sqlalchemy.engine import make_url
 
+from routing import REPLICA, RoutingSession
+from serialization import FastJSONProvider, compress_response
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['JWT_SECRET_KEY'] = 'your-secret-string'  
-app.json.compact = False
+
+def database_url(name, default=None):
+    """A database URL from the environment; postgres:// (Render, Heroku) is renamed for SQLAlchemy"""
+    url = os.environ.get(name) or default
+    if url and url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+def env_flag(name):
+    """True/False from 1/0, true/false, yes/no; None when unset"""
+    value = os.environ.get(name)
+    return None if value is None else value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class Config:
+    # SQLite file or PostgreSQL URL
+    SQLALCHEMY_DATABASE_URI = database_url('DATABASE_URL', 'sqlite:///app.db')
+    # Optional read replica for @read_replica handlers (routing.py); a second
+    # SQLite file works locally, refreshed with `flask sync-replica`
+    DATABASE_REPLICA_URL = database_url('DATABASE_REPLICA_URL')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Room for every gthread thread plus the analytics workers. Writers queued
+    # behind SQLite's single write lock hold their connection for seconds under
+    # load, so a shorter pool_timeout turns that wait into errors
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    }
+    # Test connections on checkout; None means on for networked databases, off for SQLite
+    DB_POOL_PRE_PING = env_flag('DB_POOL_PRE_PING')
+    # Run on every new SQLite connection (sqlite_profile.py); None to keep SQLite's defaults.
+    # WAL lets readers and the writer proceed together, busy_timeout makes a
+    # second writer wait instead of failing with "database is locked"
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        # Durable at each checkpoint rather than each commit; safe with WAL
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        # Negative is KiB: 20 MB of page cache per connection
+        'cache_size': -20000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    }
+    JWT_SECRET_KEY = 'your-secret-string'
+    # Responses smaller than this (bytes) are not worth compressing
+    COMPRESS_MIN_SIZE = 1024
+    # How often (seconds) a worker checks the DB for a new educational tips version
+    TIPS_VERSION_CHECK_SECONDS = 30
+    # Latency budget (seconds) for /dashboard, /glucose-alerts and /educational-insights;
+    # past it the last good result is served stale while the worker pool refreshes it
+    ANALYTICS_DEADLINE_SECONDS = 2.0
+    ANALYTICS_MAX_WAIT_SECONDS = 20.0
+    ANALYTICS_WORKERS = 4
+    # Last-good results kept per process for the stale fallback
+    ANALYTICS_STALE_ENTRIES = 1024
+    # Request/SQL metrics at /metrics (metrics.py). With several worker processes,
+    # METRICS_DIR is where each writes its totals (every
+    # METRICS_FLUSH_SECONDS) so any worker can answer a scrape for all of them
+    METRICS_ENABLED = True
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_FLUSH_SECONDS = 1.0
+    # Statements at least this slow go to the slow-query log (slowlog.py); empty to turn off
+    SLOW_QUERY_SECONDS = float(os.environ.get('SLOW_QUERY_SECONDS', '0.1') or 0) or None
+    # JSON lines, rotated; None means instance/slow_queries.log
+    SLOW_QUERY_LOG = os.environ.get('SLOW_QUERY_LOG')
+    SLOW_QUERY_LOG_MAX_BYTES = 2 * 1024 * 1024
+    # Key for the logged parameter fingerprints (HMAC); empty means JWT_SECRET_KEY
+    SLOW_QUERY_PARAMS_KEY = os.environ.get('SLOW_QUERY_PARAMS_KEY')
+    SLOW_QUERY_LOG_BACKUPS = 3
+    # What a @query_budget overrun does: off, warn (log the statements) or raise (budgets.py).
+    # raise fires once the handler has returned, after its commit: development only
+    QUERY_BUDGETS = os.environ.get('QUERY_BUDGETS', 'warn')
+    # X-Profile: cpu|mem on an admin's request profiles it (profiling.py); the
+    # newest PROFILE_KEEP results are kept in PROFILE_DIR (None: instance/profiles)
+    PROFILING_ENABLED = True
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    PROFILE_KEEP = 50
+    PROFILE_TOP_ALLOCATIONS = 50
+    # Accounts allowed to use the /admin endpoints (admin.py)
+    ADMIN_EMAILS = [e.strip().lower() for e in os.environ.get('ADMIN_EMAILS', '').split(',') if e.strip()]
+
+
+CORS_ORIGINS = [
+    "http://localhost:3000",
+    "http://127.0.0.1:3000",
+    "http://localhost:3001",
+    "http://localhost:3002",
+    "http://127.0.0.1:3002",
+    "https://diabetes-management-app-gamma.vercel.app",
+    "*"  # Allow all origins for now - you can restrict this later
+]
 
 
 metadata = MetaData(naming_convention={
     "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
 })
-db = SQLAlchemy(metadata=metadata)
-migrate = Migrate(app, db)
-db.init_app(app)
-api = Api(app)
-
-jwt = JWTManager(app)
-
-
-CORS(
-    app,
-    resources={r"/*": {"origins": [
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "http://localhost:3001",
-        "http://localhost:3002",
-        "http://127.0.0.1:3002",
-        "https://diabetes-management-app-gamma.vercel.app",
-        "*"  # Allow all origins for now - you can restrict this later
-    ]}},
-    supports_credentials=True,
-)
+db = SQLAlchemy(metadata=metadata, session_options={'class_': RoutingSession})
+jwt = JWTManager()
+
+
+# QueuePool sizing; an in-memory SQLite database gets a StaticPool, which rejects them
+POOL_SIZING_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+
+def in_memory_sqlite(url):
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite':
+        return False
+    database = url.database or ''
+    return database in ('', ':memory:') or database.startswith('file::memory:') or url.query.get('mode') == 'memory'
+
+
+def configure_engines(config):
+    """Per-engine options (pre-ping, pool sizing) for the primary and, if configured, the replica bind"""
+    pre_ping = config.get('DB_POOL_PRE_PING')
+    base = config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+
+    def options(url):
+        engine_options = dict(base)
+        if in_memory_sqlite(url):
+            for name in POOL_SIZING_OPTIONS:
+                engine_options.pop(name, None)
+        engine_options['pool_pre_ping'] = (not url.startswith('sqlite')) if pre_ping is None else pre_ping
+        return engine_options
+
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options(config['SQLALCHEMY_DATABASE_URI'])
+    replica_url = config.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        config['SQLALCHEMY_BINDS'] = {**(config.get('SQLALCHEMY_BINDS') or {}), REPLICA: {'url': replica_url, **options(replica_url)}}
+
+
+def create_app(config=None):
+    """Build the Flask app; config is a mapping of overrides for Config
+
+    Nothing here touches the database: tables, search index and seed data
+    come from `flask init-db` (see cli.py).
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.from_mapping(config or {})
+    configure_engines(app.config)
+    # Threads for independent dashboard sections (1 = run them one after another).
+    # A local SQLite file has no I/O wait to overlap, so sections only fan out on
+    # networked databases (see benchmarks/bench_dashboard.py)
+    app.config.setdefault('SECTION_WORKERS', 1 if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite') else 4)
+    # Compact JSON via orjson when installed; set app.json.compact = False to indent
+    app.json = FastJSONProvider(app)
+
+    db.init_app(app)
+    from sqlite_profile import configure_sqlite
+    from slowlog import init_slow_query_log
+    configure_sqlite(app)
+    init_slow_query_log(app)
+    # Flask-Migrate imports alembic (~170 ms); only `flask db ...` needs it
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    jwt.init_app(app)
+    CORS(app, resources={r"/*": {"origins": CORS_ORIGINS}}, supports_credentials=True)
+    from metrics import init_metrics
+    init_metrics(app)
+    app.after_request(compress_response)
+    from profiling import init_profiling
+    init_profiling(app)
+
+    # Imported here so that importing config (models, scripts, migrations) stays cheap
+    from schema import ma
+    from app import api_bp
+    from cli import register_commands
+    ma.init_app(app)
+    app.register_blueprint(api_bp)
+    register_commands(app)
+    return app
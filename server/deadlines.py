@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Latency budgets for analytics endpoints, with a stale-while-revalidate fallback
+The fresh computation runs on a small worker pool. If it misses the budget the
+caller gets the last good result marked stale, and the worker keeps going and
+stores its result for the next request.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from datetime import datetime
+
+from flask import current_app
+
+from budgets import propagate
+from lookups import user_data_version
+from routing import replica_enabled, replica_reads
+
+_lock = threading.Lock()
+_executor = None
+_in_flight = {}
+_last_good = OrderedDict()
+
+def _pool(app):
+    """Worker pool, created on first use; caller holds _lock"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=app.config.get('ANALYTICS_WORKERS', 4),
+            thread_name_prefix='analytics',
+        )
+    return _executor
+
+def _remember(app, key, version, payload):
+    with _lock:
+        cached = _last_good.get(key)
+        # A refresh that started before a later one finished must not replace it
+        if cached is not None and cached[2] > version:
+            return
+        _last_good[key] = (payload, datetime.utcnow(), version)
+        _last_good.move_to_end(key)
+        while len(_last_good) > app.config.get('ANALYTICS_STALE_ENTRIES', 1024):
+            _last_good.popitem(last=False)
+
+def _compute(app, key, version, fn, args, replica):
+    try:
+        with app.app_context(), replica_reads(replica):
+            result = fn(*args)
+        payload, status, *headers = result if isinstance(result, tuple) else (result, 200)
+        if status == 200:
+            _remember(app, key, version, payload)
+        return (payload, status, *headers)
+    finally:
+        with _lock:
+            _in_flight.pop((key, version), None)
+
+def _submit(app, key, version, fn, args, replica):
+    """One refresh per key and data version at a time; later callers wait on the same future"""
+    with _lock:
+        future = _in_flight.get((key, version))
+        if future is None:
+            future = _in_flight[(key, version)] = _pool(app).submit(propagate(_compute), app, key, version, fn, args, replica)
+        return future
+
+def run_with_deadline(name, key, fn, *args):
+    """Return fn(*args) as (payload, status[, headers]) within ANALYTICS_DEADLINE_SECONDS if possible
+
+    key starts with the user id. fn runs in its own app context on the worker
+    pool, so it must take plain ids rather than ORM objects; it reads from the
+    replica if the caller does. Only a refresh of the caller's data version is
+    shared, so a request made after a write never joins one started before it.
+    Past the budget, the last good result for (name, key) is returned with
+    stale=True. Without one the caller waits up to ANALYTICS_MAX_WAIT_SECONDS
+    and then gets a 503 to retry.
+    """
+    app = current_app._get_current_object()
+    cache_key = (name, key)
+    future = _submit(app, cache_key, user_data_version(key[0]), fn, args, replica_enabled())
+    try:
+        return future.result(timeout=app.config.get('ANALYTICS_DEADLINE_SECONDS', 2.0))
+    except TimeoutError:
+        pass
+
+    with _lock:
+        cached = _last_good.get(cache_key)
+    if cached is not None:
+        payload, computed_at, _ = cached
+        return {**payload, 'stale': True, 'stale_as_of': computed_at.isoformat()}, 200
+
+    try:
+        return future.result(timeout=app.config.get('ANALYTICS_MAX_WAIT_SECONDS', 20.0))
+    except TimeoutError:
+        retry_after = int(app.config.get('ANALYTICS_DEADLINE_SECONDS', 2.0)) + 1
+        return {'error': 'Still computing, please retry shortly', 'pending': True}, 503, {'Retry-After': str(retry_after)}
+
+def is_stale(payload):
+    return isinstance(payload, dict) and payload.get('stale') is True
@@ -5,10 +5,19 @@ Educational Insights System for Diabetes Management
 Provides personalized tips based on glucose trends, BMI, and local Kenyan context
 """
 
+import threading
+import time
 from datetime import datetime, timedelta
-from sqlalchemy import func
-from models import User, Reading, EducationalTip
+from flask import current_app
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from catalogs import freeze
+from models import User, Reading, EducationalTip, ContentVersion
 from config import db
+from lookups import request_memoized, get_user, get_latest_reading
+from singleflight import single_flight
 
 # Kenya-specific educational content
 KENYAN_EDUCATIONAL_TIPS = {
@@ -98,6 +107,149 @@ KENYAN_EDUCATIONAL_TIPS = {
     }
 }
 
+# ---------------- Tip catalog (DB-backed, in-memory snapshot) ----------------
+TIPS_CONTENT = 'educational_tips'
+TIP_FIELDS = ('title', 'content', 'category', 'local_relevance', 'priority')
+PRIORITY_RANK = {'high': 3, 'medium': 2, 'low': 1}
+
+def literal_tip_rows():
+    """(condition, tip) pairs from KENYAN_EDUCATIONAL_TIPS, using the DB condition names"""
+    rows = []
+    for condition, tips in KENYAN_EDUCATIONAL_TIPS.items():
+        if condition != 'bmi_tips':
+            rows.extend((condition, tip) for tip in tips)
+    for bmi_category, tips in KENYAN_EDUCATIONAL_TIPS['bmi_tips'].items():
+        rows.extend((f'bmi_{bmi_category}', tip) for tip in tips)
+    return rows
+
+class TipSnapshot:
+    """Immutable, indexed view of the tip catalog
+
+    A reload builds a new snapshot and swaps the module reference, so
+    readers never take a lock and never see a half-built index.
+    """
+    __slots__ = ('version', 'source', 'tips', 'by_condition', 'by_category', 'by_priority')
+
+    def __init__(self, version, source, rows):
+        by_condition, by_category, by_priority = {}, {}, {}
+        tips = []
+        for condition, tip in rows:
+            tip = freeze({f: tip[f] for f in TIP_FIELDS})
+            tips.append(tip)
+            by_condition.setdefault(condition, []).append(tip)
+            by_category.setdefault(tip['category'], []).append(tip)
+            by_priority.setdefault(tip['priority'], []).append(tip)
+        self.version = version
+        self.source = source
+        self.tips = tuple(tips)
+        self.by_condition = freeze(by_condition)
+        self.by_category = freeze(by_category)
+        self.by_priority = freeze(by_priority)
+
+    def for_condition(self, condition):
+        return self.by_condition.get(condition, ())
+
+    def select(self, condition=None, category=None, priority=None):
+        """Tips matching every given key, highest priority first"""
+        if condition is not None:
+            candidates = self.for_condition(condition)
+        elif category is not None:
+            candidates = self.by_category.get(category, ())
+        elif priority is not None:
+            candidates = self.by_priority.get(priority, ())
+        else:
+            candidates = self.tips
+        matches = [
+            tip for tip in candidates
+            if (category is None or tip['category'] == category)
+            and (priority is None or tip['priority'] == priority)
+        ]
+        return sorted(matches, key=lambda tip: PRIORITY_RANK.get(tip['priority'], 0), reverse=True)
+
+# No DB version is ever -1, so the first check loads from the DB even where the
+# content_versions row is missing (databases upgraded by b7c1d2e3f4a5 start without one)
+_tip_snapshot = TipSnapshot(-1, 'literal', literal_tip_rows())
+_tip_reload_lock = threading.Lock()
+_tip_checked_at = None
+
+def get_content_version(name):
+    row = db.session.get(ContentVersion, name)
+    return row.version if row else 0
+
+# Dialects with INSERT ... ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {'sqlite': sqlite_insert, 'postgresql': postgresql_insert}
+
+def increment_version(connection, table, **key):
+    """Add 1 to the version counter row for key, creating it at 1, inside the caller's transaction
+
+    One upsert statement, so two concurrent first writes cannot both insert
+    """
+    now = datetime.utcnow()
+    upsert = UPSERT_INSERTS.get(connection.dialect.name)
+    if upsert is not None:
+        connection.execute(
+            upsert(table).values(**key, version=1, updated_at=now)
+            .on_conflict_do_update(index_elements=list(key), set_={'version': table.c.version + 1, 'updated_at': now})
+        )
+        return
+    where = [table.c[name] == value for name, value in key.items()]
+    result = connection.execute(table.update().where(*where).values(version=table.c.version + 1, updated_at=now))
+    if result.rowcount == 0:
+        connection.execute(table.insert().values(**key, version=1, updated_at=now))
+
+def bump_content_version(connection, name):
+    """Increment a content version inside the caller's transaction"""
+    increment_version(connection, ContentVersion.__table__, name=name)
+
+@event.listens_for(Session, 'before_flush')
+def _bump_tips_version_on_write(session, flush_context, instances):
+    """ORM writes to EducationalTip bump the catalog version so other workers reload"""
+    changed = (*session.new, *session.dirty, *session.deleted)
+    if any(isinstance(obj, EducationalTip) for obj in changed):
+        bump_content_version(session.connection(), TIPS_CONTENT)
+
+def reload_tip_catalog(force=False):
+    """Rebuild the tip snapshot if the DB version moved; returns the current snapshot
+
+    Reads on its own session, so a failure never touches the calling request's work
+    """
+    global _tip_snapshot
+    with Session(db.engine) as session:
+        row = session.get(ContentVersion, TIPS_CONTENT)
+        version = row.version if row else 0
+        if not force and version == _tip_snapshot.version:
+            return _tip_snapshot
+        rows = [(tip.condition, tip.to_dict()) for tip in session.scalars(select(EducationalTip).order_by(EducationalTip.id))]
+    if rows:
+        _tip_snapshot = TipSnapshot(version, 'database', rows)
+    else:
+        # Unseeded database: keep serving the built-in tips
+        _tip_snapshot = TipSnapshot(version, 'literal', literal_tip_rows())
+    return _tip_snapshot
+
+def tip_catalog():
+    """Current tip snapshot
+
+    Reads are lock-free. Once per TIPS_VERSION_CHECK_SECONDS a single
+    thread compares the DB version and reloads if it changed; everyone
+    else keeps reading the previous snapshot meanwhile.
+    """
+    global _tip_checked_at
+    interval = current_app.config.get('TIPS_VERSION_CHECK_SECONDS', 30)
+    now = time.monotonic()
+    if _tip_checked_at is None or now - _tip_checked_at >= interval:
+        if _tip_reload_lock.acquire(blocking=False):
+            try:
+                _tip_checked_at = now
+                reload_tip_catalog()
+            except Exception:
+                current_app.logger.exception('Tip catalog reload failed; serving the previous snapshot')
+            finally:
+                _tip_reload_lock.release()
+    return _tip_snapshot
+
+@request_memoized
+@single_flight
 def get_glucose_trend(user_id, days=7):
     """Analyze glucose trends over the past week"""
     end_date = datetime.now().date()
@@ -136,9 +288,11 @@ def get_glucose_trend(user_id, days=7):
         'latest_reading': readings[0].to_dict() if readings else None
     }
 
+@request_memoized
+@single_flight
 def get_personalized_insights(user_id):
     """Get personalized educational insights for a user"""
-    user = User.query.get(user_id)
+    user = get_user(user_id)
     if not user:
         return []
     
@@ -146,21 +300,19 @@ def get_personalized_insights(user_id):
     glucose_trend = get_glucose_trend(user_id)
     
     # Get latest reading status
-    latest_reading = Reading.query.filter_by(user_id=user_id).order_by(
-        Reading.date.desc(), Reading.time.desc()
-    ).first()
+    latest_reading = get_latest_reading(user_id)
     
+    tips = tip_catalog()
     if latest_reading:
         glucose_status = latest_reading.glucose_status
         
         # Add glucose-specific tips
-        if glucose_status in KENYAN_EDUCATIONAL_TIPS:
-            insights.extend(KENYAN_EDUCATIONAL_TIPS[glucose_status])
+        if glucose_status:
+            insights.extend(tips.for_condition(glucose_status))
     
     # Add BMI-specific tips
-    if user.bmi_category and user.bmi_category.lower().replace(' ', '_') in KENYAN_EDUCATIONAL_TIPS['bmi_tips']:
-        bmi_category = user.bmi_category.lower().replace(' ', '_')
-        insights.extend(KENYAN_EDUCATIONAL_TIPS['bmi_tips'][bmi_category])
+    if user.bmi_category:
+        insights.extend(tips.for_condition('bmi_' + user.bmi_category.lower().replace(' ', '_')))
     
     # Add trend-based insights
     if glucose_trend['trend'] == 'increasing':
@@ -212,37 +364,16 @@ def seed_educational_tips():
     # Clear existing tips
     EducationalTip.query.delete()
     
-    # Add tips from our knowledge base
-    all_tips = []
-    for condition, tips in KENYAN_EDUCATIONAL_TIPS.items():
-        if condition != 'bmi_tips':
-            for tip in tips:
-                all_tips.append(EducationalTip(
-                    category=tip['category'],
-                    condition=condition,
-                    title=tip['title'],
-                    content=tip['content'],
-                    local_relevance=tip['local_relevance'],
-                    priority=tip['priority']
-                ))
-    
-    # Add BMI tips
-    for bmi_category, tips in KENYAN_EDUCATIONAL_TIPS['bmi_tips'].items():
-        for tip in tips:
-            all_tips.append(EducationalTip(
-                category=tip['category'],
-                condition=f'bmi_{bmi_category}',
-                title=tip['title'],
-                content=tip['content'],
-                local_relevance=tip['local_relevance'],
-                priority=tip['priority']
-            ))
-    
-    # Add to database
-    for tip in all_tips:
-        db.session.add(tip)
+    # Add tips from our knowledge base in a single bulk insert
+    now = datetime.utcnow()
+    all_tips = [
+        {'condition': condition, 'created_at': now, **{f: tip[f] for f in TIP_FIELDS}}
+        for condition, tip in literal_tip_rows()
+    ]
     
     try:
+        db.session.execute(EducationalTip.__table__.insert(), all_tips)
+        bump_content_version(db.session.connection(), TIPS_CONTENT)
         db.session.commit()
         print(f"Successfully seeded {len(all_tips)} educational tips")
     except Exception as e:
@@ -251,6 +382,6 @@ def seed_educational_tips():
 
 if __name__ == "__main__":
     # For testing
-    from config import app
-    with app.app_context():
+    from config import create_app
+    with create_app().app_context():
         seed_educational_tips()
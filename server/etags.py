@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Conditional GET for user-scoped endpoints
+Every ORM write to a user's readings, medications, reminders, profile or BMI
+snapshots bumps that user's data version; ETags are derived from it so an
+unchanged resource is answered with 304 before its query runs
+"""
+
+import hashlib
+from datetime import date
+from functools import wraps
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import User, Reading, Medication, Reminder, BMISnapshot, Doctor, UserDataVersion
+from educational_insights import bump_content_version, get_content_version, increment_version, tip_catalog
+from lookups import user_data_version
+from deadlines import is_stale
+
+VERSIONED_MODELS = (User, Reading, Medication, Reminder, BMISnapshot)
+DOCTORS_CONTENT = 'doctors'
+
+def _owner_id(obj):
+    if isinstance(obj, User):
+        return obj.id
+    if obj.user_id is not None:
+        return obj.user_id
+    user = getattr(obj, 'user', None)
+    return user.id if user is not None else None
+
+def bump_user_version(connection, user_id):
+    """Increment a user's data version inside the caller's transaction"""
+    increment_version(connection, UserDataVersion.__table__, user_id=user_id)
+
+@event.listens_for(Session, 'before_flush')
+def _bump_versions_on_write(session, flush_context, instances):
+    """Bump the owner's version for every changed row of a versioned model"""
+    user_ids = set()
+    doctors_changed = False
+    for obj in (*session.new, *session.deleted, *(o for o in session.dirty if session.is_modified(o))):
+        if isinstance(obj, VERSIONED_MODELS):
+            user_id = _owner_id(obj)
+            # A user being created has no id yet, and nobody can hold an ETag for it
+            if user_id is not None:
+                user_ids.add(int(user_id))
+        elif isinstance(obj, Doctor):
+            doctors_changed = True
+    if user_ids or doctors_changed:
+        connection = session.connection()
+        for user_id in sorted(user_ids):
+            bump_user_version(connection, user_id)
+        if doctors_changed:
+            bump_content_version(connection, DOCTORS_CONTENT)
+
+# Extra validators for endpoints whose output depends on more than the user's rows
+def today():
+    return date.today().isoformat()
+
+def tips_version():
+    return tip_catalog().version
+
+def doctors_version():
+    return get_content_version(DOCTORS_CONTENT)
+
+def _split(result):
+    if isinstance(result, tuple):
+        data, status, *rest = result
+        return data, status, dict(rest[0]) if rest else {}
+    return result, 200, {}
+
+def conditional_get(*validators):
+    """Answer If-None-Match with 304 before running the wrapped handler
+
+    Place below @jwt_required(). The ETag covers the user, their data
+    version, the path and query string, the Accept header (JSON and
+    MessagePack are separate representations) and any extra validators.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            user_id = int(get_jwt_identity())
+            parts = (user_id, user_data_version(user_id), request.full_path, request.headers.get('Accept', ''), *(v() for v in validators))
+            etag = hashlib.sha1(repr(parts).encode()).hexdigest()
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+            data, status, headers = _split(fn(*args, **kwargs))
+            # A stale fallback must not be cached under the current version's ETag
+            if status == 200 and not is_stale(data):
+                headers['ETag'] = f'"{etag}"'
+                headers['Cache-Control'] = 'private, no-cache'
+            return data, status, headers
+        return wrapper
+    return decorator
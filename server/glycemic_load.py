@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Meal glycemic-load calculator
+Scores plates of Kenyan foods against a nutrient matrix precomputed from KENYAN_FOODS
+"""
+
+from kenyan_foods import KENYAN_FOODS, FOOD_CATALOG
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; plates are then summed in pure Python
+    np = None
+
+# Columns of the nutrient matrix, all per gram of food
+COLUMNS = ('total_carbs', 'fiber', 'net_carbs', 'glycemic_load')
+
+# Rough glucose rise (mg/dL) per unit of glycemic load; heuristic, not clinical
+SPIKE_PER_GL = 2.0
+DEFAULT_GRAMS = 100.0
+MAX_GRAMS = 2000.0
+MAX_PLATES = 1000
+
+FOOD_KEYS = tuple(KENYAN_FOODS)
+FOOD_INDEX = {key: i for i, key in enumerate(FOOD_KEYS)}
+
+def _nutrient_row(food):
+    net_carbs = max(food['carbs'] - food['fiber'], 0.0)
+    return (
+        food['carbs'] / 100.0,
+        food['fiber'] / 100.0,
+        net_carbs / 100.0,
+        net_carbs * food['glycemic_index'] / 10000.0,
+    )
+
+NUTRIENT_ROWS = tuple(_nutrient_row(KENYAN_FOODS[key]) for key in FOOD_KEYS)
+NUTRIENT_MATRIX = np.array(NUTRIENT_ROWS, dtype=float) if np is not None else None
+
+def gl_category(glycemic_load):
+    """Standard per-meal glycemic load bands"""
+    if glycemic_load <= 10:
+        return 'low'
+    if glycemic_load < 20:
+        return 'medium'
+    return 'high'
+
+def parse_plate(items):
+    """Validate [{'food': name, 'grams': n}, ...] into [(food_index, grams), ...]
+
+    Foods may be given by key, English or Swahili name. Raises ValueError.
+    """
+    if not isinstance(items, list) or not items:
+        raise ValueError('each plate needs a non-empty items list')
+    parsed = []
+    for item in items:
+        if not isinstance(item, dict) or not item.get('food'):
+            raise ValueError('each item needs a food name')
+        key = FOOD_CATALOG.resolve(str(item['food']))
+        if not key:
+            raise ValueError(f"Food not found in database: {item['food']}")
+        try:
+            grams = float(item.get('grams', DEFAULT_GRAMS))
+        except (TypeError, ValueError):
+            raise ValueError('grams must be a number')
+        if not 0 < grams <= MAX_GRAMS:
+            raise ValueError(f'grams must be between 0 and {MAX_GRAMS:.0f}')
+        parsed.append((FOOD_INDEX[key], grams))
+    return parsed
+
+def _plate_totals(plates):
+    """Sum the nutrient matrix over every plate: one row of COLUMNS per plate"""
+    if np is not None:
+        food_idx = np.array([i for plate in plates for i, _ in plate], dtype=np.intp)
+        grams = np.array([g for plate in plates for _, g in plate], dtype=float)
+        plate_idx = np.repeat(np.arange(len(plates)), [len(plate) for plate in plates])
+        item_values = NUTRIENT_MATRIX[food_idx] * grams[:, None]
+        totals = np.stack([
+            np.bincount(plate_idx, weights=item_values[:, col], minlength=len(plates))
+            for col in range(len(COLUMNS))
+        ], axis=1)
+        return totals.tolist(), item_values.tolist()
+
+    totals, item_values = [], []
+    for plate in plates:
+        row = [0.0] * len(COLUMNS)
+        for i, grams in plate:
+            values = [v * grams for v in NUTRIENT_ROWS[i]]
+            item_values.append(values)
+            for col, v in enumerate(values):
+                row[col] += v
+        totals.append(row)
+    return totals, item_values
+
+def score_plates(plates, plate_ids=None):
+    """Score parsed plates in one pass; returns one result dict per plate"""
+    totals, item_values = _plate_totals(plates)
+    results = []
+    offset = 0
+    for n, plate in enumerate(plates):
+        total_carbs, fiber, net_carbs, glycemic_load = totals[n]
+        items = []
+        for i, grams in plate:
+            values = item_values[offset]
+            offset += 1
+            items.append({
+                'food': FOOD_KEYS[i],
+                'grams': grams,
+                'net_carbs': round(values[2], 1),
+                'glycemic_load': round(values[3], 1),
+            })
+        result = {
+            'total_carbs': round(total_carbs, 1),
+            'fiber': round(fiber, 1),
+            'net_carbs': round(net_carbs, 1),
+            'glycemic_load': round(glycemic_load, 1),
+            # Carb-weighted GI of the whole meal
+            'glycemic_index': round(glycemic_load * 100 / net_carbs) if net_carbs else 0,
+            'gl_category': gl_category(glycemic_load),
+            'estimated_spike': round(glycemic_load * SPIKE_PER_GL),
+            'items': items,
+        }
+        if plate_ids is not None:
+            result = {'id': plate_ids[n], **result}
+        results.append(result)
+    return results
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Production gunicorn settings: gunicorn -c gunicorn.conf.py wsgi:app
+Pre-forked gthread workers sized from the CPU count; every setting can be
+overridden from the environment (WEB_CONCURRENCY, GUNICORN_THREADS, ...)
+"""
+
+import os
+
+
+def _cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5555')}"
+
+# Worker processes for CPU-bound work, threads within each to overlap I/O waits
+workers = int(os.environ.get('WEB_CONCURRENCY', _cpus() * 2 + 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import the app once in the master; workers fork with the code already loaded.
+# create_app() opens no connections, so nothing DB-related is shared across the fork
+preload_app = True
+
+# gthread workers heartbeat from their main loop, so this only catches a hung
+# worker; analytics requests give up after ANALYTICS_MAX_WAIT_SECONDS (20 s)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = 5
+
+# Recycle workers now and then to bound slow leaks; jitter staggers the restarts
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# The heartbeat file lives in memory rather than on a possibly slow container disk
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+# Set GUNICORN_ACCESS_LOG= (empty) to turn access logging off
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None
+errorlog = '-'
+
+# Workers write their /metrics totals here so a scrape of any worker covers all
+# of them (metrics.py); an exited worker's totals move into one retired file.
+# Set before the app is imported; Config reads it then
+os.environ.setdefault('METRICS_DIR', os.path.join(
+    '/dev/shm' if os.path.isdir('/dev/shm') else '/tmp',
+    f"diabetes-metrics-{os.environ.get('PORT', '5555')}",
+))
+
+
+def on_starting(server):
+    """Start counters from zero: drop snapshots left by a previous run"""
+    directory = os.environ['METRICS_DIR']
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.endswith('.pickle') or name.endswith('.tmp'):
+                os.remove(os.path.join(directory, name))
+
+
+def when_ready(server):
+    """Load what the app defers to first use, once, before workers fork"""
+    import Glucose_predictor, glycemic_load, Gamification  # noqa: F401
+    from app import KENYAN_FOODS_BODY
+    KENYAN_FOODS_BODY.current()
+
+
+def worker_exit(server, worker):
+    """Last snapshot from the exiting worker, so child_exit retires all of its counts"""
+    import metrics
+    if metrics._flusher_pid != os.getpid():
+        return  # served nothing, or metrics are off
+    try:
+        metrics.flush(os.environ['METRICS_DIR'])
+    except OSError:
+        pass
+
+
+def child_exit(server, worker):
+    """In the master: fold the exited worker's snapshot into the retired totals"""
+    import metrics
+    metrics.retire(os.environ['METRICS_DIR'], worker.pid)
+
+
+def post_fork(server, worker):
+    # Connections must never cross a fork; drop any pooled in the master
+    from config import db
+    from wsgi import app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -4,6 +4,8 @@ Kenyan Food Database with nutritional information
 Focused on common foods and their impact on blood glucose
 """
 
+from catalogs import FrozenDict, LANGUAGES, freeze
+
 # Kenyan foods with nutritional data (per 100g serving)
 KENYAN_FOODS = {
     'ugali': {
@@ -223,55 +225,202 @@ KENYAN_FOODS = {
     }
 }
 
+# Glycemic index bands (international GI tables); GI 0 means no glucose impact
+def gi_band(glycemic_index):
+    if not glycemic_index:
+        return 'none'
+    if glycemic_index <= 55:
+        return 'low'
+    if glycemic_index <= 69:
+        return 'medium'
+    return 'high'
+
+def normalize_name(text):
+    """Lowercase and reduce a food name to space-separated alphanumeric words"""
+    cleaned = ''.join(ch if ch.isalnum() else ' ' for ch in (text or '').lower())
+    return ' '.join(cleaned.split())
+
+def _trigrams(term):
+    padded = f' {term} '
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+class FoodCatalog:
+    """KENYAN_FOODS with secondary indexes built once at load time
+
+    Indexes: glucose impact, category, GI band, English/Swahili names,
+    a prefix trie over names and name words, and a trigram index for
+    typo-tolerant search.
+    """
+
+    def __init__(self, foods):
+        self.foods = foods
+        by_impact, by_category, by_gi_band = {}, {}, {}
+        self.names = {}      # normalized name -> food key
+        self._trie = {}      # char -> child node; '' -> keys under this prefix
+        self._term_keys = {}  # indexed term -> food keys
+        self._term_size = {}  # indexed term -> number of distinct trigrams
+        self._grams = {}     # trigram -> indexed terms
+
+        for key, food in foods.items():
+            by_impact.setdefault(food['glucose_impact'], []).append(key)
+            by_category.setdefault(food['category'], []).append(key)
+            by_gi_band.setdefault(gi_band(food['glycemic_index']), []).append(key)
+            for name in (key, food['name_en'], food['name_sw']):
+                normalized = normalize_name(name)
+                self.names.setdefault(normalized, key)
+                for term in {normalized, *normalized.split()}:
+                    self._index_term(term, key)
+
+        self.by_impact = freeze(by_impact)
+        self.by_category = freeze(by_category)
+        self.by_gi_band = freeze(by_gi_band)
+        self.diabetes_friendly = self.keys_by_impact('low', 'none')
+        self.to_limit = self.keys_by_impact('high', 'very_high')
+
+    def _index_term(self, term, key):
+        node = self._trie
+        node.setdefault('', set()).add(key)
+        for ch in term:
+            node = node.setdefault(ch, {})
+            node.setdefault('', set()).add(key)
+        if term not in self._term_keys:
+            self._term_keys[term] = set()
+            grams = _trigrams(term)
+            self._term_size[term] = len(grams)
+            for gram in grams:
+                self._grams.setdefault(gram, []).append(term)
+        self._term_keys[term].add(key)
+
+    def keys_by_impact(self, *levels):
+        return tuple(k for level in levels for k in self.by_impact.get(level, ()))
+
+    def subset(self, keys):
+        return {k: self.foods[k] for k in keys}
+
+    def resolve(self, name):
+        """Food key for an exact key, English or Swahili name (case/spacing-insensitive)"""
+        return self.names.get(normalize_name(name))
+
+    def get(self, name):
+        key = self.resolve(name)
+        return self.foods[key] if key else None
+
+    def filter(self, impact=None, category=None, gi_band=None):
+        """Food keys matching every given facet, in catalog order"""
+        selected = None
+        for index, value in ((self.by_impact, impact), (self.by_category, category), (self.by_gi_band, gi_band)):
+            if value is None:
+                continue
+            keys = set(index.get(value, ()))
+            selected = keys if selected is None else selected & keys
+        if selected is None:
+            return tuple(self.foods)
+        return tuple(k for k in self.foods if k in selected)
+
+    def _prefix_keys(self, prefix):
+        node = self._trie
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return set()
+        return node.get('', set())
+
+    def search(self, query, limit=10, min_similarity=0.3, keys=None):
+        """Rank foods for `query`: exact name, then prefix, then trigram similarity
+
+        Returns a list of (food_key, score, match) tuples, best first.
+        `keys` optionally restricts results (e.g. to the output of filter()).
+        """
+        q = normalize_name(query)
+        if not q:
+            return []
+        scores = {}
+
+        def offer(key, score, match):
+            if keys is not None and key not in keys:
+                return
+            if key not in scores or scores[key][0] < score:
+                scores[key] = (score, match)
+
+        exact = self.names.get(q)
+        if exact:
+            offer(exact, 1.0, 'exact')
+        for key in self._prefix_keys(q):
+            offer(key, 0.9, 'prefix')
+
+        query_grams = _trigrams(q)
+        hits = {}
+        for gram in query_grams:
+            for term in self._grams.get(gram, ()):
+                hits[term] = hits.get(term, 0) + 1
+        for term, shared in hits.items():
+            similarity = 2.0 * shared / (len(query_grams) + self._term_size[term])
+            if similarity >= min_similarity:
+                for key in self._term_keys[term]:
+                    offer(key, round(0.8 * similarity, 3), 'fuzzy')
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1][0], item[0]))
+        return [(key, score, match) for key, (score, match) in ranked[:limit]]
+
+FOOD_CATALOG = FoodCatalog(KENYAN_FOODS)
+
 def get_food_by_name(name):
     """Get food data by name (English or Swahili)"""
-    name_lower = name.lower().replace(' ', '_')
-    return KENYAN_FOODS.get(name_lower)
+    return FOOD_CATALOG.get(name)
 
 def get_foods_by_glucose_impact(impact_level):
     """Get foods by glucose impact level: low, medium, high, very_high, none"""
-    return {k: v for k, v in KENYAN_FOODS.items() if v['glucose_impact'] == impact_level}
+    return FOOD_CATALOG.subset(FOOD_CATALOG.by_impact.get(impact_level, ()))
 
 def get_diabetes_friendly_foods():
     """Get foods with low glucose impact"""
-    return get_foods_by_glucose_impact('low') | get_foods_by_glucose_impact('none')
+    return FOOD_CATALOG.subset(FOOD_CATALOG.diabetes_friendly)
 
 def get_foods_to_limit():
     """Get foods with high glucose impact"""
-    return get_foods_by_glucose_impact('high') | get_foods_by_glucose_impact('very_high')
+    return FOOD_CATALOG.subset(FOOD_CATALOG.to_limit)
 
-def get_food_recommendations(diabetes_type, language='en'):
-    """Get personalized food recommendations based on diabetes type"""
-    recommendations = {
-        'type1': {
-            'en': [
-                'Focus on carb counting with ugali and chapati',
-                'Sukuma wiki and terere are excellent choices',
-                'Time insulin with high-carb foods like githeri',
-                'Nyama choma provides protein without affecting blood sugar'
-            ],
-            'sw': [
-                'Zingatia kuhesabu kabohaidreti na ugali na chapati',
-                'Sukuma wiki na terere ni chaguo bora',
-                'Panga insulini na chakula chenye kabohaidreti nyingi kama githeri',
-                'Nyama choma inatoa protini bila kuathiri sukari ya damu'
-            ]
-        },
-        'type2': {
-            'en': [
-                'Limit ugali and chapati portions',
-                'Fill half your plate with sukuma wiki and terere',
-                'Choose githeri over ugali for better blood sugar control',
-                'Avoid mandazi and other fried foods'
-            ],
-            'sw': [
-                'Punguza vipimo vya ugali na chapati',
-                'Jaza nusu ya sahani yako na sukuma wiki na terere',
-                'Chagua githeri badala ya ugali kwa kudhibiti sukari vizuri',
-                'Epuka mandazi na vyakula vingine vya kukaanga'
-            ]
-        }
+# Recommendations by diabetes type, frozen at import
+FOOD_RECOMMENDATIONS = freeze({
+    'type1': {
+        'en': [
+            'Focus on carb counting with ugali and chapati',
+            'Sukuma wiki and terere are excellent choices',
+            'Time insulin with high-carb foods like githeri',
+            'Nyama choma provides protein without affecting blood sugar'
+        ],
+        'sw': [
+            'Zingatia kuhesabu kabohaidreti na ugali na chapati',
+            'Sukuma wiki na terere ni chaguo bora',
+            'Panga insulini na chakula chenye kabohaidreti nyingi kama githeri',
+            'Nyama choma inatoa protini bila kuathiri sukari ya damu'
+        ]
+    },
+    'type2': {
+        'en': [
+            'Limit ugali and chapati portions',
+            'Fill half your plate with sukuma wiki and terere',
+            'Choose githeri over ugali for better blood sugar control',
+            'Avoid mandazi and other fried foods'
+        ],
+        'sw': [
+            'Punguza vipimo vya ugali na chapati',
+            'Jaza nusu ya sahani yako na sukuma wiki na terere',
+            'Chagua githeri badala ya ugali kwa kudhibiti sukari vizuri',
+            'Epuka mandazi na vyakula vingine vya kukaanga'
+        ]
     }
-    
-    return recommendations.get(diabetes_type, {}).get(language, [])
+})
+
+# Per-language name/tips views of KENYAN_FOODS: {lang: {food_key: {'name', 'tips'}}}
+FOOD_VIEWS = FrozenDict({
+    language: FrozenDict({
+        key: freeze({'name': food[f'name_{language}'], 'tips': food['diabetes_tips'][language]})
+        for key, food in KENYAN_FOODS.items()
+    })
+    for language in LANGUAGES
+})
 
+def get_food_recommendations(diabetes_type, language='en'):
+    """Get personalized food recommendations based on diabetes type"""
+    return FOOD_RECOMMENDATIONS.get(diabetes_type, {}).get(language, ())
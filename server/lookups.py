@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Request-scoped memoization for lookups shared by several handlers
+Composite endpoints (e.g. /bootstrap) fetch the user and latest reading once per request
+"""
+
+from functools import wraps
+
+from flask import g, has_request_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from config import db
+from models import User, Reading, UserDataVersion
+
+def request_memoized(fn):
+    """Cache fn(*args, **kwargs) on flask.g for the rest of the request; plain call outside requests"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not has_request_context():
+            return fn(*args, **kwargs)
+        memo = g.setdefault('_request_memo', {})
+        key = (fn.__qualname__, args, tuple(sorted(kwargs.items())))
+        if key not in memo:
+            memo[key] = fn(*args, **kwargs)
+        return memo[key]
+    return wrapper
+
+@event.listens_for(Session, 'after_flush')
+def _forget_request_memo(session, flush_context):
+    """Writes invalidate everything memoized so far in this request"""
+    if has_request_context():
+        g.pop('_request_memo', None)
+
+@request_memoized
+def get_user(user_id):
+    return db.session.get(User, int(user_id))
+
+@request_memoized
+def get_latest_reading(user_id):
+    return Reading.query.filter_by(user_id=int(user_id)).order_by(
+        Reading.date.desc(), Reading.time.desc()
+    ).first()
+
+@request_memoized
+def user_data_version(user_id):
+    """Per-user data version (see etags.py); 0 until the user's first write"""
+    table = UserDataVersion.__table__
+    return db.session.execute(select(table.c.version).where(table.c.user_id == int(user_id))).scalar() or 0
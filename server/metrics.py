@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Request and SQL metrics in Prometheus text format at /metrics
+Each thread records into its own shard, so the request path takes no locks;
+a scrape sums the shards. Under gunicorn every worker also writes a snapshot
+to METRICS_DIR now and then, and a scrape adds up all workers' snapshots;
+when a worker exits the gunicorn master folds its snapshot into one file of
+retired totals, so recycled workers neither lose counts nor pile up files.
+Statements run on the analytics and section pools (no request context) are
+counted under endpoint="background"
+"""
+
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    import fcntl
+except ImportError:  # not on Windows, where the dev server runs a single process anyway
+    fcntl = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+SQL_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Totals of workers that have exited, kept beside the live <pid>.pickle snapshots
+RETIRED_SNAPSHOT = 'retired.pickle'
+
+# name -> (type, help, label names, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by endpoint, method and status', ('endpoint', 'method', 'status'), None),
+    'http_request_duration_seconds': ('histogram', 'Request latency', ('endpoint', 'method'), LATENCY_BUCKETS),
+    'http_response_bytes_total': ('counter', 'Response body bytes sent (after compression)', ('endpoint',), None),
+    'http_request_sql_statements': ('histogram', 'SQL statements per request', ('endpoint',), STATEMENT_BUCKETS),
+    'http_request_sql_seconds': ('histogram', 'Time in SQL per request', ('endpoint',), SQL_TIME_BUCKETS),
+    'db_statements_total': ('counter', 'SQL statements executed', ('endpoint',), None),
+    'db_statement_seconds_total': ('counter', 'Time spent executing SQL', ('endpoint',), None),
+}
+
+_local = threading.local()
+_shards = []
+_shards_lock = threading.Lock()
+_flusher_pid = None
+
+def _shard():
+    """This thread's {(name, labels): value or [bucket counts..., sum, count]}"""
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = {}
+        # Once per thread; the shard outlives the thread so totals never go down
+        with _shards_lock:
+            _shards.append(shard)
+    return shard
+
+def inc(name, labels, amount=1):
+    shard = _shard()
+    key = (name, labels)
+    shard[key] = shard.get(key, 0) + amount
+
+def observe(name, labels, value):
+    shard = _shard()
+    key = (name, labels)
+    series = shard.get(key)
+    buckets = METRICS[name][3]
+    if series is None:
+        series = shard[key] = [0] * (len(buckets) + 2)
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            series[i] += 1
+            break
+    series[-2] += value
+    series[-1] += 1
+
+def _merge(total, part):
+    for key, value in part.items():
+        if isinstance(value, list):
+            into = total.setdefault(key, [0] * len(value))
+            for i, v in enumerate(value):
+                into[i] += v
+        else:
+            total[key] = total.get(key, 0) + value
+    return total
+
+def snapshot():
+    """This process's totals"""
+    with _shards_lock:
+        shards = list(_shards)
+    total = {}
+    for shard in shards:
+        # dict.copy() is atomic under the GIL; the owning thread may be writing
+        _merge(total, {key: list(v) if isinstance(v, list) else v for key, v in shard.copy().items()})
+    return total
+
+def _start_flusher(directory, interval):
+    """One daemon thread per process (started after the fork) writing snapshots"""
+    global _flusher_pid
+    with _shards_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                flush(directory)
+            except OSError:
+                pass
+    threading.Thread(target=run, name='metrics-flush', daemon=True).start()
+
+def _snapshot_path(directory, pid=None):
+    return os.path.join(directory, f'{pid or os.getpid()}.pickle')
+
+def _load(path):
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return {}
+
+def _write(path, totals):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(totals, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+@contextmanager
+def _directory_lock(directory, operation):
+    """Shared for scrapes, exclusive while a snapshot moves into the retired totals"""
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.join(directory, '.lock'), 'a') as lock:
+        fcntl.flock(lock, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def flush(directory):
+    """Write this process's totals for other workers' scrapes (atomic rename)"""
+    _write(_snapshot_path(directory), snapshot())
+
+def retire(directory, pid):
+    """Fold an exited worker's snapshot into the retired totals and delete it
+    Called by the gunicorn master only (child_exit), before the pid can be reused"""
+    path = _snapshot_path(directory, pid)
+    if not os.path.exists(path):
+        return
+    with _directory_lock(directory, fcntl and fcntl.LOCK_EX):
+        retired = os.path.join(directory, RETIRED_SNAPSHOT)
+        _write(retired, _merge(_load(retired), _load(path)))
+        os.remove(path)
+        if os.path.exists(f'{path}.tmp'):
+            os.remove(f'{path}.tmp')
+
+def collect(directory=None):
+    """Totals across every worker that has written to directory, or this process alone"""
+    if not directory:
+        return snapshot()
+    flush(directory)
+    total = {}
+    # Under the lock a retiring worker is counted once: in its snapshot or in the retired totals
+    with _directory_lock(directory, fcntl and fcntl.LOCK_SH):
+        for name in os.listdir(directory):
+            if name.endswith('.pickle'):
+                _merge(total, _load(os.path.join(directory, name)))
+    return total
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=''):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def render(totals):
+    """Prometheus text exposition format 0.0.4"""
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in totals.items() if metric == name)
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in series:
+            if kind == 'counter':
+                lines.append(f'{name}{_labels(label_names, labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, value):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f'{name}_bucket{_labels(label_names, labels, le)} {cumulative}')
+            le = 'le="+Inf"'
+            lines.append(f'{name}_bucket{_labels(label_names, labels, le)} {value[-1]}')
+            lines.append(f'{name}_sum{_labels(label_names, labels)} {value[-2]}')
+            lines.append(f'{name}_count{_labels(label_names, labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+def _endpoint():
+    return request.endpoint or 'unmatched'
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_start = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_metrics_start', None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    if has_request_context():
+        endpoint = _endpoint()
+        stats = g.get('_metrics_sql')
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+    else:
+        endpoint = 'background'
+    inc('db_statements_total', (endpoint,))
+    inc('db_statement_seconds_total', (endpoint,), elapsed)
+
+def _start_timer():
+    g._metrics_start = time.perf_counter()
+    g._metrics_sql = [0, 0.0]
+
+def _record(response):
+    start = g.pop('_metrics_start', None)
+    if start is None:
+        return response
+    endpoint = _endpoint()
+    method = request.method
+    inc('http_requests_total', (endpoint, method, str(response.status_code)))
+    observe('http_request_duration_seconds', (endpoint, method), time.perf_counter() - start)
+    if not response.is_streamed:
+        inc('http_response_bytes_total', (endpoint,), response.calculate_content_length() or 0)
+    statements, sql_seconds = g.pop('_metrics_sql', (0, 0.0))
+    observe('http_request_sql_statements', (endpoint,), statements)
+    observe('http_request_sql_seconds', (endpoint,), sql_seconds)
+
+    directory = current_app.config.get('METRICS_DIR')
+    if directory and _flusher_pid != os.getpid():
+        _start_flusher(directory, current_app.config.get('METRICS_FLUSH_SECONDS', 1.0))
+    return response
+
+def metrics_view():
+    body = render(collect(current_app.config.get('METRICS_DIR')))
+    return current_app.response_class(body, content_type=CONTENT_TYPE, headers={'Cache-Control': 'no-store'})
+
+def init_metrics(app):
+    """Register the timing hooks and /metrics; call before other after_request hooks"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    directory = app.config.get('METRICS_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    app.before_request(_start_timer)
+    # after_request hooks run in reverse order, so this sees the final (compressed) body
+    app.after_request(_record)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
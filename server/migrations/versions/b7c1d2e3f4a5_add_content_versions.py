@@ -0,0 +1,29 @@
+"""Add content versions
+
+Revision ID: b7c1d2e3f4a5
+Revises: f5f000819eb8
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c1d2e3f4a5'
+down_revision = 'f5f000819eb8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('content_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('content_versions')
@@ -109,26 +109,12 @@ class User(db.Model):
     @hybrid_property
     def bmi(self):
         """Calculate BMI: weight (kg) / (height (m))²"""
-        if self.weight_kg and self.height_cm:
-            height_m = self.height_cm / 100
-            return round(self.weight_kg / (height_m ** 2), 1)
-        return None
+        return bmi_for(self.weight_kg, self.height_cm)
     
     @hybrid_property
     def bmi_category(self):
         """Get BMI category based on WHO standards"""
-        bmi_value = self.bmi
-        if not bmi_value:
-            return None
-        
-        if bmi_value < 18.5:
-            return "Underweight"
-        elif bmi_value < 25:
-            return "Normal weight"
-        elif bmi_value < 30:
-            return "Overweight"
-        else:
-            return "Obese"
+        return bmi_category_label(self.bmi)
     
     def to_dict(self):
         return {
@@ -152,6 +138,61 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.name}>'
 
+def bmi_for(weight_kg, height_cm):
+    """BMI rounded to 0.1, None unless both weight (kg) and height (cm) are set"""
+    if weight_kg and height_cm:
+        height_m = height_cm / 100
+        return round(weight_kg / (height_m ** 2), 1)
+    return None
+
+def bmi_category_label(bmi_value):
+    """WHO category for a BMI value"""
+    if not bmi_value:
+        return None
+    
+    if bmi_value < 18.5:
+        return "Underweight"
+    elif bmi_value < 25:
+        return "Normal weight"
+    elif bmi_value < 30:
+        return "Overweight"
+    else:
+        return "Obese"
+
+def glucose_status_for(value, context):
+    """Classify a glucose value (mg/dL) for its measurement context"""
+    if not value:
+        return None
+        
+    # General guidelines (mg/dL)
+    if context == 'fasting':
+        if value < 70:
+            return 'low'
+        elif value <= 100:
+            return 'normal'
+        elif value <= 125:
+            return 'prediabetic'
+        else:
+            return 'high'
+    elif context == 'post_meal':
+        if value < 70:
+            return 'low'
+        elif value <= 140:
+            return 'normal'
+        elif value <= 199:
+            return 'prediabetic'
+        else:
+            return 'high'
+    else:  # pre_meal, random, bedtime
+        if value < 70:
+            return 'low'
+        elif value <= 130:
+            return 'normal'
+        elif value <= 180:
+            return 'elevated'
+        else:
+            return 'high'
+
 class Reading(db.Model):  # Blood glucose reading
     __tablename__ = 'readings'
     
@@ -175,37 +216,7 @@ class Reading(db.Model):  # Blood glucose reading
     @hybrid_property
     def glucose_status(self):
         """Determine if glucose reading is normal, high, or low"""
-        if not self.value:
-            return None
-            
-        # General guidelines (mg/dL)
-        if self.context == 'fasting':
-            if self.value < 70:
-                return 'low'
-            elif self.value <= 100:
-                return 'normal'
-            elif self.value <= 125:
-                return 'prediabetic'
-            else:
-                return 'high'
-        elif self.context == 'post_meal':
-            if self.value < 70:
-                return 'low'
-            elif self.value <= 140:
-                return 'normal'
-            elif self.value <= 199:
-                return 'prediabetic'
-            else:
-                return 'high'
-        else:  # pre_meal, random, bedtime
-            if self.value < 70:
-                return 'low'
-            elif self.value <= 130:
-                return 'normal'
-            elif self.value <= 180:
-                return 'elevated'
-            else:
-                return 'high'
+        return glucose_status_for(self.value, self.context)
     
     def to_dict(self):
         return {
@@ -358,3 +369,26 @@ class DoctorMessage(db.Model):
             'is_emergency': self.is_emergency,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+class ContentVersion(db.Model):
+    """Version counters for DB-backed content catalogs (e.g. educational tips)"""
+    __tablename__ = 'content_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class UserDataVersion(db.Model):
+    """Per-user counter bumped on every write to that user's data; feeds ETags"""
+    __tablename__ = 'user_data_versions'
+    
+    user_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Pre-serialized, pre-compressed bodies for static and rarely-changing responses
+Each body is encoded once (identity, gzip and, when available, brotli) with
+one strong ETag per encoding, so serving it is a byte copy
+"""
+
+import hashlib
+import threading
+
+from flask import current_app, request
+
+from serialization import ENCODINGS, compress, dumps, negotiate_encoding
+
+ETAG_SUFFIX = {None: '', 'gzip': '-gz', 'br': '-br'}
+
+class PrecompressedBody:
+    def __init__(self, data, cache_control, version=None):
+        identity = dumps(data)
+        self.version = version
+        self.cache_control = cache_control
+        self.payloads = {None: identity}
+        for encoding in ENCODINGS:
+            self.payloads[encoding] = compress(identity, encoding, best=True)
+        digest = hashlib.sha1(identity).hexdigest()
+        self.etags = {encoding: digest + ETAG_SUFFIX[encoding] for encoding in self.payloads}
+
+    def response(self):
+        """304 if the client holds any encoding of this body, else the best encoding"""
+        encoding = negotiate_encoding(request.accept_encodings, self.payloads)
+        if any(request.if_none_match.contains_weak(etag) for etag in self.etags.values()):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(self.payloads[encoding], mimetype='application/json')
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(self.etags[encoding])
+        response.headers['Cache-Control'] = self.cache_control
+        response.vary.add('Accept-Encoding')
+        return response
+
+class VersionedBody:
+    """A PrecompressedBody rebuilt whenever version() moves"""
+
+    def __init__(self, build, version, cache_control):
+        self._build = build
+        self._version = version
+        self._cache_control = cache_control
+        self._body = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        version = self._version()
+        body = self._body
+        if body is None or body.version != version:
+            with self._lock:
+                body = self._body
+                if body is None or body.version != version:
+                    body = self._body = PrecompressedBody(self._build(), self._cache_control, version)
+        return body
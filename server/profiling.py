@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+On-demand profiling of single requests
+An admin's request carrying X-Profile: cpu runs under cProfile, X-Profile: mem
+under tracemalloc; the response says where the result went (X-Profile-Id) and
+/admin/profiles serves it. Requests without the header pay one dict lookup.
+cProfile only sees the request's own thread (not the analytics or section
+pools); tracemalloc is process-wide, so one mem profile runs at a time and
+allocations by concurrent requests in that window are included
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+
+from flask import current_app, g, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from admin import is_admin
+from lookups import get_user
+
+ENVIRON_KEY = 'HTTP_X_PROFILE'
+KINDS = ('cpu', 'mem')
+PSTATS_SORTS = ('cumulative', 'tottime', 'calls')
+TRACEMALLOC_FRAMES = 10
+
+_mem_lock = threading.Lock()
+_ignore = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+)
+
+def profile_dir(app):
+    return app.config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+
+def _authorized():
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        return None
+    return identity if identity is not None and is_admin(get_user(identity)) else None
+
+def _start():
+    # The WSGI environ directly: several times cheaper than request.headers
+    kind = request.environ.get(ENVIRON_KEY)
+    if kind is None:
+        return
+    kind = kind.strip().lower()
+    if kind not in KINDS:
+        return
+    user_id = _authorized()
+    if user_id is None:
+        return  # non-admins get a normal, unprofiled response
+    state = {'kind': kind, 'user_id': user_id, 'start': time.perf_counter()}
+    if kind == 'cpu':
+        state['profiler'] = cProfile.Profile()
+        state['profiler'].enable()
+    else:
+        if not _mem_lock.acquire(blocking=False):
+            g._profile_busy = True
+            return
+        if tracemalloc.is_tracing():
+            state['baseline'] = tracemalloc.take_snapshot()
+        else:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        tracemalloc.reset_peak()
+    g._profile = state
+
+def _stop(state):
+    """Turn off the profiler; returns what _save needs"""
+    elapsed = time.perf_counter() - state['start']
+    if state['kind'] == 'cpu':
+        state['profiler'].disable()
+        return elapsed, state['profiler']
+    try:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if 'baseline' not in state:
+            tracemalloc.stop()
+    finally:
+        _mem_lock.release()
+    snapshot = snapshot.filter_traces(_ignore)
+    if 'baseline' in state:
+        stats = snapshot.compare_to(state['baseline'].filter_traces(_ignore), 'lineno')
+    else:
+        stats = snapshot.statistics('lineno')
+    return elapsed, {'stats': stats, 'current': current, 'peak': peak}
+
+def _save(app, state, elapsed, result, status):
+    directory = profile_dir(app)
+    os.makedirs(directory, exist_ok=True)
+    profile_id = uuid.uuid4().hex[:12]
+    meta = {
+        'id': profile_id,
+        'kind': state['kind'],
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+        'endpoint': request.endpoint,
+        'status': status,
+        'duration_ms': round(elapsed * 1000, 3),
+        'user_id': state['user_id'],
+        'pid': os.getpid(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+    }
+    if state['kind'] == 'cpu':
+        result.dump_stats(os.path.join(directory, f'{profile_id}.prof'))
+    else:
+        limit = app.config.get('PROFILE_TOP_ALLOCATIONS', 50)
+        meta['current_bytes'] = result['current']
+        meta['peak_bytes'] = result['peak']
+        meta['allocations'] = [{
+            'where': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+            'size_bytes': stat.size,
+            'count': stat.count,
+            **({'size_diff_bytes': stat.size_diff, 'count_diff': stat.count_diff} if hasattr(stat, 'size_diff') else {}),
+            'traceback': stat.traceback.format(limit=TRACEMALLOC_FRAMES),
+        } for stat in result['stats'][:limit]]
+    tmp = os.path.join(directory, f'{profile_id}.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(directory, f'{profile_id}.json'))
+    _prune(directory, app.config.get('PROFILE_KEEP', 50))
+    return profile_id
+
+def _prune(directory, keep):
+    """Keep the newest `keep` profiles"""
+    metas = sorted((e for e in os.scandir(directory) if e.name.endswith('.json')), key=lambda e: e.stat().st_mtime)
+    for entry in metas[:-keep] if keep else metas:
+        profile_id = entry.name[:-len('.json')]
+        for name in (entry.name, f'{profile_id}.prof'):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+def _finish(response):
+    if g.pop('_profile_busy', False):
+        response.headers['X-Profile-Status'] = 'busy'
+    state = g.pop('_profile', None)
+    if state is None:
+        return response
+    elapsed, result = _stop(state)
+    response.headers['X-Profile-Id'] = _save(current_app, state, elapsed, result, response.status_code)
+    return response
+
+def _abandon(exc):
+    """An unhandled exception skipped after_request: still stop and keep the profile"""
+    state = g.pop('_profile', None)
+    if state is not None:
+        elapsed, result = _stop(state)
+        _save(current_app, state, elapsed, result, 500)
+
+def list_profiles(app):
+    directory = profile_dir(app)
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.json'):
+            with open(entry.path, encoding='utf-8') as f:
+                meta = json.load(f)
+            meta.pop('allocations', None)
+            profiles.append(meta)
+    profiles.sort(key=lambda m: m['created_at'], reverse=True)
+    return profiles
+
+def load_profile(app, profile_id):
+    """Metadata (with allocations for mem profiles), or None"""
+    if not profile_id.isalnum():
+        return None
+    try:
+        with open(os.path.join(profile_dir(app), f'{profile_id}.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def pstats_path(app, profile_id):
+    return os.path.join(profile_dir(app), f'{profile_id}.prof')
+
+def pstats_text(app, profile_id, sort='cumulative', limit=40):
+    """The classic pstats table for a cpu profile"""
+    out = io.StringIO()
+    stats = pstats.Stats(pstats_path(app, profile_id), stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+def init_profiling(app):
+    """Register after the other hooks so the profile is of the view itself"""
+    if not app.config.get('PROFILING_ENABLED', True):
+        return
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.teardown_request(_abandon)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Read/write routing between the primary database and an optional read replica
+Handlers wrapped in @read_replica send their SELECTs to the 'replica' bind
+(DATABASE_REPLICA_URL); flushes, INSERT/UPDATE/DELETE and everything outside
+a wrapped handler go to the primary. Without a replica bind nothing changes.
+Replicas lag, so only endpoints that tolerate slightly old data are routed
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA = 'replica'
+_USE_REPLICA = 'use_replica'
+
+# config.py builds db with RoutingSession, so reach it through the app here
+def _db():
+    return current_app.extensions['sqlalchemy']
+
+class RoutingSession(Session):
+    """db.session class: reads go to the replica while session.info['use_replica'] is set"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get(_USE_REPLICA) and not self._flushing and not isinstance(clause, UpdateBase):
+            engine = self._db.engines.get(REPLICA)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def replica_enabled():
+    """Whether the current session routes reads to the replica"""
+    return bool(_db().session.info.get(_USE_REPLICA))
+
+@contextmanager
+def replica_reads(enabled=True):
+    info = _db().session.info
+    previous = info.get(_USE_REPLICA, False)
+    info[_USE_REPLICA] = enabled
+    try:
+        yield
+    finally:
+        info[_USE_REPLICA] = previous
+
+def read_replica(fn):
+    """Route the wrapped handler's reads to the replica; place above @conditional_get"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return fn(*args, **kwargs)
+    return wrapper
+
+def sync_sqlite_replica():
+    """Copy the primary SQLite database into the replica file (local stand-in for replication)"""
+    engines = _db().engines
+    primary, replica = engines[None], engines.get(REPLICA)
+    if replica is None or primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        raise ValueError('sync needs SQLite primary and replica databases (set DATABASE_REPLICA_URL)')
+    source, target = primary.raw_connection(), replica.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+    finally:
+        source.close()
+        target.close()
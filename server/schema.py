@@ -1,10 +1,9 @@
 # Schemas using Flask-Marshmallow
 from flask_marshmallow import Marshmallow
 
-from config import app
 from models import User, Reading, Medication, Meal, Doctor, Reminder, EducationalTip, DoctorMessage, BMISnapshot
 
-ma = Marshmallow(app)
+ma = Marshmallow()
 
 class UserSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Full-text search over reading notes, doctor messages, educational tips and foods
+Backed by SQLite FTS5 tables that triggers keep in sync with their source tables
+"""
+
+import re
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Time, text
+
+from config import db
+from kenyan_foods import KENYAN_FOODS
+
+TOKENIZE = 'unicode61 remove_diacritics 2'
+
+# External-content FTS tables: the index stores tokens only, rows stay in the source table.
+# Per-user tables also index an owner token ('u<user_id>') so a search is scoped
+# inside the index rather than by joining back to the owner; their content is a
+# view that adds that column
+FTS_TABLES = {
+    'readings_fts': {'content': 'readings', 'columns': ('notes',), 'owner': 'user_id'},
+    'doctor_messages_fts': {'content': 'doctor_messages', 'columns': ('message',), 'owner': 'user_id'},
+    'educational_tips_fts': {'content': 'educational_tips', 'columns': ('title', 'content')},
+}
+FOODS_FTS = 'foods_fts'
+SEARCH_TYPES = ('readings', 'messages', 'tips', 'foods')
+
+def _index_columns(spec):
+    return spec['columns'] + (('owner',) if 'owner' in spec else ())
+
+def _sync_ddl(name, spec):
+    content, columns, owner = spec['content'], spec['columns'], spec.get('owner')
+    cols = ', '.join(_index_columns(spec))
+    new_vals = ', '.join([f'new.{c}' for c in columns] + ([f"'u' || new.{owner}"] if owner else []))
+    old_vals = ', '.join([f'old.{c}' for c in columns] + ([f"'u' || old.{owner}"] if owner else []))
+    delete_old = f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old_vals});"
+    insert_new = f"INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new_vals});"
+    statements = []
+    source = content
+    if owner:
+        source = f'{name}_source'
+        statements.append(f"CREATE VIEW IF NOT EXISTS {source} AS SELECT id, {', '.join(columns)}, 'u' || {owner} AS owner FROM {content}")
+    watched = ', '.join(columns + ((owner,) if owner else ()))
+    return statements + [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5({cols}, content='{source}', content_rowid='id', tokenize='{TOKENIZE}')",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {content} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {content} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE OF {watched} ON {content} BEGIN {delete_old} {insert_new} END",
+    ]
+
+def _drop_ddl(name):
+    """An index built with other columns (before owner tokens) is dropped and rebuilt"""
+    return [f'DROP TRIGGER IF EXISTS {name}_{suffix}' for suffix in ('ai', 'ad', 'au')] + [
+        f'DROP TABLE IF EXISTS {name}',
+        f'DROP VIEW IF EXISTS {name}_source',
+    ]
+
+def _columns(conn, name):
+    return tuple(row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({name})'))
+
+def search_available():
+    return db.engine.dialect.name == 'sqlite'
+
+def install_search_index():
+    """Create FTS tables and sync triggers (idempotent); backfill tables created now"""
+    if not search_available():
+        return False
+    with db.engine.begin() as conn:
+        existing = {row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        for name, spec in FTS_TABLES.items():
+            if name in existing and _columns(conn, name) != _index_columns(spec):
+                for statement in _drop_ddl(name):
+                    conn.exec_driver_sql(statement)
+                existing.discard(name)
+            for statement in _sync_ddl(name, spec):
+                conn.exec_driver_sql(statement)
+            if name not in existing:
+                conn.exec_driver_sql(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+        index_foods(conn)
+    return True
+
+def index_foods(conn):
+    """KENYAN_FOODS lives in code, so its index is rebuilt by every `flask init-db`"""
+    conn.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FOODS_FTS} USING fts5("
+        f"key UNINDEXED, name_en, name_sw, tips_en, tips_sw, tokenize='{TOKENIZE}')"
+    )
+    conn.exec_driver_sql(f"DELETE FROM {FOODS_FTS}")
+    conn.execute(
+        text(f"INSERT INTO {FOODS_FTS}(key, name_en, name_sw, tips_en, tips_sw) VALUES (:key, :name_en, :name_sw, :tips_en, :tips_sw)"),
+        [
+            {
+                'key': key,
+                'name_en': food['name_en'],
+                'name_sw': food['name_sw'],
+                'tips_en': ' '.join(food['diabetes_tips']['en']),
+                'tips_sw': ' '.join(food['diabetes_tips']['sw']),
+            }
+            for key, food in KENYAN_FOODS.items()
+        ]
+    )
+
+def fts_query(query):
+    """Turn free text into a safe FTS5 expression: all words, last one as a prefix"""
+    terms = re.findall(r'\w+', (query or '').lower())
+    if not terms:
+        return None
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+def owned_query(q, user_id, column):
+    """fts_query output limited to one user's rows and to the text column
+
+    The token keeps the index scan to the user's rows; the queries still filter
+    user_id on the joined table, so a stale index row can't leak another's text
+    """
+    return f'owner : "u{int(user_id)}" AND {column} : ({q})'
+
+_READINGS_SQL = text("""
+    SELECT r.id, r.value, r.date, r.time, r.context,
+           snippet(readings_fts, 0, '[', ']', '…', 12) AS snippet, bm25(readings_fts, 1.0, 0.0) AS rank
+    FROM readings_fts JOIN readings r ON r.id = readings_fts.rowid
+    WHERE readings_fts MATCH :q AND r.user_id = :user_id
+    ORDER BY rank LIMIT :limit
+""").columns(id=Integer, value=Float, date=Date, time=Time)
+
+_MESSAGES_SQL = text("""
+    SELECT m.id, m.doctor_id, m.sender_type, m.is_emergency, m.created_at,
+           snippet(doctor_messages_fts, 0, '[', ']', '…', 12) AS snippet, bm25(doctor_messages_fts, 1.0, 0.0) AS rank
+    FROM doctor_messages_fts JOIN doctor_messages m ON m.id = doctor_messages_fts.rowid
+    WHERE doctor_messages_fts MATCH :q AND m.user_id = :user_id
+    ORDER BY rank LIMIT :limit
+""").columns(id=Integer, doctor_id=Integer, is_emergency=Boolean, created_at=DateTime)
+
+_TIPS_SQL = text("""
+    SELECT t.id, t.title, t.category, t.condition, t.priority,
+           snippet(educational_tips_fts, 1, '[', ']', '…', 12) AS snippet, bm25(educational_tips_fts, 2.0, 1.0) AS rank
+    FROM educational_tips_fts JOIN educational_tips t ON t.id = educational_tips_fts.rowid
+    WHERE educational_tips_fts MATCH :q
+    ORDER BY rank LIMIT :limit
+""").columns(id=Integer)
+
+# Name matches weigh more than tip text
+_FOODS_SQL = text(f"""
+    SELECT key, bm25({FOODS_FTS}, 0.0, 4.0, 4.0, 1.0, 1.0) AS rank
+    FROM {FOODS_FTS}
+    WHERE {FOODS_FTS} MATCH :q
+    ORDER BY rank LIMIT :limit
+""")
+
+def search_readings(q, user_id, limit):
+    return [
+        {
+            'id': row.id,
+            'value': row.value,
+            'date': row.date.isoformat() if row.date else None,
+            'time': row.time.isoformat() if row.time else None,
+            'context': row.context,
+            'snippet': row.snippet,
+            'score': round(-row.rank, 3),
+        }
+        for row in db.session.execute(_READINGS_SQL, {'q': owned_query(q, user_id, 'notes'), 'user_id': user_id, 'limit': limit})
+    ]
+
+def search_messages(q, user_id, limit):
+    return [
+        {
+            'id': row.id,
+            'doctor_id': row.doctor_id,
+            'sender_type': row.sender_type,
+            'is_emergency': row.is_emergency,
+            'created_at': row.created_at.isoformat() if row.created_at else None,
+            'snippet': row.snippet,
+            'score': round(-row.rank, 3),
+        }
+        for row in db.session.execute(_MESSAGES_SQL, {'q': owned_query(q, user_id, 'message'), 'user_id': user_id, 'limit': limit})
+    ]
+
+def search_tips(q, limit):
+    return [
+        {
+            'id': row.id,
+            'title': row.title,
+            'category': row.category,
+            'condition': row.condition,
+            'priority': row.priority,
+            'snippet': row.snippet,
+            'score': round(-row.rank, 3),
+        }
+        for row in db.session.execute(_TIPS_SQL, {'q': q, 'limit': limit})
+    ]
+
+def search_foods(q, limit, food_views):
+    return [
+        {'key': row.key, 'name': food_views[row.key]['name'], 'score': round(-row.rank, 3)}
+        for row in db.session.execute(_FOODS_SQL, {'q': q, 'limit': limit})
+        if row.key in food_views
+    ]
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Run independent payload sections concurrently on a bounded thread pool
+Each section gets its own app context, hence its own scoped session, held
+read-only for the duration of the section
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.pool import Pool
+
+from budgets import propagate
+from config import db
+from routing import replica_enabled, replica_reads
+
+_lock = threading.Lock()
+_executor = None
+
+def _pool(app):
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=app.config.get('SECTION_WORKERS', 4),
+                thread_name_prefix='section',
+            )
+        return _executor
+
+@contextmanager
+def read_only(session):
+    """Refuse writes on the session's connection until it returns to the pool"""
+    connection = session.connection()
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        connection.exec_driver_sql('PRAGMA query_only = ON')
+        # Reset on pool check-in, so it holds even if the block fails mid-transaction
+        connection.info['query_only'] = True
+    elif dialect in ('postgresql', 'mysql'):
+        connection.exec_driver_sql('SET TRANSACTION READ ONLY')
+    yield session
+
+@event.listens_for(Pool, 'checkin')
+def _reset_query_only(dbapi_connection, connection_record):
+    if connection_record is not None and connection_record.info.pop('query_only', False):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA query_only = OFF')
+        cursor.close()
+
+def _run_section(app, fn, args, replica):
+    start = time.perf_counter()
+    with app.app_context(), replica_reads(replica):
+        with read_only(db.session):
+            result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+def run_sections(sections):
+    """Run {name: (fn, *args)} and return ({name: result}, {name: elapsed_ms})
+
+    Sections run in parallel when SECTION_WORKERS > 1, otherwise one after
+    another in the caller's context. Sections read from the replica if the
+    caller does. Results cross threads, so sections must
+    return plain data, not ORM objects. The first section error is re-raised.
+    """
+    app = current_app._get_current_object()
+    if app.config.get('SECTION_WORKERS', 4) <= 1:
+        results, timings = {}, {}
+        for name, (fn, *args) in sections.items():
+            start = time.perf_counter()
+            results[name] = fn(*args)
+            timings[name] = (time.perf_counter() - start) * 1000
+        return results, timings
+
+    pool = _pool(app)
+    replica = replica_enabled()
+    futures = {name: pool.submit(propagate(_run_section), app, fn, args, replica) for name, (fn, *args) in sections.items()}
+    results, timings = {}, {}
+    for name, future in futures.items():
+        results[name], timings[name] = future.result()
+    return results, timings
+
+def server_timing(timings):
+    """Server-Timing header value for per-section durations"""
+    return ', '.join(f'{name};dur={ms:.1f}' for name, ms in timings.items())
@@ -9,7 +9,7 @@ from datetime import datetime, timedelta, date, time
 import random
 
 # Local imports
-from config import app, db
+from config import create_app, db
 from models import User, Reading, Medication, Meal, Doctor, reading_meals
 
 
@@ -139,16 +139,21 @@ def link_meals_to_readings(readings, meals):
     db.session.commit()
 
 
-if __name__ == '__main__':
+def seed_database():
+    """Reset and fill every table with demo data (needs an app context)"""
     fake = Faker()
-    with app.app_context():
-        print("Seeding database...")
-        reset_database()
-        doctors = seed_doctors(fake, n=3)
-        meals = seed_meals(fake)
-        users = seed_users(fake, doctors=doctors, n=3)
-        for u in users:
-            readings = seed_readings_for_user(u, days=3)
-            seed_medications_for_user(u, n=3)
-            link_meals_to_readings(readings, meals)
-        print("Done.")
+    print("Seeding database...")
+    reset_database()
+    doctors = seed_doctors(fake, n=3)
+    meals = seed_meals(fake)
+    users = seed_users(fake, doctors=doctors, n=3)
+    for u in users:
+        readings = seed_readings_for_user(u, days=3)
+        seed_medications_for_user(u, n=3)
+        link_meals_to_readings(readings, meals)
+    print("Done.")
+
+
+if __name__ == '__main__':
+    with create_app().app_context():
+        seed_database()
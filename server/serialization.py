@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Fast JSON encoding, MessagePack output and negotiated response compression
+orjson is used when installed (stdlib json otherwise) for both app.json and
+flask-restful; compress_response gzips or brotlis larger bodies on the way out
+"""
+
+import gzip
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; stdlib json is the fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; clients then get gzip
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; Accept: application/msgpack then gets JSON
+    msgpack = None
+
+# Preferred first
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+MSGPACK_MIMETYPE = 'application/msgpack'
+COMPRESSIBLE_TYPES = ('application/json', MSGPACK_MIMETYPE, 'text/html', 'text/plain', 'text/css', 'application/javascript')
+
+def _default(o):
+    if isinstance(o, (date, datetime, time)):
+        return o.isoformat()
+    if isinstance(o, Decimal):
+        return str(o)
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj, pretty=False):
+        """Encode obj to UTF-8 JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if pretty else 0))
+
+    loads = orjson.loads
+else:
+    def dumps(obj, pretty=False):
+        """Encode obj to UTF-8 JSON bytes"""
+        if pretty:
+            return json.dumps(obj, default=_default, ensure_ascii=False, indent=2).encode('utf-8')
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    loads = json.loads
+
+def pretty_output():
+    """Indent only when app.json.compact is False, or left unset in debug mode"""
+    compact = current_app.json.compact
+    return compact is False or (compact is None and current_app.debug)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """app.json backed by dumps/loads above"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, pretty=pretty_output()), mimetype=self.mimetype)
+
+def output_json(data, code, headers=None):
+    """flask-restful representation for application/json"""
+    response = current_app.response_class(dumps(data, pretty=pretty_output()), status=code, mimetype='application/json')
+    response.headers.extend(headers or {})
+    if msgpack is not None:
+        response.vary.add('Accept')
+    return response
+
+def output_msgpack(data, code, headers=None):
+    """flask-restful representation for application/msgpack"""
+    response = current_app.response_class(msgpack.packb(data, default=_default), status=code, mimetype=MSGPACK_MIMETYPE)
+    response.headers.extend(headers or {})
+    response.vary.add('Accept')
+    return response
+
+def negotiate_encoding(accept_encodings, available=ENCODINGS):
+    for encoding in ENCODINGS:
+        if encoding in available and accept_encodings.quality(encoding) > 0:
+            return encoding
+    return None
+
+def compress(data, encoding, best=False):
+    """best=True for bodies compressed once and reused; dynamic bodies favour speed"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else 5)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+    return data
+
+def compress_response(response):
+    """after_request hook: compress eligible bodies above COMPRESS_MIN_SIZE"""
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return response
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < current_app.config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+    encoding = negotiate_encoding(request.accept_encodings)
+    if not encoding:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    # The compressed bytes differ from what a strong ETag promised
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Compiled row serializers for hot list endpoints
+Each serializer selects plain Core rows (no ORM objects) and turns them into
+dicts with a function generated once at import; output matches the
+marshmallow schema or to_dict it replaces. ?fields= subsets compile their own
+narrower SELECT the same way
+"""
+
+from datetime import date
+
+from sqlalchemy import select
+
+from config import db
+from models import (
+    User, Reading, Medication, Meal, Reminder, BMISnapshot, DoctorMessage, glucose_status_for, bmi_for,
+    bmi_category_label,
+)
+
+
+class Iso:
+    """Field rendered with .isoformat(), None stays None"""
+    __slots__ = ('column',)
+
+    def __init__(self, column):
+        self.column = column
+
+
+class Computed:
+    """Field computed by fn(*columns)"""
+    __slots__ = ('fn', 'columns')
+
+    def __init__(self, fn, *columns):
+        self.fn = fn
+        self.columns = columns
+
+
+class RowSerializer:
+    """SELECT of just the needed columns plus a generated row -> dict function"""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = tuple(fields)
+        self.keys = tuple(key for key, _ in self.fields)
+        self.columns = []
+        self._subsets = {}
+        namespace = {}
+        items = []
+
+        def position(column):
+            for i, existing in enumerate(self.columns):
+                if existing is column:
+                    return i
+            self.columns.append(column)
+            return len(self.columns) - 1
+
+        for key, spec in fields:
+            if isinstance(spec, Iso):
+                i = position(spec.column)
+                expr = f'(r[{i}].isoformat() if r[{i}] is not None else None)'
+            elif isinstance(spec, Computed):
+                fn_name = f'_fn{len(namespace)}'
+                namespace[fn_name] = spec.fn
+                expr = f"{fn_name}({', '.join(f'r[{position(c)}]' for c in spec.columns)})"
+            else:
+                expr = f'r[{position(spec)}]'
+            items.append(f'{key!r}: {expr}')
+
+        source = f"def serialize(r):\n    return {{{', '.join(items)}}}\n"
+        exec(compile(source, f'<serializer {name}>', 'exec'), namespace)
+        self.serialize = namespace['serialize']
+        self.source = source
+
+    def select(self):
+        return select(*self.columns)
+
+    def only(self, names):
+        """Serializer for a subset of keys, in declared order, selecting only the columns they need"""
+        wanted = set(names)
+        unknown = wanted.difference(self.keys)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}. Allowed: {', '.join(self.keys)}")
+        keys = tuple(key for key in self.keys if key in wanted)
+        if keys == self.keys:
+            return self
+        subset = self._subsets.get(keys)
+        if subset is None:
+            fields = tuple(field for field in self.fields if field[0] in wanted)
+            subset = self._subsets[keys] = RowSerializer(f"{self.name}[{','.join(keys)}]", fields)
+        return subset
+
+    def sparse(self, fields_param):
+        """Apply a comma-separated ?fields= value; empty means every field. Raises ValueError"""
+        names = [name.strip() for name in (fields_param or '').split(',') if name.strip()]
+        return self.only(names) if names else self
+
+    def dump(self, rows):
+        serialize = self.serialize
+        return [serialize(r) for r in rows]
+
+    def fetch(self, *criteria, order_by=(), limit=None):
+        """Run the SELECT filtered by criteria and serialize every row"""
+        stmt = self.select().where(*criteria).order_by(*order_by)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return self.dump(db.session.execute(stmt))
+
+
+# Same output as ReadingSchema
+READING_SERIALIZER = RowSerializer('reading', (
+    ('id', Reading.id),
+    ('value', Reading.value),
+    ('date', Iso(Reading.date)),
+    ('time', Iso(Reading.time)),
+    ('notes', Reading.notes),
+    ('context', Reading.context),
+    ('is_flagged', Reading.is_flagged),
+    ('created_at', Iso(Reading.created_at)),
+    ('user_id', Reading.user_id),
+))
+
+def user_bmi_category(weight_kg, height_cm):
+    return bmi_category_label(bmi_for(weight_kg, height_cm))
+
+# Same output as User.to_dict
+USER_SERIALIZER = RowSerializer('user', (
+    ('id', User.id),
+    ('name', User.name),
+    ('email', User.email),
+    ('age', User.age),
+    ('gender', User.gender),
+    ('diabetes_type', User.diabetes_type),
+    ('height_cm', User.height_cm),
+    ('weight_kg', User.weight_kg),
+    ('bmi', Computed(bmi_for, User.weight_kg, User.height_cm)),
+    ('bmi_category', Computed(user_bmi_category, User.weight_kg, User.height_cm)),
+    ('doctor_id', User.doctor_id),
+    ('emergency_contact_name', User.emergency_contact_name),
+    ('emergency_contact_phone', User.emergency_contact_phone),
+    ('last_hospital_visit', Iso(User.last_hospital_visit)),
+    ('created_at', Iso(User.created_at)),
+))
+
+# Same output as Reading.to_dict
+READING_DICT_SERIALIZER = RowSerializer('reading_dict', (
+    ('id', Reading.id),
+    ('value', Reading.value),
+    ('date', Iso(Reading.date)),
+    ('time', Iso(Reading.time)),
+    ('notes', Reading.notes),
+    ('context', Reading.context),
+    ('glucose_status', Computed(glucose_status_for, Reading.value, Reading.context)),
+    ('is_flagged', Reading.is_flagged),
+    ('created_at', Iso(Reading.created_at)),
+    ('user_id', Reading.user_id),
+))
+
+# Same output as MedicationSchema and Medication.to_dict
+MEDICATION_SERIALIZER = RowSerializer('medication', (
+    ('id', Medication.id),
+    ('name', Medication.name),
+    ('dose', Medication.dose),
+    ('time', Iso(Medication.time)),
+    ('status', Medication.status),
+    ('created_at', Iso(Medication.created_at)),
+    ('user_id', Medication.user_id),
+))
+
+# Same output as MealSchema
+MEAL_SERIALIZER = RowSerializer('meal', (
+    ('id', Meal.id),
+    ('name', Meal.name),
+    ('meal_type', Meal.meal_type),
+    ('description', Meal.description),
+    ('created_at', Iso(Meal.created_at)),
+))
+
+# Same output as Reminder.to_dict
+REMINDER_SERIALIZER = RowSerializer('reminder', (
+    ('id', Reminder.id),
+    ('user_id', Reminder.user_id),
+    ('reminder_type', Reminder.reminder_type),
+    ('title', Reminder.title),
+    ('message', Reminder.message),
+    ('scheduled_time', Iso(Reminder.scheduled_time)),
+    ('is_active', Reminder.is_active),
+    ('frequency', Reminder.frequency),
+    ('created_at', Iso(Reminder.created_at)),
+))
+
+# Same output as BMISnapshot.to_dict
+BMI_SNAPSHOT_SERIALIZER = RowSerializer('bmi_snapshot', (
+    ('id', BMISnapshot.id),
+    ('user_id', BMISnapshot.user_id),
+    ('bmi', BMISnapshot.bmi),
+    ('weight_kg', BMISnapshot.weight_kg),
+    ('height_cm', BMISnapshot.height_cm),
+    ('created_at', Iso(BMISnapshot.created_at)),
+))
+
+# Same output as DoctorMessage.to_dict
+DOCTOR_MESSAGE_SERIALIZER = RowSerializer('doctor_message', (
+    ('id', DoctorMessage.id),
+    ('user_id', DoctorMessage.user_id),
+    ('doctor_id', DoctorMessage.doctor_id),
+    ('sender_type', DoctorMessage.sender_type),
+    ('message', DoctorMessage.message),
+    ('is_read', DoctorMessage.is_read),
+    ('is_emergency', DoctorMessage.is_emergency),
+    ('created_at', Iso(DoctorMessage.created_at)),
+))
+
+# ?format=series: parallel arrays instead of one dict per reading
+SERIES_FORMAT = 'series'
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+def reading_series(*criteria, order_by=(), limit=None, reverse=False):
+    """Columnar readings for charts: {'t': [...], 'v': [...], 'status': [...]}
+
+    t[0] is the first reading's date+time in epoch seconds (naive, as
+    stored); every later t is the delta in seconds from the previous point.
+    reverse=True flips a newest-first query so points run oldest to newest.
+    """
+    stmt = select(Reading.date, Reading.time, Reading.value, Reading.context).where(*criteria).order_by(*order_by)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    rows = db.session.execute(stmt).all()
+    if reverse:
+        rows.reverse()
+    t, v, status = [], [], []
+    previous = 0
+    for day, clock, value, context in rows:
+        timestamp = (day.toordinal() - EPOCH_ORDINAL) * 86400 + clock.hour * 3600 + clock.minute * 60 + clock.second
+        t.append(timestamp - previous)
+        previous = timestamp
+        v.append(value)
+        status.append(glucose_status_for(value, context))
+    return {'t': t, 'v': v, 'status': status}
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Single-flight coalescing for expensive per-user computations
+Concurrent identical calls in one process (same function, user, arguments and
+data version) wait for the one already running and share its result
+"""
+
+import threading
+from functools import wraps
+
+from lookups import user_data_version
+
+class _Call:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {}
+
+    def do(self, name, key, fn, *args, **kwargs):
+        """Run fn once per key at a time; callers arriving meanwhile get the same result or error"""
+        with self._lock:
+            stats = self._stats.setdefault(name, {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0})
+            stats['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                stats['executions'] += 1
+            else:
+                stats['coalesced'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'functions': {name: dict(counts) for name, counts in self._stats.items()},
+            }
+
+SINGLE_FLIGHT = SingleFlight()
+
+def single_flight(fn):
+    """Coalesce concurrent fn(user_id, ...) calls that would read the same user data
+
+    The user's data version is part of the key, so a call made after a
+    write never joins a computation that started before it. Results are
+    shared between threads and must be treated as read-only.
+    """
+    name = f'{fn.__module__}.{fn.__qualname__}'
+
+    @wraps(fn)
+    def wrapper(user_id, *args, **kwargs):
+        key = (name, int(user_id), user_data_version(user_id), args, tuple(sorted(kwargs.items())))
+        return SINGLE_FLIGHT.do(name, key, fn, user_id, *args, **kwargs)
+    return wrapper
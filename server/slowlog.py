@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Slow-query log
+Statements slower than SLOW_QUERY_SECONDS are written as JSON lines to a
+rotating log (SLOW_QUERY_LOG, default instance/slow_queries.log) with the
+normalized SQL, a keyed fingerprint of its parameters (never the values: they
+are health data), the duration and where it came from: the Resource class and
+method when a handler is on the stack, plus the innermost app function.
+The first time a process sees a query it also records the database's plan
+(EXPLAIN QUERY PLAN on SQLite, EXPLAIN on PostgreSQL).
+top_offenders() aggregates the log files for /admin/slow-queries
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+from flask import has_request_context, request
+from flask_restful import Resource
+from sqlalchemy import event
+
+from config import db
+
+try:
+    import fcntl
+except ImportError:  # not on Windows, where the dev server runs a single process anyway
+    fcntl = None
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPLAIN_PREFIXES = {'sqlite': 'EXPLAIN QUERY PLAN ', 'postgresql': 'EXPLAIN '}
+EXPLAINABLE = ('select', 'with', 'insert', 'update', 'delete')
+
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|:\w+|\$\d+')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE = re.compile(r'\s+')
+
+_loggers = {}
+_loggers_lock = threading.Lock()
+_explained = set()
+_explained_lock = threading.Lock()
+
+def normalize(statement):
+    """SQL with literals and placeholders as ?, IN lists folded, whitespace collapsed"""
+    sql = _PLACEHOLDER.sub('?', statement)
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(?...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+def fingerprint(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def params_fingerprint(parameters, key):
+    """HMAC of the parameters: equal values still match, but without the key a log
+    line can't be brute-forced back to a glucose value or user id"""
+    if not parameters:
+        return None
+    return hmac.new(key, repr(parameters).encode('utf-8'), hashlib.sha256).hexdigest()[:16]
+
+def origin():
+    """(Resource.method or None, innermost app function) for the running statement"""
+    resource = caller = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if caller is None and code.co_filename.startswith(SERVER_DIR) and code.co_filename != __file__:
+            caller = f"{frame.f_globals.get('__name__')}.{code.co_name}:{frame.f_lineno}"
+        candidate = frame.f_locals.get('self') if code.co_varnames[:1] == ('self',) else None
+        if isinstance(candidate, Resource):
+            # Queries made by decorators (auth, conditional GET) run in dispatch_request
+            method = request.method.lower() if code.co_name == 'dispatch_request' and has_request_context() else code.co_name
+            resource = f'{type(candidate).__name__}.{method}'
+            break
+        frame = frame.f_back
+    return resource, caller
+
+def explain(connection, statement, parameters):
+    """The plan as text lines, or None when this database/statement can't be explained"""
+    prefix = EXPLAIN_PREFIXES.get(connection.dialect.name)
+    if prefix is None or not statement.lstrip().lower().startswith(EXPLAINABLE):
+        return None
+    # A raw cursor: bypasses engine events, so neither this log nor /metrics counts it
+    dbapi_connection = connection.connection.dbapi_connection
+    # On PostgreSQL a failed statement aborts the whole transaction, and this one is the caller's
+    savepoint = connection.dialect.name == 'postgresql' and not getattr(dbapi_connection, 'autocommit', False)
+    cursor = dbapi_connection.cursor()
+    try:
+        if savepoint:
+            cursor.execute('SAVEPOINT slow_query_explain')
+        try:
+            cursor.execute(prefix + statement, parameters or ())
+            rows, error = cursor.fetchall(), None
+        except Exception as e:
+            if savepoint:
+                cursor.execute('ROLLBACK TO SAVEPOINT slow_query_explain')
+            rows, error = None, e
+        if savepoint:
+            cursor.execute('RELEASE SAVEPOINT slow_query_explain')
+    finally:
+        cursor.close()
+    if error is not None:
+        return [f'EXPLAIN failed: {error}']
+    if connection.dialect.name != 'sqlite':
+        return [row[0] for row in rows]
+    # SQLite rows are (id, parent, notused, detail); indent children under parents
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append('  ' * depth[node] + detail)
+    return lines
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """A RotatingFileHandler that several processes (gunicorn workers) can share
+
+    Each write, and the rollover it may trigger, holds an exclusive flock on
+    <path>.lock, so only one process writes or rotates at a time. A process
+    whose open file was rotated away by another reopens the current one first
+    """
+
+    def emit(self, record):
+        if fcntl is None:
+            return super().emit(record)
+        with open(self.baseFilename + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._reopen_if_rotated()
+                super().emit(record)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(self.stream.fileno())
+        if current is None or (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+            self.stream.close()
+            self.stream = None  # shouldRollover opens the current file
+
+def _get_logger(path, max_bytes, backups):
+    """One handler per file per process, shared by every app that logs there"""
+    path = os.path.abspath(path)
+    with _loggers_lock:
+        logger = _loggers.get(path)
+        if logger is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # delay: the file is opened on first write, i.e. after gunicorn forks
+            handler = SharedRotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, delay=True, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger = logging.Logger(f'slow_queries.{path}', logging.INFO)
+            logger.addHandler(handler)
+            _loggers[path] = logger
+    return logger
+
+def log_path(app):
+    return app.config.get('SLOW_QUERY_LOG') or os.path.join(app.instance_path, 'slow_queries.log')
+
+def record(logger, params_key, connection, statement, parameters, executemany, elapsed):
+    sql = normalize(statement)
+    key = fingerprint(sql)
+    resource, caller = origin()
+    entry = {
+        'ts': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+        'fingerprint': key,
+        'sql': sql,
+        'params_fingerprint': params_fingerprint(parameters, params_key),
+        'duration_ms': round(elapsed * 1000, 3),
+        'resource': resource,
+        'caller': caller,
+        'endpoint': request.endpoint if has_request_context() else None,
+        'pid': os.getpid(),
+    }
+    if executemany:
+        entry['rows'] = len(parameters)
+    with _explained_lock:
+        first = key not in _explained
+        _explained.add(key)
+    if first:
+        entry['plan'] = None if executemany else explain(connection, statement, parameters)
+    logger.info(json.dumps(entry, default=str))
+
+def init_slow_query_log(app):
+    """Time every statement on the app's engines; needs db.init_app done"""
+    threshold = app.config.get('SLOW_QUERY_SECONDS')
+    if threshold is None:
+        return
+    logger = _get_logger(log_path(app), app.config.get('SLOW_QUERY_LOG_MAX_BYTES', 2 * 1024 * 1024), app.config.get('SLOW_QUERY_LOG_BACKUPS', 3))
+    # Shared by every worker, so distinct_params counts match across their log lines
+    params_key = (app.config.get('SLOW_QUERY_PARAMS_KEY') or app.config['JWT_SECRET_KEY']).encode('utf-8')
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        @event.listens_for(engine, 'before_cursor_execute')
+        def _start(conn, cursor, statement, parameters, context, executemany):
+            if context is not None:
+                context._slow_query_start = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def _finish(conn, cursor, statement, parameters, context, executemany):
+            start = getattr(context, '_slow_query_start', None)
+            if start is None:
+                return
+            elapsed = time.perf_counter() - start
+            if elapsed >= threshold:
+                try:
+                    record(logger, params_key, conn, statement, parameters, executemany, elapsed)
+                except Exception:
+                    # Logging must never fail the query it measured
+                    logging.getLogger(__name__).exception('slow query log failed')
+
+def read_entries(path, backups):
+    """Entries from the log and its rotated files, oldest file first"""
+    for name in [f'{path}.{i}' for i in range(backups, 0, -1)] + [path]:
+        try:
+            with open(name, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by rotation
+        except FileNotFoundError:
+            continue
+
+def top_offenders(app, limit=20, sort='total_ms'):
+    """Slow statements grouped by fingerprint across all workers' log lines"""
+    groups = {}
+    for entry in read_entries(log_path(app), app.config.get('SLOW_QUERY_LOG_BACKUPS', 3)):
+        group = groups.get(entry['fingerprint'])
+        if group is None:
+            group = groups[entry['fingerprint']] = {
+                'fingerprint': entry['fingerprint'],
+                'sql': entry['sql'],
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'plan': None,
+                '_resources': Counter(),
+                '_params': set(),
+            }
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+        group['last_seen'] = entry['ts']
+        group['_resources'][entry.get('resource') or entry.get('caller') or 'unknown'] += 1
+        group['_params'].add(entry.get('params_fingerprint'))
+        if group['plan'] is None and entry.get('plan'):
+            group['plan'] = entry['plan']
+
+    result = []
+    for group in groups.values():
+        resources = group.pop('_resources')
+        group['distinct_params'] = len(group.pop('_params'))
+        group['origins'] = [{'origin': name, 'count': count} for name, count in resources.most_common(5)]
+        group['total_ms'] = round(group['total_ms'], 3)
+        group['avg_ms'] = round(group['total_ms'] / group['count'], 3)
+        result.append(group)
+    result.sort(key=lambda g: g[sort], reverse=True)
+    return result[:limit]
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Production settings for SQLite connections
+Every new DB-API connection to a SQLite engine runs the SQLITE_PRAGMAS from
+the app config (see Config in config.py)
+"""
+
+from sqlalchemy import event
+
+from config import db
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+def read_pragmas(connection, names):
+    """Current values on a SQLAlchemy connection, for checks and benchmarks"""
+    return {name: connection.exec_driver_sql(f'PRAGMA {name}').scalar() for name in names}
+
+def configure_sqlite(app):
+    """Install the connect hook on the app's SQLite engines (needs init_app done)"""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+    with app.app_context():
+        engines = [engine for engine in db.engines.values() if engine.dialect.name == 'sqlite']
+    for engine in engines:
+        @event.listens_for(engine, 'connect')
+        def _on_connect(dbapi_connection, connection_record, pragmas=dict(pragmas)):
+            apply_pragmas(dbapi_connection, pragmas)
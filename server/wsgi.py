@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+WSGI entrypoint: `flask --app wsgi ...`, or python wsgi.py for the dev server
+Create tables first with `flask --app wsgi init-db`
+"""
+
+import os
+
+from config import create_app
+
+app = create_app()
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5555)), debug=True)